@@ -14,6 +14,32 @@ LOG_FILE = "logs/app.log"
 DATA_DIR = Path("data")
 
 #Constants
-BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+BASE_URL = os.getenv("WEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5/weather")   # point at mock_weather_server.py for local runs
 DEFAULT_UNITS = "metric"
 REQUEST_TIMEOUT = 10
+
+# Response cache
+CACHE_DB = DATA_DIR / "weather_cache.db"
+CACHE_TTL = 600             # OpenWeather refreshes current weather about every 10 minutes
+CACHE_STALE_TTL = 1800      # serve stale data this long past TTL while refreshing in background
+NEGATIVE_CACHE_TTL = 3600   # remember NOT_FOUND cities
+
+# City index and batched requests
+GROUP_URL = BASE_URL.rsplit("/", 1)[0] + "/group"
+GROUP_BATCH_SIZE = 20       # maximum IDs the group endpoint accepts per call
+CITY_LIST_FILE = DATA_DIR / "city.list.json.gz"
+CITY_INDEX_FILE = DATA_DIR / "city_index.json"
+
+# Observation storage
+STORAGE_BACKEND = "timeseries"   # "timeseries" (partitioned store) or "files" (one JSON file per run)
+OBSERVATIONS_DIR = DATA_DIR / "observations"
+
+# API call limits (free tier: 60 calls/minute)
+RATE_LIMIT_PER_MINUTE = 60
+RATE_LIMIT_BURST = 10
+MAX_WORKERS = 4
+BREAKER_WINDOW = 20           # most recent calls considered per host
+BREAKER_MIN_CALLS = 5         # don't judge a host on fewer calls than this
+BREAKER_FAILURE_RATE = 0.5    # trip when this share of the window failed
+BREAKER_OPEN_SECONDS = 30     # how long to reject calls before probing
+BREAKER_HALF_OPEN_PROBES = 1
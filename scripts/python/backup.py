@@ -10,6 +10,8 @@ import argparse
 from pathlib import Path
 from botocore.exceptions import ClientError
 from boto3.exceptions import S3UploadFailedError
+from instrumentation import METRICS_DIR, add_profile_arguments, metrics, profiler
+from seekable_archive import INDEX_SUFFIX, index_path, write_archive
 from config import LOG_FILE, BACKUP_SOURCES, BACKUP_DESTINATION, RETENTION_DAYS, MIN_BACKUPS, LOG_LEVEL, S3_BACKUP_BUCKET, S3_PREFIX, UPLOAD_TO_S3, DELETE_LOCAL_AFTER_UPLOAD, S3_RETENTION_DAYS, validate_required_vars, validate_paths, validate_bucket, validate_s3_config
 
 logging.basicConfig(
@@ -23,24 +25,31 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def compress_directory(source_path: Path, BACKUP_DESTINATION: Path, timestamp: str) -> Path | None:
+@metrics.timed()
+def compress_directory(source_path: Path, BACKUP_DESTINATION: Path, timestamp: str, seekable: bool = False) -> Path | None:
     output_path = BACKUP_DESTINATION / f"{source_path.name}_{timestamp}.tar.gz"
 
     try:
         logger.info(f"Compressing {source_path}")
-        subprocess.run(
-            ["tar", "-czf", output_path, source_path],
-            check=True,
-            capture_output=True,
-            text=True
-        )
+        if seekable:
+            index_file = write_archive(source_path, output_path)
+            logger.info(f"Member index created {index_file}")
+        else:
+            subprocess.run(
+                ["tar", "-czf", output_path, source_path],
+                check=True,
+                capture_output=True,
+                text=True
+            )
         logger.info(f"Backup created {output_path}")
+        metrics.count("archives_created")
         return output_path
 
     except Exception as e:
         logger.error(f"Compressing failed: {e}")
         return None
 
+@metrics.timed()
 def backup_validator(output_path: Path) -> tuple[str, float, float] | None:
     if not output_path.exists():
         logger.error("Archive not found")
@@ -63,9 +72,11 @@ def backup_validator(output_path: Path) -> tuple[str, float, float] | None:
 
     checksum = sha256_hash.hexdigest()
     logger.info(f"Checksum: {checksum}")
+    metrics.count("bytes_archived", size_bytes)
 
     return checksum, size_mb, size_bytes
 
+@metrics.timed()
 def create_backup_manifest(source_path: Path, output_path: Path, timestamp: str, size_bytes: float, size_mb: float, checksum: str) -> Path | None:
     manifest = {
         "backup_file": str(output_path),
@@ -76,6 +87,12 @@ def create_backup_manifest(source_path: Path, output_path: Path, timestamp: str,
         "checksum_sha256": checksum
     }
 
+    index_file = index_path(output_path)
+    if index_file.exists():
+        manifest["format"] = "seekable"
+        manifest["index_file"] = index_file.name
+        manifest["index_sha256"] = hashlib.sha256(index_file.read_bytes()).hexdigest()
+
     manifest_file = output_path.with_name(output_path.name.replace(".tar.gz", ".json"))
     with manifest_file.open('w') as f:
         json.dump(manifest, f, indent=4)
@@ -83,6 +100,7 @@ def create_backup_manifest(source_path: Path, output_path: Path, timestamp: str,
 
     return manifest_file
 
+@metrics.timed()
 def plan_backup_rotation(backup_dir: Path, retention_days: int, min_backups: int) -> list[Path]:
     backups = list(backup_dir.glob("*.tar.gz"))
 
@@ -109,6 +127,7 @@ def plan_backup_rotation(backup_dir: Path, retention_days: int, min_backups: int
 
     return to_delete
 
+@metrics.timed()
 def upload_archive_s3(s3, archive, bucket, s3_key, checksum, retries=3):
     for attempt in range(1, retries + 1):
         try:
@@ -124,6 +143,8 @@ def upload_archive_s3(s3, archive, bucket, s3_key, checksum, retries=3):
             )
 
             logger.info(f"Uploaded {s3_key}")
+            metrics.count("objects_uploaded")
+            metrics.count("bytes_uploaded", Path(archive).stat().st_size)
             return True
 
         except (S3UploadFailedError, ClientError) as e:
@@ -137,19 +158,39 @@ def upload_archive_s3(s3, archive, bucket, s3_key, checksum, retries=3):
 
             if attempt == retries:
                 logger.error(f"Failed after {retries} attempts: {s3_key}")
+                metrics.count("upload_failures")
                 return False
 
+            metrics.count("upload_retries")
             time.sleep(2 ** attempt) 
 
         except Exception as e:
             logger.error(f"Unexpected error for {s3_key}: {e}")
             return False
 
+@metrics.timed()
+def upload_manifest_s3(s3, archive, manifest, bucket, s3_key):
+    manifest_key = s3_key.replace(".tar.gz", ".json")
+    try:
+        s3.upload_file(str(manifest), bucket, manifest_key, ExtraArgs={"ContentType": "application/json"})
+        logger.info(f"Uploaded {manifest_key}")
+
+        index_file = index_path(archive)
+        if index_file.exists():
+            s3.upload_file(str(index_file), bucket, s3_key.replace(".tar.gz", INDEX_SUFFIX))
+            logger.info(f"Uploaded {s3_key.replace('.tar.gz', INDEX_SUFFIX)}")
+        return True
+    except (S3UploadFailedError, ClientError) as e:
+        # restore.py falls back to the sha256 metadata on the archive itself
+        logger.warning(f"Failed to upload manifest {manifest_key}: {e}")
+        return False
+
 def build_s3_key(S3_PREFIX, archive, dt):
     archive = Path(archive)
     date_path = f"{dt.year}/{dt.month:02d}/{dt.day:02d}/"
     return f"{S3_PREFIX}{date_path}{archive.name}"
     
+@metrics.timed()
 def verify_s3_upload(s3, bucket, s3_key, checksum):
     try:
         head = s3.head_object(Bucket=bucket, Key=s3_key)
@@ -171,6 +212,7 @@ def verify_s3_upload(s3, bucket, s3_key, checksum):
         logger.error(f"Failed to verify S3 upload: {e}")
         return False
         
+@metrics.timed()
 def plan_s3_rotation(s3, bucket, prefix, retention_days, min_backups, dry_run=False):
 
     logger.info("Starting S3 backup cleanup...")
@@ -267,6 +309,20 @@ def parse_args():
         help="keep local file"
     )
     
+    parser.add_argument(
+        "--seekable",
+        action="store_true",
+        help="Write independently compressed frames plus a member index,\nso restore.py --path can fetch single files"
+    )
+
+    parser.add_argument(
+        "--metrics-dir",
+        default=METRICS_DIR,
+        help="Write phase timings and counters here (backup.prom, backup_run.json)"
+    )
+
+    add_profile_arguments(parser, str(Path(LOG_FILE).parent))
+
     parser.set_defaults(upload=None)
 
     return parser.parse_args()
@@ -286,6 +342,10 @@ def main():
 
     args = parse_args()
     dry_run = args.dry_run
+    profiler.start("backup", args)
+
+    if args.metrics_dir:
+        metrics.enable("backup")
 
     logger.info("Starting backup process")
 
@@ -341,7 +401,7 @@ def main():
                 success += 1
                 continue
 
-            archive = compress_directory(source, BACKUP_DESTINATION, timestamp)
+            archive = compress_directory(source, BACKUP_DESTINATION, timestamp, args.seekable)
             if archive is None:
                 failure += 1
                 continue
@@ -384,6 +444,8 @@ def main():
                    logger.error(f"Checksum verification failed for {archive.name}")
                    failure += 1
                    continue
+
+               upload_manifest_s3(s3, archive, manifest, S3_BACKUP_BUCKET, s3_key)
                    
                if upload_enabled and delete_local_enabled:
                   logger.info(f"Deleting local backup (verified uploaded): {archive.name}")
@@ -392,6 +454,8 @@ def main():
                      
                      if manifest and manifest.exists():
                         manifest.unlink()
+
+                     index_path(archive).unlink(missing_ok=True)
                         
                      logger.info(f"Deleted local backup and manifest for {archive.name}")
                   except Exception as e:
@@ -419,15 +483,18 @@ def main():
                 logger.info(f"Deleting old S3 backup: {key}")
 
                 try:
-                    s3.delete_object(Bucket=S3_BACKUP_BUCKET, Key=key)
+                    with metrics.span("delete_s3_backup"):
+                        s3.delete_object(Bucket=S3_BACKUP_BUCKET, Key=key)
 
                     manifest_key = key.replace(".tar.gz", ".json")
                     try:
                         s3.delete_object(Bucket=S3_BACKUP_BUCKET, Key=manifest_key)
+                        s3.delete_object(Bucket=S3_BACKUP_BUCKET, Key=key.replace(".tar.gz", INDEX_SUFFIX))
                     except Exception:
                        pass 
 
                     deleted_s3 += 1
+                    metrics.count("s3_backups_deleted")
 
                 except Exception as e:
                     logger.error(f"Failed to delete {key}: {e}")
@@ -455,7 +522,10 @@ def main():
                    manifest.unlink()
                    logger.info(f"Deleted manifest: {manifest.name}")
 
+                index_path(b).unlink(missing_ok=True)
+
                 deleted_locally += 1
+                metrics.count("local_backups_deleted")
             
             except Exception as e:
                 logger.error(f"Failed to delete {b.name}: {e}")
@@ -480,6 +550,13 @@ def main():
         logger.info(f"Failed s3 deletions: {failed_s3_deletions}")
         logger.info(f"Total backup size: {sum_sizes:.2f} MB")
 
+    metrics.count("sources", total)
+    metrics.count("backups_succeeded", success)
+    metrics.count("backups_failed", failure)
+    if args.metrics_dir:
+        prom, report = metrics.write(args.metrics_dir)
+        logger.info(f"Metrics written: {prom}, {report}")
+
     return True
 
 if __name__ == "__main__":
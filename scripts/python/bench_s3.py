@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+S3 Tools Benchmark
+Runs backup.py, s3_sync.py and deploy_website.py end to end against a
+local moto S3 server, over synthetic source trees (many tiny files, a
+few huge ones, or a mix; compressible text or random bytes). Each tool
+runs as its own process, so wall time, peak RSS and CPU are its own;
+S3 requests are counted by the server. Phase timings come from the
+tools' --metrics-dir run reports (instrumentation.py).
+
+Needs configs/requirements-bench.txt (moto server, werkzeug).
+
+Example:
+    python bench_s3.py --trees tiny huge mixed --content compressible random --output before.json
+    python bench_s3.py --tools s3_sync --size-mb 128 --compare before.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import boto3
+from moto.server import DomainDispatcherApplication, create_backend_app
+from werkzeug.serving import make_server
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKUP_CONFIG = SCRIPTS_DIR.parent.parent / "configs" / "backup_config.py"
+BUCKET = "bench-bucket"
+TOOLS = ["backup", "s3_sync", "deploy_website"]
+CHUNK = 1024 * 1024
+
+# Runs a tool as __main__ and records its VmHWM on exit. ru_maxrss can't be
+# used: Linux carries the parent's peak RSS over fork and exec.
+LAUNCHER = """
+import atexit, os, runpy, sys
+def peak():
+    with open("/proc/self/status") as f:
+        kb = next((line.split()[1] for line in f if line.startswith("VmHWM:")), "")
+    with open(os.environ["BENCH_RSS_FILE"], "w") as f:
+        f.write(kb)
+if os.path.exists("/proc/self/status"):
+    atexit.register(peak)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+# ===== S3 STAND-IN =====
+
+class RequestCounter:
+    """WSGI middleware counting S3 requests by method (moto's own API excluded)"""
+    def __init__(self, app):
+        self.app = app
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if not environ.get("PATH_INFO", "").startswith("/moto-api"):
+            with self._lock:
+                self.counts[environ["REQUEST_METHOD"]] += 1
+        return self.app(environ, start_response)
+
+    def take(self):
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+class S3Server:
+    def __init__(self):
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self.counter = RequestCounter(DomainDispatcherApplication(create_backend_app))
+        self.server = make_server("127.0.0.1", 0, self.counter, threaded=True)
+        self.endpoint = f"http://127.0.0.1:{self.server.port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = boto3.client(
+            "s3", endpoint_url=self.endpoint, region_name="us-east-1",
+            aws_access_key_id="testing", aws_secret_access_key="testing",
+        )
+
+    def reset(self):
+        """Drop every bucket and start from an empty one"""
+        for bucket in self.client.list_buckets().get("Buckets", []):
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket["Name"]):
+                for obj in page.get("Contents", []):
+                    self.client.delete_object(Bucket=bucket["Name"], Key=obj["Key"])
+            self.client.delete_bucket(Bucket=bucket["Name"])
+        self.client.create_bucket(Bucket=BUCKET)
+        self.counter.take()
+
+    def shutdown(self):
+        self.server.shutdown()
+
+# ===== SYNTHETIC TREES =====
+
+def file_content(rng, size, content):
+    """Yield `size` bytes in chunks: log-like text that gzips ~10x, or random bytes"""
+    if content == "random":
+        while size > 0:
+            n = min(size, CHUNK)
+            yield rng.randbytes(n)
+            size -= n
+        return
+
+    words = ["INFO", "WARNING", "ERROR", "request", "completed", "user", "session", "timeout", "GET", "POST"]
+    lines = [
+        f"2025-11-17 {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} "
+        f"{' '.join(rng.choice(words) for _ in range(8))} id={rng.randint(0, 99999)}\n"
+        for _ in range(2000)
+    ]
+    block = "".join(lines).encode()
+    while size > 0:
+        n = min(size, len(block))
+        start = rng.randrange(len(block) - n + 1)
+        yield block[start:start + n]
+        size -= n
+
+def write_file(path, rng, size, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        for chunk in file_content(rng, size, content):
+            f.write(chunk)
+
+def tree_sizes(profile, size_mb, tiny_files, huge_files, rng):
+    """List of file sizes for a tree profile"""
+    total = size_mb * CHUNK
+    if profile == "tiny":
+        return [rng.randint(256, 4096) for _ in range(tiny_files)]
+    if profile == "huge":
+        return [total // huge_files] * huge_files
+    big = [total // 4] * 2
+    medium = []
+    while sum(medium) < total // 4:
+        medium.append(rng.randint(64 * 1024, CHUNK))
+    small = [rng.randint(256, 4096) for _ in range(tiny_files // 2)]
+    return big + medium + small
+
+def build_tree(root, profile, content, size_mb, tiny_files, huge_files, seed=42):
+    """Create (or reuse) a tree; returns (path, file count, total bytes)"""
+    path = root / f"{profile}-{content}"
+    marker = root / f"{profile}-{content}.json"
+    settings = {"size_mb": size_mb, "tiny_files": tiny_files, "huge_files": huge_files, "seed": seed}
+    if marker.exists():
+        saved = json.loads(marker.read_text())
+        if saved["settings"] == settings:
+            return path, saved["files"], saved["bytes"]
+    shutil.rmtree(path, ignore_errors=True)
+
+    root.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(f"{seed}-{profile}-{content}")
+    sizes = tree_sizes(profile, size_mb, tiny_files, huge_files, rng)
+    for i, size in enumerate(sizes):
+        ext = ".log" if content == "compressible" else ".bin"
+        write_file(path / f"d{i % 20:02d}" / f"file{i:05d}{ext}", rng, size, content)
+
+    marker.write_text(json.dumps({"settings": settings, "files": len(sizes), "bytes": sum(sizes)}))
+    return path, len(sizes), sum(sizes)
+
+# ===== RUNS =====
+
+def tool_env(work_dir, server, tree, case_dir):
+    env = dict(os.environ)
+    env.update(
+        AWS_ENDPOINT_URL=server.endpoint,
+        AWS_ACCESS_KEY_ID="testing",
+        AWS_SECRET_ACCESS_KEY="testing",
+        AWS_DEFAULT_REGION="us-east-1",
+        PYTHONPATH=os.pathsep.join([str(SCRIPTS_DIR), str(work_dir / "config")]),
+        # backup.py's config.py reads these at import time
+        BACKUP_SOURCES=str(tree),
+        BACKUP_DESTINATION=str(case_dir / "archives"),
+        RETENTION_DAYS="7",
+        MIN_BACKUPS_TO_KEEP="1",
+        LOG_LEVEL="INFO",
+        S3_BACKUP_BUCKET=BUCKET,
+        S3_PREFIX="backups/",
+        UPLOAD_TO_S3="true",
+        DELETE_LOCAL_AFTER_UPLOAD="false",
+    )
+    env.pop("METRICS_DIR", None)
+    return env
+
+def tool_args(tool, tree, metrics_dir):
+    script = str(SCRIPTS_DIR / f"{tool}.py")
+    if tool == "backup":
+        return [script, "--metrics-dir", str(metrics_dir)]
+    return [script, "--source", str(tree), "--bucket", BUCKET, "--metrics-dir", str(metrics_dir)]
+
+def run_tool(tool, tree, env, case_dir):
+    """Run one tool in its own process; returns wall time, exit code, rusage, peak RSS (KB) and run report"""
+    metrics_dir = case_dir / "metrics"
+    rss_file = case_dir / "logs" / f"{tool}.rss"
+    (case_dir / "logs").mkdir(parents=True, exist_ok=True)
+    rss_file.unlink(missing_ok=True)
+    with open(case_dir / "logs" / f"{tool}.out", "ab") as out:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-c", LAUNCHER, *tool_args(tool, tree, metrics_dir)],
+            cwd=case_dir, env={**env, "BENCH_RSS_FILE": str(rss_file)}, stdout=out, stderr=subprocess.STDOUT,
+        )
+        # wait4 gives this child's own CPU time, unlike RUSAGE_CHILDREN
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    peak_kb = int(rss_file.read_text() or 0) if rss_file.exists() else usage.ru_maxrss
+
+    report_file = metrics_dir / f"{tool}_run.json"
+    report = json.loads(report_file.read_text()) if report_file.exists() else {"phases": {}, "counters": {}}
+    if report_file.exists():
+        report_file.unlink()
+    return wall, process.returncode, usage, peak_kb, report
+
+def measure(server, tool, phase, tree_info, env, case_dir):
+    tree, files, size = tree_info
+    server.counter.take()
+    wall, code, usage, peak_kb, report = run_tool(tool, tree, env, case_dir)
+    requests = server.counter.take()
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        "tool": tool,
+        "phase": phase,
+        "tree": tree.name,
+        "files": files,
+        "bytes": size,
+        "exit_code": code,
+        "wall_s": round(wall, 4),
+        "mb_per_s": round(size / CHUNK / wall, 2) if wall else 0.0,
+        "files_per_s": round(files / wall, 1) if wall else 0.0,
+        "requests": sum(requests.values()),
+        "requests_by_method": dict(requests),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "cpu_user_s": round(usage.ru_utime, 4),
+        "cpu_sys_s": round(usage.ru_stime, 4),
+        "cpu_pct": round(100 * cpu / wall, 1) if wall else 0.0,
+        "phases": {name: stats["seconds"] for name, stats in report["phases"].items()},
+        "counters": report["counters"],
+    }
+
+def run_tree(server, work_dir, tree_info, tools, repeat):
+    """Cold then warm runs per tool; with --repeat, the median-wall run is kept"""
+    runs = {}
+    for i in range(repeat):
+        case_dir = work_dir / "runs" / f"{tree_info[0].name}-{i}"
+        shutil.rmtree(case_dir, ignore_errors=True)
+        env = tool_env(work_dir, server, tree_info[0], case_dir)
+        for tool in tools:
+            # s3_sync and deploy_website write the same keys, so each starts empty
+            server.reset()
+            phases = ["once"] if tool == "backup" else ["cold", "warm"]
+            for phase in phases:
+                result = measure(server, tool, phase, tree_info, env, case_dir)
+                runs.setdefault((tool, phase), []).append(result)
+
+    results = []
+    for samples in runs.values():
+        samples.sort(key=lambda r: r["wall_s"])
+        result = samples[len(samples) // 2]
+        result["wall_runs_s"] = [r["wall_s"] for r in samples]
+        results.append(result)
+    return results
+
+# ===== REPORT =====
+
+def result_key(result):
+    return f"{result['tool']}/{result['phase']}/{result['tree']}"
+
+def print_results(results, baseline=None):
+    print(f"{'case':<42} {'wall_s':>8} {'MB/s':>8} {'files/s':>9} {'reqs':>6} {'rss_mb':>7} {'cpu%':>6}" +
+          (f" {'vs base':>8}" if baseline else ""))
+    for r in results:
+        line = (f"{result_key(r):<42} {r['wall_s']:>8.3f} {r['mb_per_s']:>8.2f} {r['files_per_s']:>9.1f} "
+                f"{r['requests']:>6} {r['peak_rss_mb']:>7.1f} {r['cpu_pct']:>6.1f}")
+        if baseline:
+            base = baseline.get(result_key(r))
+            line += f" {r['wall_s'] / base['wall_s']:>7.2f}x" if base and base["wall_s"] else f" {'-':>8}"
+        if r["exit_code"]:
+            line += f"  (exit {r['exit_code']})"
+        print(line)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark backup.py, s3_sync.py and deploy_website.py against a local S3 server")
+    parser.add_argument("--trees", nargs="+", choices=["tiny", "huge", "mixed"], default=["tiny", "huge", "mixed"])
+    parser.add_argument("--content", nargs="+", choices=["compressible", "random"], default=["compressible", "random"])
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=TOOLS)
+    parser.add_argument("--size-mb", type=int, default=32, help="Total size of the huge and mixed trees (default: 32)")
+    parser.add_argument("--tiny-files", type=int, default=2000, help="Files in the tiny tree (default: 2000)")
+    parser.add_argument("--huge-files", type=int, default=2, help="Files in the huge tree (default: 2)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the median wall time is reported")
+    parser.add_argument("--work-dir", type=Path, help="Where trees and run output go; trees are reused across runs (default: a temp dir)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier --output file to compare wall times against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="bench_s3_"))
+    work_dir = work_dir.resolve()
+    (work_dir / "config").mkdir(parents=True, exist_ok=True)
+    shutil.copy(BACKUP_CONFIG, work_dir / "config" / "config.py")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {result_key(r): r for r in json.load(f)["results"]}
+
+    server = S3Server()
+    results = []
+    try:
+        for profile in args.trees:
+            for content in args.content:
+                tree_info = build_tree(work_dir / "trees", profile, content, args.size_mb, args.tiny_files, args.huge_files)
+                print(f"Tree {tree_info[0].name}: {tree_info[1]} files, {tree_info[2] / CHUNK:.1f} MB", file=sys.stderr)
+                results += run_tree(server, work_dir, tree_info, args.tools, args.repeat)
+    finally:
+        server.shutdown()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results, baseline)
+
+    if args.output:
+        environment = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "boto3": boto3.__version__,
+        }
+        settings = {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}
+        with open(args.output, "w") as f:
+            json.dump({"settings": settings, "environment": environment, "results": results}, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+    if any(r["exit_code"] for r in results):
+        failed = [result_key(r) for r in results if r["exit_code"]]
+        print(f"Failed runs: {', '.join(failed)} (rerun with --work-dir to keep their logs)", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
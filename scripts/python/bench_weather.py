@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Weather Fetch Benchmark
+Runs the weather.py fetch pipeline against mock_weather_server.py for
+10/100/1000 cities and reports requests/s, p50/p99 latency and retries.
+
+Example:
+    python bench_weather.py --sizes 10 100 1000 --latency-ms 50 --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+
+import mock_weather_server
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class Recorder:
+    """Wraps weather.send_request / weather.retry_fetch to count requests, retries and latency"""
+    def __init__(self, weather):
+        self.weather = weather
+        self.latencies = []
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._send_request = weather.send_request
+        self._retry_fetch = weather.retry_fetch
+
+    def send_request(self, url, params):
+        start = time.perf_counter()
+        result = self._send_request(url, params)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+        return result
+
+    def retry_fetch(self, *args, **kwargs):
+        with self._lock:
+            self.fetches += 1
+        return self._retry_fetch(*args, **kwargs)
+
+    def __enter__(self):
+        self.weather.send_request = self.send_request
+        self.weather.retry_fetch = self.retry_fetch
+        return self
+
+    def __exit__(self, *exc):
+        self.weather.send_request = self._send_request
+        self.weather.retry_fetch = self._retry_fetch
+
+def run_case(weather, server, cities, mode, workers, respect_quota):
+    from city_index import CityIndex, build_index
+    from rate_limiter import TokenBucket, BreakerRegistry
+
+    if not respect_quota:
+        weather.rate_limiter = TokenBucket(rate_per_minute=1e9, burst=1_000_000)
+    weather.breakers = BreakerRegistry(**weather.breakers.settings)
+
+    index = None
+    if mode == "batched":
+        index = CityIndex(build_index(mock_weather_server.city_list(server.cities)))
+
+    server.requests = 0
+    with Recorder(weather) as recorder:
+        start = time.perf_counter()
+        results = list(weather.fetch_cities(cities, index, None, [], workers))
+        wall = time.perf_counter() - start
+
+    ok = sum(1 for _, status, _ in results if status == weather.FetchResult.SUCCESS)
+    requests_made = len(recorder.latencies)
+
+    return {
+        "cities": len(cities),
+        "mode": mode,
+        "workers": workers,
+        "wall_s": round(wall, 4),
+        "requests": requests_made,
+        "server_requests": server.requests,
+        "requests_per_s": round(requests_made / wall, 1) if wall else 0.0,
+        "cities_per_s": round(len(cities) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(recorder.latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(recorder.latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(recorder.latencies) * 1000, 2) if recorder.latencies else 0.0,
+        "retries": max(requests_made - recorder.fetches, 0),
+        "succeeded": ok,
+        "failed": len(cities) - ok,
+        "throttled": weather.rate_limiter.throttled,
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the weather fetch pipeline against a local mock API")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--modes", nargs="+", choices=["name", "batched"], default=["name", "batched"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--respect-quota", action="store_true", help="Keep the configured rate limit (slow)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    server = mock_weather_server.start_in_thread(
+        cities=mock_weather_server.make_cities(max(args.sizes)),
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        not_found_rate=args.not_found_rate,
+    )
+
+    # config.py reads these at import time
+    os.environ["WEATHER_BASE_URL"] = server.base_url
+    os.environ.setdefault("API_KEY", "benchmark")
+    import weather
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    names = list(server.cities.values())
+    results = []
+
+    print(f"{'cities':>6} {'mode':>8} {'workers':>7} {'wall_s':>8} {'req':>6} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8} {'retries':>7} {'failed':>6}")
+    for size in args.sizes:
+        for mode in args.modes:
+            for workers in args.workers:
+                r = run_case(weather, server, names[:size], mode, workers, args.respect_quota)
+                results.append(r)
+                print(f"{r['cities']:>6} {r['mode']:>8} {r['workers']:>7} {r['wall_s']:>8.3f} {r['requests']:>6} "
+                      f"{r['requests_per_s']:>8.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['retries']:>7} {r['failed']:>6}")
+
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Calculator History
+Persistent, indexed calculation history (SQLite) with a bounded
+in-memory view for the interactive calculator.
+
+    python calc_history.py search --op divide --since 2026-01-01
+    python calc_history.py search --operand 3
+    python calc_history.py import-text logs/calc_history.txt
+"""
+
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from pathlib import Path
+
+HISTORY_DB = Path(os.getenv("CALC_HISTORY_DB", "logs/calc_history.db"))
+HISTORY_RING_SIZE = 100
+
+# Lines written by older versions to logs/calc_history.txt
+TEXT_SYMBOLS = {"+": "add", "-": "subtract", "*": "multiply", "/": "divide", "%": "modulus", "**": "power"}
+TEXT_FUNCTIONS = {"square": "square_root", "cos": "cos", "sin": "sin", "tan": "tan", "log": "log", "log10": "log10"}
+TEXT_INFIX_RE = re.compile(r"^(\S+) (\*\*|[-+*/%]) (\S+) = (\S+)$")
+TEXT_CALL_RE = re.compile(r"^(\w+)\((\S+)\) = (\S+)$")
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class HistoryStore:
+    def __init__(self, db_path=HISTORY_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                op TEXT,
+                a REAL,
+                b REAL,
+                result REAL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_op_ts ON history (op, ts);
+            CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts);
+            CREATE INDEX IF NOT EXISTS idx_history_a ON history (a);
+            CREATE INDEX IF NOT EXISTS idx_history_b ON history (b);
+            """
+        )
+        self.conn.commit()
+
+    def append(self, text, op=None, a=None, b=None, result=None, ts=None):
+        """Write one entry immediately, so a crash loses nothing"""
+        self.conn.execute(
+            "INSERT INTO history (ts, op, a, b, result, text) VALUES (?, ?, ?, ?, ?, ?)",
+            (ts or time.time(), op, to_float(a), to_float(b), to_float(result), text)
+        )
+        self.conn.commit()
+
+    def recent(self, limit):
+        """Latest entries, oldest first; cost depends on limit, not on history size"""
+        rows = self.conn.execute(
+            "SELECT text FROM history ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [text for (text,) in reversed(rows)]
+
+    def search(self, op=None, since=None, until=None, operand=None, limit=50):
+        clauses, params = [], []
+        if op:
+            clauses.append("op = ?")
+            params.append(op)
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since.timestamp())
+        if until:
+            clauses.append("ts <= ?")
+            params.append(until.timestamp())
+        if operand is not None:
+            clauses.append("(a = ? OR b = ?)")
+            params += [operand, operand]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(
+            f"SELECT ts, op, a, b, result, text FROM history {where} ORDER BY ts DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def import_text(self, path):
+        """Load an old plain-text history file; returns the number of entries imported"""
+        ts = os.path.getmtime(path)
+        rows = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                op = a = b = result = None
+                if (m := TEXT_INFIX_RE.match(line)):
+                    a, symbol, b, result = m.groups()
+                    op = TEXT_SYMBOLS[symbol]
+                elif (m := TEXT_CALL_RE.match(line)):
+                    name, a, result = m.groups()
+                    op = TEXT_FUNCTIONS.get(name)
+                rows.append((ts, op, to_float(a), to_float(b), to_float(result), line))
+
+        self.conn.executemany(
+            "INSERT INTO history (ts, op, a, b, result, text) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+class History:
+    """Bounded in-memory view of the history; every entry is also persisted"""
+    def __init__(self, store=None, size=HISTORY_RING_SIZE):
+        self.store = store
+        self.ring = deque(store.recent(size) if store else [], maxlen=size)
+
+    def append(self, text, op=None, a=None, b=None, result=None):
+        self.ring.append(text)
+        if self.store:
+            self.store.append(text, op, a, b, result)
+
+    def clear(self):
+        """Clears the session view; the persistent history is kept"""
+        self.ring.clear()
+
+    def __iter__(self):
+        return iter(self.ring)
+
+    def __len__(self):
+        return len(self.ring)
+
+def open_history(db_path=HISTORY_DB):
+    try:
+        return History(HistoryStore(db_path))
+    except sqlite3.Error as e:
+        print(f"Warning: history will not be saved ({e})")
+        return History()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search the calculator history")
+    parser.add_argument("--db", default=HISTORY_DB, type=Path, help=f"History database (default: {HISTORY_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    search = sub.add_parser("search", help="Find past calculations")
+    search.add_argument("--op", help="Operation name, e.g. add, divide, square_root")
+    search.add_argument("--since", type=datetime.datetime.fromisoformat, help="ISO date/time")
+    search.add_argument("--until", type=datetime.datetime.fromisoformat, help="ISO date/time")
+    search.add_argument("--operand", type=float, help="Match either operand")
+    search.add_argument("--limit", type=int, default=50)
+
+    importer = sub.add_parser("import-text", help="Import an old plain-text history file")
+    importer.add_argument("path")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    store = HistoryStore(args.db)
+
+    if args.command == "import-text":
+        print(f"Imported {store.import_text(args.path)} entries ({store.count()} total)")
+    else:
+        for ts, op, a, b, result, text in store.search(args.op, args.since, args.until, args.operand, args.limit):
+            when = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{when}] {text}")
+
+    store.close()
+
+if __name__ == "__main__":
+    main()
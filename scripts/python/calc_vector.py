@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Vectorized Calculator
+Applies the calculator operations to whole NumPy columns in one call.
+Rows where the scalar functions would print an error and return None
+come back masked instead.
+
+    python calc_vector.py data.csv --op divide --a price --b qty --output out.csv
+    python calc_vector.py --bench 1000000
+"""
+
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+def _masked(values, invalid):
+    return np.ma.masked_array(np.where(invalid, np.nan, values), mask=invalid)
+
+def v_add(a, b):
+    return _masked(a + b, np.zeros(a.shape, dtype=bool))
+
+def v_subtract(a, b):
+    return _masked(a - b, np.zeros(a.shape, dtype=bool))
+
+def v_multiply(a, b):
+    return _masked(a * b, np.zeros(a.shape, dtype=bool))
+
+def v_divide(a, b):
+    zero = b == 0
+    return _masked(np.divide(a, np.where(zero, 1, b)), zero)
+
+def v_modulus(a, b):
+    zero = b == 0
+    return _masked(np.mod(a, np.where(zero, 1, b)), zero)
+
+def v_power(a, b):
+    # Negative base with a fractional exponent has no real result
+    complex_result = (a < 0) & (b != np.floor(b))
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        result = np.power(a, np.where(complex_result, 1, b))
+    # The scalar version raises OverflowError here
+    overflow = ~np.isfinite(result) & np.isfinite(a) & np.isfinite(b)
+    return _masked(result, complex_result | overflow)
+
+def v_square_root(a):
+    negative = a < 0
+    return _masked(np.sqrt(np.where(negative, 0, a)), negative)
+
+def v_sin(a):
+    return _masked(np.sin(np.deg2rad(a)), np.zeros(a.shape, dtype=bool))
+
+def v_cos(a):
+    return _masked(np.cos(np.deg2rad(a)), np.zeros(a.shape, dtype=bool))
+
+def v_tan(a):
+    return _masked(np.tan(np.deg2rad(a)), np.zeros(a.shape, dtype=bool))
+
+def v_log(a):
+    invalid = a <= 0
+    return _masked(np.log(np.where(invalid, 1, a)), invalid)
+
+def v_log10(a):
+    invalid = a <= 0
+    return _masked(np.log10(np.where(invalid, 1, a)), invalid)
+
+VECTOR_OPERATIONS = {
+    "add": (v_add, 2),
+    "subtract": (v_subtract, 2),
+    "multiply": (v_multiply, 2),
+    "divide": (v_divide, 2),
+    "modulus": (v_modulus, 2),
+    "power": (v_power, 2),
+    "square_root": (v_square_root, 1),
+    "sin": (v_sin, 1),
+    "cos": (v_cos, 1),
+    "tan": (v_tan, 1),
+    "log": (v_log, 1),
+    "log10": (v_log10, 1),
+}
+
+def evaluate_columns(op, a, b=None) -> np.ma.MaskedArray:
+    """Apply a calculator operation element-wise; invalid rows are masked"""
+    func, arity = VECTOR_OPERATIONS[op]
+    a = np.asarray(a, dtype=float)
+    if arity == 1:
+        result = func(a)
+        missing = np.isnan(a)
+    elif b is None:
+        raise ValueError(f"{op} needs two columns")
+    else:
+        b = np.broadcast_to(np.asarray(b, dtype=float), a.shape)
+        result = func(a, b)
+        missing = np.isnan(a) | np.isnan(b)
+
+    # Empty cells in the input stay empty in the output
+    result[missing] = np.ma.masked
+    return result
+
+# ===== COLUMNAR FILES =====
+
+def load_columns(path) -> dict:
+    """CSV with a header row, or .npz with named arrays"""
+    if str(path).endswith(".npz"):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    # Cells stay as text so untouched columns are written back exactly as read
+    return {name: np.array([row[i] if i < len(row) else "" for row in rows], dtype=str)
+            for i, name in enumerate(header)}
+
+def numeric_column(column):
+    """Column as floats with empty cells as NaN, or None if a cell isn't a number"""
+    if column.dtype.kind != "U":
+        return column.astype(float)
+    try:
+        return np.array([float(v) if v != "" else np.nan for v in column])
+    except ValueError:
+        return None
+
+def save_columns(path, columns: dict):
+    if str(path).endswith(".npz"):
+        plain = {}
+        for name, column in columns.items():
+            if np.ma.isMaskedArray(column):
+                plain[name] = column.filled(np.nan)
+                plain[f"{name}_mask"] = np.ma.getmaskarray(column)
+            else:
+                plain[name] = column
+        np.savez(path, **plain)
+        return
+
+    names = list(columns)
+    cells = []
+    for name in names:
+        column = columns[name]
+        if np.ma.isMaskedArray(column):
+            cells.append(["" if m else repr(float(v)) for v, m in zip(column.data, np.ma.getmaskarray(column))])
+        else:
+            cells.append([str(v) for v in column])
+
+    f = sys.stdout if path == "-" else open(path, "w", newline="")
+    try:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*cells))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+# ===== BENCHMARK =====
+
+def run_benchmark(count, seed=42):
+    """Compare the scalar calculator loop against the vectorized engine per operation"""
+    import calculator
+
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(-100, 100, count)
+    b = rng.uniform(-10, 10, count)
+
+    print(f"{'operation':<12} {'scalar rows/s':>15} {'vector rows/s':>15} {'speedup':>8} {'masked':>8}")
+    for op, (func, arity) in VECTOR_OPERATIONS.items():
+        args = [a.tolist(), b.tolist()][:arity]
+
+        start = time.perf_counter()
+        for row in zip(*args):
+            calculator.evaluate(op, row)
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = evaluate_columns(op, a, b if arity == 2 else None)
+        vector = time.perf_counter() - start
+
+        print(f"{op:<12} {count / scalar:>15,.0f} {count / vector:>15,.0f} {scalar / vector:>7.0f}x {int(result.mask.sum()):>8}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vectorized calculator over columnar files")
+    parser.add_argument("input", nargs="?", help="CSV (with header) or .npz file")
+    parser.add_argument("--op", choices=list(VECTOR_OPERATIONS), help="Operation to apply")
+    parser.add_argument("--a", help="Column for the first operand")
+    parser.add_argument("--b", help="Column (or constant) for the second operand")
+    parser.add_argument("--result", default="result", help="Name of the result column (default: result)")
+    parser.add_argument("--output", help="Output CSV/.npz (default: CSV to stdout)")
+    parser.add_argument("--bench", type=int, metavar="N", help="Benchmark scalar vs vectorized on N rows")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.bench:
+        run_benchmark(args.bench)
+        return
+
+    if not (args.input and args.op and args.a):
+        print("Error: input, --op and --a are required (or use --bench N)")
+        return
+
+    columns = load_columns(args.input)
+    if args.a not in columns:
+        print(f"Error: no column named {args.a}")
+        return
+    a = numeric_column(columns[args.a])
+    if a is None:
+        print(f"Error: column {args.a} is not numeric")
+        return
+
+    b = None
+    if VECTOR_OPERATIONS[args.op][1] == 2:
+        if args.b is None:
+            print(f"Error: {args.op} needs --b")
+            return
+        if args.b in columns:
+            b = numeric_column(columns[args.b])
+            if b is None:
+                print(f"Error: column {args.b} is not numeric")
+                return
+        else:
+            try:
+                b = float(args.b)
+            except ValueError:
+                print(f"Error: {args.b} is an unknown column or number")
+                return
+
+    result = evaluate_columns(args.op, a, b)
+    columns[args.result] = result
+    print(f"{args.op}: {result.count()} values, {int(np.ma.count_masked(result))} masked", file=sys.stderr)
+
+    save_columns(args.output or "-", columns)
+    if args.output:
+        print(f"Results saved to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,23 @@
 #!/usr/bin/env python3
 """
 Week 5 Project: CLI Calculator
-Interactive calculator with history
+Interactive calculator with persistent history (see calc_history.py), plus a streaming batch mode:
+
+    python calculator.py --batch rows.csv --output results.csv
+    printf 'add,2,3\n10 / 0\nsqrt(16)\n' | python calculator.py --batch -
+    python calculator.py --batch data.csv --formula "price * qty + sqrt(fee)"
 """
+import argparse
+import ast
+import csv
+import functools
 import math
+import random
+import re
+import sys
+import time
+
+from calc_history import open_history
 GREEN = "\033[92m"
 RED = "\033[91m"
 RESET = "\033[0m"
@@ -102,19 +116,349 @@ def show_menu():
     print("15. Clear memory")
     print("16. Show History")
     print("17. Clear History")
+    print("18. Evaluate expression")
+    print("19. Search History")
     print("0. Exit")
 
 def show_history(history):
     """Display calculation history"""
     print("\n=== Calculation History ===")
-    for calc in history[-5:]: 
+    for calc in list(history)[-5:]:
         print(calc)
+
+def search_history(history):
+    """Search the persistent history by operation"""
+    if history.store is None:
+        print(RED + "History is not being saved this session." + RESET)
+        return
+    op = input("Operation to find (e.g. divide, blank for all): ").strip() or None
+    print("\n=== Matching Calculations ===")
+    for ts, _, _, _, _, text in history.store.search(op=op, limit=10):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))}] {text}")
+
+# ===== BATCH MODE =====
+
+OPERATIONS = {
+    "add": (add, 2),
+    "subtract": (subtract, 2),
+    "multiply": (multiply, 2),
+    "divide": (divide, 2),
+    "modulus": (modulus, 2),
+    "power": (power, 2),
+    "square_root": (square_root, 1),
+    "sin": (sin, 1),
+    "cos": (cos, 1),
+    "tan": (tan, 1),
+    "log": (log, 1),
+    "log10": (log10, 1),
+}
+
+ALIASES = {
+    "+": "add",
+    "-": "subtract",
+    "*": "multiply",
+    "/": "divide",
+    "%": "modulus",
+    "**": "power",
+    "^": "power",
+    "sqrt": "square_root",
+}
+
+# Checked up front so batch rows fail quietly instead of printing the interactive error
+DOMAIN_ERRORS = {
+    "divide": (lambda a, b: b == 0, "Cannot divide by zero"),
+    "modulus": (lambda a, b: b == 0, "Cannot divide by zero"),
+    "square_root": (lambda a: a < 0, "Cannot take square root of a negative number"),
+}
+
+NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+INFIX_RE = re.compile(rf"^\s*({NUMBER})\s*(\*\*|[-+*/%^])\s*({NUMBER})\s*$")
+CALL_RE = re.compile(rf"^\s*(\w+)\s*\(\s*({NUMBER})\s*(?:,\s*({NUMBER})\s*)?\)\s*$")
+
+def parse_row(line):
+    """Turn 'op,a,b', 'a + b' or 'sqrt(a)' into (op, args); None for anything else.
+    Raises ValueError for a malformed simple row."""
+    first = line.split(",", 1)[0].strip().lower()
+    if "," in line and ALIASES.get(first, first) in OPERATIONS:
+        fields = [f.strip() for f in next(csv.reader([line]))]
+        op, args = fields[0], fields[1:]
+    elif (m := INFIX_RE.match(line)):
+        op, args = m.group(2), [m.group(1), m.group(3)]
+    elif (m := CALL_RE.match(line)) and ALIASES.get(m.group(1).lower(), m.group(1).lower()) in OPERATIONS:
+        op, args = m.group(1), [a for a in m.group(2, 3) if a is not None]
+    else:
+        return None
+
+    op = ALIASES.get(op.lower(), op.lower())
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {op}")
+
+    func, arity = OPERATIONS[op]
+    args = [a for a in args if a != ""]
+    if len(args) != arity:
+        raise ValueError(f"{op} expects {arity} operand(s), got {len(args)}")
+
+    return op, [float(a) for a in args]
+
+def error_message(e):
+    """OverflowError from float ** carries (errno, text) args"""
+    return str(e.args[-1]) if e.args else type(e).__name__
+
+def evaluate(op, args):
+    """Return (result, error) without printing"""
+    func, arity = OPERATIONS[op]
+    check = DOMAIN_ERRORS.get(op)
+    if check and check[0](*args):
+        return None, check[1]
+    try:
+        result = func(*args)
+    except (ValueError, OverflowError, ZeroDivisionError) as e:
+        return None, error_message(e)
+    if isinstance(result, complex):
+        return None, "Result is not a real number"
+    return result, None
+
+def evaluate_stream(lines, writer):
+    """Evaluate rows one at a time, writing a CSV line per row; returns (rows, errors)"""
+    rows = 0
+    errors = 0
+    writer.writerow(["line", "op", "a", "b", "result", "error"])
+
+    variables = {}
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#") or line.lower().startswith("op,"):
+            continue
+        rows += 1
+        try:
+            parsed = parse_row(line)
+            if parsed:
+                op, args = parsed
+                result, error = evaluate(op, args)
+            else:
+                op, args, result = evaluate_line(line, variables)
+                error = None
+        except ValueError as e:
+            op, args, result, error = "", [], None, str(e)
+
+        if error:
+            errors += 1
+        padded = args + [""] * (2 - len(args))
+        writer.writerow([number, op, *padded, "" if result is None else result, error or ""])
+
+    return rows, errors
+
+def run_batch(source, output=None):
+    start = time.perf_counter()
+    infile = sys.stdin if source == "-" else open(source, newline="")
+    outfile = open(output, "w", newline="") if output else sys.stdout
+
+    try:
+        rows, errors = evaluate_stream(infile, csv.writer(outfile))
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else 0
+    print(f"Processed {rows} rows ({errors} errors) in {elapsed:.3f}s - {rate:,.0f} rows/s", file=sys.stderr)
+
+def run_formula(source, formula, output=None):
+    """Evaluate one formula per CSV row, with the row's columns as variables"""
+    start = time.perf_counter()
+    expression = compile_expression(formula)
+    infile = sys.stdin if source == "-" else open(source, newline="")
+    outfile = open(output, "w", newline="") if output else sys.stdout
+    rows = 0
+    errors = 0
+
+    try:
+        reader = csv.DictReader(infile)
+        writer = csv.writer(outfile)
+        writer.writerow([*reader.fieldnames, "result", "error"])
+
+        for record in reader:
+            rows += 1
+            try:
+                variables = {k: float(v) for k, v in record.items() if v not in ("", None)}
+                result, error = expression(variables), ""
+            except ValueError as e:
+                result, error = "", str(e)
+                errors += 1
+            writer.writerow([*record.values(), result, error])
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else 0
+    print(f"Processed {rows} rows ({errors} errors) in {elapsed:.3f}s - {rate:,.0f} rows/s", file=sys.stderr)
+
+def generate_rows(count, seed=42):
+    rng = random.Random(seed)
+    ops = list(OPERATIONS)
+    rows = []
+    for _ in range(count):
+        op = rng.choice(ops)
+        func, arity = OPERATIONS[op]
+        args = [f"{rng.uniform(-100, 100):.4f}" for _ in range(arity)]
+        rows.append(",".join([op, *args]))
+    return rows
+
+class NullWriter:
+    def writerow(self, row):
+        pass
+
+def run_benchmark(count):
+    """Rows per second for parsing + evaluation, without I/O"""
+    rows = generate_rows(count)
+    start = time.perf_counter()
+    processed, errors = evaluate_stream(rows, NullWriter())
+    elapsed = time.perf_counter() - start
+    print(f"Batch benchmark: {processed} rows ({errors} errors) in {elapsed:.3f}s - {processed / elapsed:,.0f} rows/s")
+
+def run_expression_benchmark(count):
+    """Parse and eval throughput, measured separately"""
+    sources = [f"{i} * x + sqrt(y) - memory / 2" for i in range(count)]
+    start = time.perf_counter()
+    for source in sources:
+        _compile_expression(source)
+    parse = time.perf_counter() - start
+
+    expression = compile_expression("price * qty + sqrt(fee) - memory / 2")
+    start = time.perf_counter()
+    for i in range(count):
+        expression({"price": i * 0.5, "qty": 3.0, "fee": 16.0}, memory=1.0)
+    evaluation = time.perf_counter() - start
+
+    print(f"Expression benchmark ({count} iterations):")
+    print(f"  parse + compile: {count / parse:,.0f} expressions/s")
+    print(f"  cached eval:     {count / evaluation:,.0f} evaluations/s")
+
+# ===== EXPRESSIONS =====
+
+class CalculationError(ValueError):
+    """An expression could not be parsed or evaluated"""
+
+def strict(op):
+    """Expression version of an operation: raises instead of printing"""
+    def call(*args):
+        result, error = evaluate(op, [float(a) for a in args])
+        if error:
+            raise CalculationError(error)
+        return result
+    return call
+
+EXPRESSION_GLOBALS = {
+    "__builtins__": {},
+    "pi": math.pi,
+    "e": math.e,
+    **{op: strict(op) for op in OPERATIONS},
+    **{alias: strict(op) for alias, op in ALIASES.items() if alias.isalpha()},
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load, ast.Call,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+)
+
+ASSIGN_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*=(?!=)\s*(.+)$")
+
+class CompiledExpression:
+    def __init__(self, source, code):
+        self.source = source
+        self.code = code
+
+    def __call__(self, variables=None, memory=None):
+        scope = variables if variables is not None else {}
+        if memory is not None:
+            scope = {**scope, "memory": memory, "M": memory}
+        try:
+            result = eval(self.code, EXPRESSION_GLOBALS, scope)
+        except NameError as e:
+            raise CalculationError(f"Unknown name in {self.source!r}: {e.name}") from None
+        except ZeroDivisionError:
+            raise CalculationError("Cannot divide by zero") from None
+        except OverflowError as e:
+            raise CalculationError(error_message(e)) from None
+        except TypeError as e:
+            raise CalculationError(f"Wrong number of arguments: {e}") from None
+
+        if isinstance(result, complex):
+            raise CalculationError("Result is not a real number")
+        return result
+
+def _validate(tree):
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise CalculationError(f"Unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                raise CalculationError(f"Unsupported constant: {node.value!r}")
+            # Float arithmetic keeps huge powers from turning into huge ints
+            node.value = float(node.value)
+        elif isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise CalculationError(f"Unsupported name: {node.id}")
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in EXPRESSION_GLOBALS or node.keywords:
+                raise CalculationError("Only calls like sqrt(x) or power(x, y) are allowed")
+
+def _compile_expression(source) -> CompiledExpression:
+    try:
+        tree = ast.parse(source.replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise CalculationError(f"Invalid expression {source!r}: {e.msg}") from None
+    _validate(tree)
+    return CompiledExpression(source, compile(tree, "<expression>", "eval"))
+
+# Parsed once per distinct formula, however many rows evaluate it
+compile_expression = functools.lru_cache(maxsize=4096)(_compile_expression)
+
+def evaluate_expression(source, variables=None, memory=None):
+    return compile_expression(source.strip())(variables, memory)
+
+def evaluate_line(line, variables):
+    """Batch line that isn't a simple row: 'expr' or 'name = expr'; returns (op, args, result)"""
+    if (m := ASSIGN_RE.match(line)):
+        name, source = m.groups()
+        variables[name] = evaluate_expression(source, variables)
+        return "assign", [name], variables[name]
+    return "expr", [line], evaluate_expression(line, variables)
+
 # ===== MAIN PROGRAM =====
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="CLI calculator (interactive by default)")
+    parser.add_argument("--batch", metavar="FILE", help="Evaluate rows from FILE ('-' for stdin) instead of the menu")
+    parser.add_argument("--output", metavar="FILE", help="Write batch results as CSV to FILE (default: stdout)")
+    parser.add_argument("--formula", help="With --batch: evaluate this expression per CSV row, using its columns as variables")
+    parser.add_argument("--bench", type=int, metavar="N", help="Benchmark batch evaluation on N generated rows")
+    parser.add_argument("--bench-expr", type=int, metavar="N", help="Benchmark expression parsing and cached evaluation")
+    return parser.parse_args()
+
 def main():
     """Main calculator loop"""
+    args = parse_args()
+    if args.bench:
+        run_benchmark(args.bench)
+        return
+    if args.bench_expr:
+        run_expression_benchmark(args.bench_expr)
+        return
+    if args.batch and args.formula:
+        run_formula(args.batch, args.formula, args.output)
+        return
+    if args.batch:
+        run_batch(args.batch, args.output)
+        return
+
     print("=== Welcome to CLI Calculator ===")
-    history = []
+    history = open_history()
     memory = None  
  
     while True:
@@ -130,78 +474,78 @@ def main():
             result = add(a, b)
             calc = (f"{a} + {b} = {result}")
             print(GREEN + calc + RESET)  
-            history.append(calc)
+            history.append(calc, "add", a, b, result)
         elif choice == '2':
             a = get_number("Enter first number: ", memory)
             b = get_number("Enter second number: ", memory)
             result = subtract(a, b)
             calc = (f"{a} - {b} = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "subtract", a, b, result)
         elif choice == '3':
             a = get_number("Enter first number: ", memory)
             b = get_number("Enter second number: ", memory)
             result = multiply(a, b)
             calc = (f"{a} * {b} = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "multiply", a, b, result)
         elif choice == '4':
             a = get_number("Enter first number: ", memory)
             b = get_number("Enter second number: ", memory)
             result = divide(a, b)
             calc = (f"{a} / {b} = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "divide", a, b, result)
         elif choice == '5':
             a = get_number("Enter first number: ", memory)
             b = get_number("Enter second number: ", memory)
             result = modulus(a, b)
             calc = (f"{a} % {b} = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "modulus", a, b, result)
         elif choice == '6':
             a = get_number("Enter first number: ", memory)
             b = get_number("Enter second number: ", memory)
             result = power(a, b)
             calc = (f"{a} ** {b} = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "power", a, b, result)
         elif choice == '7':
             a = get_number("Enter a number: ", memory)
             result = square_root(a) 
             calc = (f"square({a}) = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "square_root", a, result=result)
         elif choice == '8':
             a = get_number("Enter a number: ", memory)
             result = cos(a)
             calc = (f"cos({a}) = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "cos", a, result=result)
         elif choice == '9':
             a = get_number("Enter a number: ", memory)
             result = sin(a)
             calc = (f"sin({a}) = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "sin", a, result=result)
         elif choice == '10':
             a = get_number("Enter a number: ", memory)
             result = tan(a)
             calc = (f"tan({a}) = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "tan", a, result=result)
         elif choice == '11':
             a = get_number("Enter a number: ", memory)
             result = log(a)
             calc = (f"log({a}) = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "log", a, result=result)
         elif choice == '12':
             a = get_number("Enter a number: ", memory)
             result = log10(a)
             calc = (f"log10({a}) = {result}")
             print(GREEN + calc + RESET)
-            history.append(calc)
+            history.append(calc, "log10", a, result=result)
         elif choice == '13':   
             if 'result' in locals() and result is not None:
                memory = result
@@ -221,11 +565,21 @@ def main():
             show_history(history)
         elif choice == '17':
             history.clear()
+            print("History view cleared (saved history is kept)")
+        elif choice == '18':
+            expression = input("Enter expression (e.g. sqrt(memory) * 2 + 1): ")
+            try:
+                result = evaluate_expression(expression, memory=memory)
+                calc = (f"{expression} = {result}")
+                print(GREEN + calc + RESET)
+                history.append(calc, result=result)
+            except ValueError as e:
+                result = None
+                print(RED + f"Error: {e}" + RESET)
+        elif choice == '19':
+            search_history(history)
         else:
             print(RED + "Invalid choice! Please try again." + RESET)
-    with open("/home/abou/cloud-learning-project/logs/calc_history.txt", "a") as f:
-        for item in history:
-            f.write(item + "\n")
    
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+City Index
+Resolve city names to OpenWeather city IDs locally, using the bulk
+city list (http://bulk.openweathermap.org/sample/city.list.json.gz).
+"""
+
+import argparse
+import difflib
+import gzip
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def normalize_name(name):
+    """'New_York' / ' new york ' -> 'new york'"""
+    return " ".join(name.replace("_", " ").split()).lower()
+
+def load_city_list(path: Path) -> list[dict]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_index(cities: list[dict]) -> dict:
+    """Map 'name' and 'name,cc' to city IDs, keeping bulk-file order for ambiguous names"""
+    index = {}
+
+    for city in cities:
+        name = normalize_name(city["name"])
+        country = city.get("country", "").lower()
+        index.setdefault(name, []).append(city["id"])
+        if country:
+            index.setdefault(f"{name},{country}", []).append(city["id"])
+
+    return index
+
+class CityIndex:
+    def __init__(self, index: dict):
+        self.index = index
+
+    @classmethod
+    def load(cls, path: Path):
+        if not path.exists():
+            logger.info(f"No city index at {path}; falling back to name queries")
+            return None
+        with path.open(encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(self.index, f, separators=(",", ":"))
+
+    def resolve(self, city) -> int | None:
+        """Accepts 'London' or 'London,GB'"""
+        name, _, country = city.partition(",")
+        key = normalize_name(name)
+        if country.strip():
+            key = f"{key},{country.strip().lower()}"
+
+        ids = self.index.get(key)
+        if not ids:
+            return None
+        if len(ids) > 1:
+            logger.debug(f"{city} is ambiguous ({len(ids)} matches); using ID {ids[0]}")
+        return ids[0]
+
+    def suggest(self, city, limit=3) -> list[str]:
+        names = [k for k in self.index if "," not in k]
+        return difflib.get_close_matches(normalize_name(city), names, n=limit)
+
+def main():
+    from config import CITY_LIST_FILE, CITY_INDEX_FILE
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Build the local city name -> ID index")
+    parser.add_argument("city_list", nargs="?", default=CITY_LIST_FILE, type=Path,
+                        help=f"OpenWeather bulk city list (default: {CITY_LIST_FILE})")
+    parser.add_argument("--output", default=CITY_INDEX_FILE, type=Path,
+                        help=f"Index file to write (default: {CITY_INDEX_FILE})")
+    args = parser.parse_args()
+
+    if not args.city_list.exists():
+        logger.critical(f"City list not found: {args.city_list}")
+        return
+
+    cities = load_city_list(args.city_list)
+    index = CityIndex(build_index(cities))
+    index.save(args.output)
+    logger.info(f"Indexed {len(cities)} cities ({len(index.index)} keys) into {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Duplicate Finder
+Find byte-identical files with tiered hashing: group by size, then hash
+the first/last few KB, and only fully hash files that still collide.
+"""
+
+import hashlib
+import os
+
+PARTIAL_BYTES = 4096
+CHUNK_SIZE = 1024 * 1024
+
+class DedupStats:
+    def __init__(self):
+        self.files = 0
+        self.partial_hashes = 0
+        self.full_hashes = 0
+        self.bytes_read = 0
+        self.bytes_total = 0
+        self.groups = 0
+        self.duplicates = 0
+
+    def summary(self):
+        saved = 100 - (self.bytes_read / self.bytes_total * 100) if self.bytes_total else 0
+        return (
+            f"{self.duplicates} duplicates in {self.groups} groups; "
+            f"hashed {self.partial_hashes} partial / {self.full_hashes} full; "
+            f"read {self.bytes_read / (1024 * 1024):.2f} MB of {self.bytes_total / (1024 * 1024):.2f} MB "
+            f"({saved:.1f}% less than hashing everything)"
+        )
+
+def partial_hash(path, size, stats):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        # Small files are read whole, so their partial hash is already final
+        head = f.read(PARTIAL_BYTES if size > 2 * PARTIAL_BYTES else size)
+        digest.update(head)
+        stats.bytes_read += len(head)
+        if size > 2 * PARTIAL_BYTES:
+            f.seek(-PARTIAL_BYTES, os.SEEK_END)
+            tail = f.read(PARTIAL_BYTES)
+            digest.update(tail)
+            stats.bytes_read += len(tail)
+    stats.partial_hashes += 1
+    return digest.digest()
+
+def full_hash(path, stats):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            stats.bytes_read += len(chunk)
+    stats.full_hashes += 1
+    return digest.digest()
+
+def group_by(paths, key):
+    groups = {}
+    for path in paths:
+        try:
+            groups.setdefault(key(path), []).append(path)
+        except OSError:
+            continue
+    return [group for group in groups.values() if len(group) > 1]
+
+def find_duplicates(paths):
+    """Return (groups, stats); each group lists identical files in input order"""
+    stats = DedupStats()
+    sizes = {}
+
+    for path in paths:
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            continue
+        stats.files += 1
+        stats.bytes_total += size
+        sizes.setdefault(size, []).append(path)
+
+    groups = []
+    for size, same_size in sizes.items():
+        # Empty files waste no space, so they're never reported
+        if len(same_size) < 2 or size == 0:
+            continue
+
+        for same_partial in group_by(same_size, lambda p: partial_hash(p, size, stats)):
+            if size <= 2 * PARTIAL_BYTES:
+                groups.append(same_partial)
+            else:
+                groups.extend(group_by(same_partial, lambda p: full_hash(p, stats)))
+
+    stats.groups = len(groups)
+    stats.duplicates = sum(len(group) - 1 for group in groups)
+    return groups, stats
@@ -2,12 +2,15 @@
 
 import boto3
 import os
+import time
+import argparse
 from pathlib import Path
 import mimetypes
 from botocore.exceptions import ClientError
 from boto3.exceptions import S3UploadFailedError
 import logging
 import hashlib
+from instrumentation import METRICS_DIR, add_profile_arguments, metrics, profiler
 
 s3 = boto3.client('s3')
 
@@ -18,6 +21,7 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+@metrics.timed("upload_file")
 def deploy_website(s3, file_path, bucket, s3_key, content_type, retries=3):
     for attempt in range(1, retries + 1):
         try:
@@ -31,6 +35,8 @@ def deploy_website(s3, file_path, bucket, s3_key, content_type, retries=3):
             )
 
             logger.info(f"Uploaded {s3_key}")
+            metrics.count("objects_uploaded")
+            metrics.count("bytes_uploaded", Path(file_path).stat().st_size)
             return True
 
         except (S3UploadFailedError, ClientError) as e:
@@ -44,35 +50,43 @@ def deploy_website(s3, file_path, bucket, s3_key, content_type, retries=3):
 
             if attempt == retries:
                 logger.error(f"Failed after {retries} attempts: {s3_key}")
+                metrics.count("upload_failures")
                 return False
 
+            metrics.count("upload_retries")
             time.sleep(2 ** attempt) 
 
         except Exception as e:
             logger.error(f"Unexpected error for {s3_key}: {e}")
             return False
 
+@metrics.timed()
 def calculate_md5(file_path):
     hash_md5 = hashlib.md5()
     with open(file_path, "rb") as f:
         for chunk in iter(lambda: f.read(4096), b""):
             hash_md5.update(chunk)
+    metrics.count("files_hashed")
     return hash_md5.hexdigest()
 
+@metrics.timed()
 def get_s3_objects_map(s3, bucket):
     objects_map = {}
 
     paginator = s3.get_paginator('list_objects_v2')
 
     for page in paginator.paginate(Bucket=bucket):
+        metrics.count("list_requests")
         if 'Contents' in page:
             for obj in page['Contents']:
                 key = obj['Key']
                 etag = obj['ETag'].strip('"')
                 objects_map[key] = etag
+            metrics.count("objects_listed", len(page['Contents']))
 
     return objects_map
 
+@metrics.timed()
 def validate_bucket(s3, bucket):
     try:
         s3.head_bucket(Bucket=bucket)
@@ -91,9 +105,22 @@ def validate_bucket(s3, bucket):
 
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Deploy the portfolio website to S3")
+    parser.add_argument("--source", default="/home/abou/week10-s3-portfolio/website", help="Website directory")
+    parser.add_argument("--bucket", default="my-abou-portfolio-site", help="Target bucket")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR, help="Write phase timings and counters here (deploy_website.prom, deploy_website_run.json)")
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
 def main():
-    local_dir = Path("/home/abou/week10-s3-portfolio/website")
-    bucket = "my-abou-portfolio-site"
+    args = parse_args()
+    profiler.start("deploy_website", args)
+    if args.metrics_dir:
+        metrics.enable("deploy_website")
+
+    local_dir = Path(args.source)
+    bucket = args.bucket
 
     stats = {
     "uploaded": 0,
@@ -153,5 +180,11 @@ def main():
     logger.info(f"Failed:   {stats['failed']}")
     logger.info("-" * 40)
 
+    if args.metrics_dir:
+        for name, value in stats.items():
+            metrics.count(f"files_{name}", value)
+        prom, report = metrics.write(args.metrics_dir)
+        logger.info(f"Metrics written: {prom}, {report}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Website Health Check
+asyncio replacement for `health_monitor.sh check`. Reads the same
+url,name,max_time config, probes every site concurrently (HEAD, like
+curl -I) over reused keep-alive connections, and appends the same
+FAST/SLOW/FAILED lines to logs/health.log and logs/errors.log.
+DNS, connect, TLS and time-to-first-byte are recorded separately, and
+every result also goes to the indexed store in health_store.py and
+the latency histograms in latency_histogram.py.
+
+    python health_check.py
+    python health_check.py --config sites.conf --concurrency 50 --interval 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import ssl
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from health_store import HEALTH_DB, HealthStore
+from latency_histogram import LatencyRollups
+
+CONFIG_FILE = Path(os.getenv("HEALTH_CONFIG", "configs/websites.conf"))
+LOG_DIR = Path(os.getenv("HEALTH_LOG_DIR", "logs"))
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONCURRENCY = 20
+MAX_IDLE_PER_HOST = 4
+
+GREEN = "\033[32m"
+RED = "\033[31m"
+RESET = "\033[0m"
+
+class Site:
+    def __init__(self, url, name, max_time):
+        self.url = url
+        self.name = name
+        self.max_time = max_time
+
+def load_sites(path):
+    sites = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            url, name, max_time = [part.strip() for part in line.split(",")[:3]]
+            sites.append(Site(url, name, int(max_time)))
+    return sites
+
+class ProbeResult:
+    def __init__(self, site):
+        self.site = site
+        self.timestamp = datetime.now()
+        self.status = 0
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.total = 0.0
+        self.reused = False
+        self.error = None
+
+    @property
+    def total_ms(self):
+        return round(self.total * 1000)
+
+    def to_dict(self):
+        return {
+            "ts": self.timestamp.isoformat(timespec="seconds"),
+            "name": self.site.name,
+            "url": self.site.url,
+            "status": self.status,
+            "dns_ms": round(self.dns * 1000, 2),
+            "connect_ms": round(self.connect * 1000, 2),
+            "tls_ms": round(self.tls * 1000, 2),
+            "ttfb_ms": round(self.ttfb * 1000, 2),
+            "total_ms": self.total_ms,
+            "max_ms": self.site.max_time,
+            "reused": self.reused,
+            "error": self.error,
+        }
+
+# ===== CONNECTIONS =====
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host, port)"""
+    def __init__(self, ssl_context):
+        self.ssl_context = ssl_context
+        self.idle = {}
+        self.opened = 0
+
+    def take(self, key):
+        connections = self.idle.get(key, [])
+        while connections:
+            reader, writer = connections.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    def put(self, key, reader, writer):
+        connections = self.idle.setdefault(key, [])
+        if len(connections) < MAX_IDLE_PER_HOST:
+            connections.append((reader, writer))
+        else:
+            writer.close()
+
+    async def open(self, scheme, host, port, result):
+        loop = asyncio.get_running_loop()
+
+        start = time.perf_counter()
+        addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        result.dns = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sock = None
+        for family, type_, proto, _, address in addresses:
+            sock = socket.socket(family, type_, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, address)
+                break
+            except OSError:
+                sock.close()
+                sock = None
+        if sock is None:
+            raise ConnectionError(f"could not connect to {host}:{port}")
+        result.connect = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if scheme == "https":
+            reader, writer = await asyncio.open_connection(sock=sock, ssl=self.ssl_context, server_hostname=host)
+        else:
+            reader, writer = await asyncio.open_connection(sock=sock)
+        result.tls = time.perf_counter() - start
+
+        self.opened += 1
+        return reader, writer
+
+    def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+# ===== PROBES =====
+
+async def send_head(reader, writer, host, path):
+    """HEAD request on an open connection; returns (status, keep_alive, ttfb)"""
+    writer.write(
+        f"HEAD {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: health_check/1.0\r\n"
+        f"Accept: */*\r\nConnection: keep-alive\r\n\r\n".encode()
+    )
+    await writer.drain()
+
+    start = time.perf_counter()
+    first = await reader.readexactly(1)
+    ttfb = time.perf_counter() - start
+    head = first + await reader.readuntil(b"\r\n\r\n")
+
+    lines = head.decode("latin-1").split("\r\n")
+    version, status = lines[0].split(" ", 2)[:2]
+    headers = {k.strip().lower(): v.strip().lower() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+    keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+    return int(status), keep_alive, ttfb
+
+async def probe(site, pool):
+    result = ProbeResult(site)
+    url = urlsplit(site.url)
+    scheme = url.scheme or "http"
+    host = url.hostname
+    port = url.port or (443 if scheme == "https" else 80)
+    path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+    host_header = url.netloc.rpartition("@")[2]
+    key = (scheme, host, port)
+
+    start = time.perf_counter()
+    connection = None
+    try:
+        connection = pool.take(key)
+        result.reused = connection is not None
+        try:
+            if connection is None:
+                connection = await pool.open(scheme, host, port, result)
+            status, keep_alive, result.ttfb = await send_head(*connection, host_header, path)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            if not result.reused:
+                raise
+            # The server dropped the idle connection; retry once on a fresh one
+            connection[1].close()
+            result.reused = False
+            connection = await pool.open(scheme, host, port, result)
+            status, keep_alive, result.ttfb = await send_head(*connection, host_header, path)
+
+        result.status = status
+        if keep_alive:
+            pool.put(key, *connection)
+        else:
+            connection[1].close()
+    except asyncio.CancelledError:
+        # Timed out mid-request: the connection is in an unknown state
+        if connection:
+            connection[1].close()
+        raise
+    except Exception as e:
+        result.status = 0
+        result.error = str(e) or type(e).__name__
+    result.total = time.perf_counter() - start
+    return result
+
+async def probe_with_timeout(site, pool, semaphore, timeout):
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(probe(site, pool), timeout)
+        except asyncio.TimeoutError:
+            # curl --max-time reports 000 and the full timeout
+            result = ProbeResult(site)
+            result.total = timeout
+            result.error = "timeout"
+            return result
+
+async def run_checks(sites, pool, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """Probe every site; results come back in config order"""
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(probe_with_timeout(site, pool, semaphore, timeout) for site in sites))
+
+# ===== LOGGING =====
+
+def format_line(result):
+    """The same line health_monitor.sh writes, colors included"""
+    site = result.site
+    stamp = result.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    speed = f"{GREEN}FAST{RESET}" if result.total_ms < site.max_time else f"{RED}SLOW{RESET}"
+
+    if result.status == 0:
+        return f"[{stamp}] {site.name} - ---- (status: {RED}Unreachable (FAILED){RESET}, TIME: ----)", True
+    if 200 <= result.status < 400:
+        return f"[{stamp}] {site.name} - {speed} (status: {GREEN}{result.status} (SUCCESS){RESET}, TIME: {result.total_ms}ms)", False
+    return f"[{stamp}] {site.name} -{speed} (status: {RED}{result.status} (FAILED){RESET}, TIME: {result.total_ms}ms)", True
+
+def write_results(results, log_dir, timings_file=None):
+    log_lines, error_lines = [], []
+    for result in results:
+        line, failed = format_line(result)
+        log_lines.append(line + "\n")
+        if failed:
+            error_lines.append(line + "\n")
+
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with open(log_dir / "health.log", "a") as f:
+        f.writelines(log_lines)
+    if error_lines:
+        with open(log_dir / "errors.log", "a") as f:
+            f.writelines(error_lines)
+    if timings_file:
+        with open(timings_file, "a") as f:
+            f.writelines(json.dumps(result.to_dict()) + "\n" for result in results)
+
+def print_timings(results):
+    print(f"{'site':<16} {'status':>6} {'dns':>8} {'connect':>8} {'tls':>8} {'ttfb':>8} {'total':>8}  reused")
+    for r in results:
+        d = r.to_dict()
+        print(f"{r.site.name:<16} {r.status:>6} {d['dns_ms']:>8.1f} {d['connect_ms']:>8.1f} {d['tls_ms']:>8.1f} "
+              f"{d['ttfb_ms']:>8.1f} {d['total_ms']:>8}  {'yes' if r.reused else 'no'}")
+
+async def run(args):
+    sites = load_sites(args.config)
+    context = ssl.create_default_context()
+    if args.insecure:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    pool = ConnectionPool(context)
+    timings_file = args.timings or args.log_dir / "health_timings.jsonl"
+    store = HealthStore(args.db)
+    rollups = LatencyRollups(args.db)
+    rollups.prune()
+
+    try:
+        for round_number in range(args.rounds):
+            if round_number:
+                await asyncio.sleep(args.interval)
+
+            print("=== Websites Checks ====")
+            start = time.perf_counter()
+            results = await run_checks(sites, pool, args.concurrency, args.timeout)
+            write_results(results, args.log_dir, timings_file)
+            store.add_results(results)
+            for result in results:
+                if result.status:
+                    rollups.record(result.site.name, result.timestamp.timestamp(), result.total_ms)
+            rollups.flush()
+            if args.verbose:
+                print_timings(results)
+            failed = sum(1 for r in results if not 200 <= r.status < 400)
+            print(f"Checked {len(results)} sites in {time.perf_counter() - start:.2f}s "
+                  f"({failed} failed, {pool.opened} connections opened so far)")
+    finally:
+        pool.close()
+        store.close()
+        rollups.close()
+
+    print("")
+    print("✓ Health checks completed!")
+    print(f"Results saved to: {args.log_dir / 'health.log'}")
+    print(f"Timings saved to: {timings_file}")
+    print(f"Queryable store: {args.db} (see health_store.py)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent website health checks")
+    parser.add_argument("--config", type=Path, default=CONFIG_FILE, help=f"url,name,max_time file (default: {CONFIG_FILE})")
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help=f"Where health.log and errors.log go (default: {LOG_DIR})")
+    parser.add_argument("--db", type=Path, default=HEALTH_DB, help=f"Structured results store (default: {HEALTH_DB})")
+    parser.add_argument("--timings", type=Path, help="JSONL file for per-phase timings (default: <log-dir>/health_timings.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Probes in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help=f"Per-site max time in seconds (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--rounds", type=int, default=1, help="Number of check rounds; connections are reused across rounds")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between rounds (default: 60)")
+    parser.add_argument("--insecure", action="store_true", help="Don't verify TLS certificates")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print per-phase timings for each site")
+    return parser.parse_args()
+
+def main():
+    asyncio.run(run(parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Health Report
+Incremental version of `health_monitor.sh report` and `status`: per-day
+rollups of logs/health.log (and per-site failure counts from
+logs/errors.log) are kept in a small state file and updated from only the
+lines appended since the last run, so reports cost the same however large
+the logs grow.
+
+    python health_report.py report
+    python health_report.py report --date 2025-11-17 --json
+    python health_report.py status
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import date
+from pathlib import Path
+
+from log_checkpoint import Checkpoint, load_state, save_state
+
+LOG_DIR = Path(os.getenv("HEALTH_LOG_DIR", "logs"))
+CONFIG_FILE = Path(os.getenv("HEALTH_CONFIG", "configs/websites.conf"))
+SLOWEST_KEPT = 3
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+MS_RE = re.compile(r"([0-9]+)ms")
+
+def new_day():
+    return {
+        "total": 0,
+        "success": 0,
+        "time_sum": 0,
+        "time_count": 0,
+        "unreachable": [],
+        "failed": [],
+        "slow": [],
+        "slowest": [],
+    }
+
+def configured_sites(path):
+    """Site names from the url,name,max_time config, in order"""
+    names = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                names.append(line.split(",")[1].strip())
+    return names
+
+def add_site(sites, name):
+    if name not in sites:
+        sites.append(name)
+
+class HealthRollup:
+    """Per-day aggregates for the daily report, plus the latest line per site"""
+    def __init__(self, state=None):
+        state = state or {}
+        self.days = state.get("days", {})
+        self.last = state.get("last", {})
+        self.errors = state.get("errors", {})
+
+    def to_state(self):
+        return {"days": self.days, "last": self.last, "errors": self.errors}
+
+    def add_health_line(self, raw):
+        line = ANSI_RE.sub("", raw)
+        parts = line.split()
+        if len(parts) < 3 or not line.startswith("["):
+            return
+        day, name = line[1:11], parts[2]
+        stats = self.days.setdefault(day, new_day())
+        self.last[name] = raw
+
+        stats["total"] += 1
+        if "SUCCESS" in line:
+            stats["success"] += 1
+            for ms in MS_RE.findall(line):
+                stats["time_sum"] += int(ms)
+                stats["time_count"] += 1
+        if "Unreachable" in line:
+            add_site(stats["unreachable"], name)
+        elif "FAILED" in line:
+            add_site(stats["failed"], name)
+        if "SLOW" in line:
+            add_site(stats["slow"], name)
+
+        if "Unreachable" not in line:
+            for part in parts:
+                if (m := MS_RE.search(part)):
+                    stats["slowest"].append([int(m.group(1)), name])
+            stats["slowest"] = sorted(stats["slowest"], reverse=True)[:SLOWEST_KEPT]
+
+    def add_error_line(self, raw):
+        line = ANSI_RE.sub("", raw)
+        parts = line.split()
+        if len(parts) < 3 or not line.startswith("["):
+            return
+        per_site = self.errors.setdefault(line[1:11], {})
+        per_site[parts[2]] = per_site.get(parts[2], 0) + 1
+
+    def report(self, day):
+        stats = self.days.get(day, new_day())
+        total = stats["total"]
+        return {
+            "date": day,
+            "total_checks": total,
+            "success_rate": stats["success"] * 100 // total if total else 0,
+            "average_ms": stats["time_sum"] // stats["time_count"] if stats["time_count"] else 0,
+            "unreachable": sorted(stats["unreachable"]),
+            "failed": sorted(stats["failed"]),
+            "slow": sorted(stats["slow"]),
+            "slowest": [{"site": name, "ms": ms} for ms, name in stats["slowest"]],
+            "errors_logged": self.errors.get(day, {}),
+        }
+
+def format_report(report):
+    lines = [
+        f"Total checks performed: {report['total_checks']}",
+        f"Success rate: {report['success_rate']}%",
+        f"Average response time: {report['average_ms']}ms",
+        "Sites with issues:",
+        "- Unreachable Sites",
+        *report["unreachable"],
+        "- Failed Sites (HTTP Errors)",
+        *report["failed"],
+        "- Slow Sites",
+        *report["slow"],
+        "Slowest sites:",
+        *[f"{entry['site']} - {entry['ms']}ms" for entry in report["slowest"]],
+    ]
+    return "\n".join(lines) + "\n"
+
+def update(log_dir, state_file):
+    """Fold the lines appended to health.log and errors.log into the saved rollups"""
+    state = load_state(state_file)
+    rollup = HealthRollup(state.get("rollup"))
+    checkpoints = state.get("checkpoints", {})
+
+    for name, handler in [("health.log", rollup.add_health_line), ("errors.log", rollup.add_error_line)]:
+        path = os.path.abspath(log_dir / name)
+        checkpoint = Checkpoint.from_dict(checkpoints[name]) if name in checkpoints and checkpoints[name]["path"] == path else Checkpoint(path)
+        for block in checkpoint.read_new():
+            for line in block.decode("utf-8", errors="replace").splitlines():
+                handler(line)
+        checkpoints[name] = checkpoint.to_dict()
+        if checkpoint.event != "unchanged":
+            print(f"{name}: {checkpoint.event}, read {checkpoint.bytes_read} new bytes", file=sys.stderr)
+
+    save_state(state_file, {"checkpoints": checkpoints, "rollup": rollup.to_state()})
+    return rollup
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Incremental website health report")
+    parser.add_argument("command", choices=["report", "status"])
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help=f"Directory with health.log and errors.log (default: {LOG_DIR})")
+    parser.add_argument("--state", type=Path, help="State file (default: <log-dir>/.health_state.json)")
+    parser.add_argument("--date", default=date.today().isoformat(), help="Day to report on (default: today)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON instead of writing the report file")
+    parser.add_argument("--config", type=Path, default=CONFIG_FILE, help=f"Sites shown by status (default: {CONFIG_FILE})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    rollup = update(args.log_dir, args.state or args.log_dir / ".health_state.json")
+
+    if args.command == "status":
+        print("=== Current Website Status ===")
+        print()
+        # Like health_monitor.sh: only sites still in the config, in config order
+        for name in configured_sites(args.config):
+            if name in rollup.last:
+                print(rollup.last[name])
+        return
+
+    report = rollup.report(args.date)
+    if args.json:
+        print(json.dumps(report, indent=4))
+        return
+
+    print("=== Daily Report ===")
+    report_file = args.log_dir / "daily_reports" / f"report_{args.date}.txt"
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    report_file.write_text(format_report(report))
+    print()
+    print("✓ Daily report generated!")
+    print(f"Report saved to: {report_file}")
+
+if __name__ == "__main__":
+    main()
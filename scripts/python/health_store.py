@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Health Store
+Structured, indexed storage for health check results (SQLite), so the
+daily report, current status and slowest-site queries are index lookups
+instead of greps over the colored text log.
+
+    python health_store.py import-text logs/health.log
+    python health_store.py report --date 2025-11-17
+    python health_store.py status
+    python health_store.py slowest --date 2025-11-17 --limit 5
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from datetime import date
+from pathlib import Path
+
+from health_report import ANSI_RE, format_report
+
+HEALTH_DB = Path(os.getenv("HEALTH_DB", "logs/health.db"))
+
+SUCCESS = "SUCCESS"
+FAILED = "FAILED"
+UNREACHABLE = "UNREACHABLE"
+
+# [2025-11-16 05:27:02] Google - FAST (status: 301 (SUCCESS), TIME: 336ms)
+# [2025-11-16 05:27:11] FakeSite - ---- (status: Unreachable (FAILED), TIME: ----)
+TEXT_LINE_RE = re.compile(
+    r"^\[(\S+ \S+)\] (\S+) -\s*(FAST|SLOW|----) \(status: (\d+|Unreachable) \((SUCCESS|FAILED)\), TIME: (\d+)?(?:ms|----)\)"
+)
+
+def outcome_for(status):
+    if status == 0:
+        return UNREACHABLE
+    return SUCCESS if 200 <= status < 400 else FAILED
+
+class HealthStore:
+    def __init__(self, db_path=HEALTH_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checks (
+                id INTEGER PRIMARY KEY,
+                ts TEXT NOT NULL,
+                day TEXT NOT NULL,
+                name TEXT NOT NULL,
+                url TEXT,
+                status INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                slow INTEGER,
+                total_ms INTEGER,
+                dns_ms REAL,
+                connect_ms REAL,
+                tls_ms REAL,
+                ttfb_ms REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_checks_day_name ON checks (day, name);
+            CREATE INDEX IF NOT EXISTS idx_checks_day_total ON checks (day, total_ms);
+            CREATE INDEX IF NOT EXISTS idx_checks_name_ts ON checks (name, ts);
+
+            -- Latest check per site, kept current on insert
+            CREATE TABLE IF NOT EXISTS latest (
+                name TEXT PRIMARY KEY,
+                check_id INTEGER NOT NULL,
+                ts TEXT NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def add(self, rows):
+        """rows: dicts with ts (ISO), name, status, and optionally url, slow, total_ms and phase timings"""
+        with self.conn:
+            for row in rows:
+                cursor = self.conn.execute(
+                    """INSERT INTO checks (ts, day, name, url, status, outcome, slow, total_ms, dns_ms, connect_ms, tls_ms, ttfb_ms)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        row["ts"], row["ts"][:10], row["name"], row.get("url"), row["status"],
+                        outcome_for(row["status"]), row.get("slow"), row.get("total_ms"),
+                        row.get("dns_ms"), row.get("connect_ms"), row.get("tls_ms"), row.get("ttfb_ms"),
+                    )
+                )
+                self.conn.execute(
+                    """INSERT INTO latest (name, check_id, ts) VALUES (?, ?, ?)
+                       ON CONFLICT (name) DO UPDATE SET check_id = excluded.check_id, ts = excluded.ts
+                       WHERE excluded.ts >= latest.ts""",
+                    (row["name"], cursor.lastrowid, row["ts"])
+                )
+
+    def add_results(self, results):
+        """Store health_check.py ProbeResults"""
+        self.add(
+            {**result.to_dict(), "ts": result.timestamp.isoformat(sep=" ", timespec="seconds"),
+             "slow": int(result.total_ms >= result.site.max_time) if result.status else None,
+             "total_ms": result.total_ms if result.status else None}
+            for result in results
+        )
+
+    def report(self, day):
+        total, success, average = self.conn.execute(
+            """SELECT COUNT(*), SUM(outcome = 'SUCCESS'), AVG(CASE WHEN outcome = 'SUCCESS' THEN total_ms END)
+               FROM checks WHERE day = ?""",
+            (day,)
+        ).fetchone()
+
+        def sites(condition):
+            return [name for (name,) in self.conn.execute(
+                f"SELECT DISTINCT name FROM checks WHERE day = ? AND {condition} ORDER BY name", (day,)
+            )]
+
+        return {
+            "date": day,
+            "total_checks": total,
+            "success_rate": (success or 0) * 100 // total if total else 0,
+            "average_ms": int(average or 0),
+            "unreachable": sites("outcome = 'UNREACHABLE'"),
+            "failed": sites("outcome = 'FAILED'"),
+            "slow": sites("slow = 1"),
+            "slowest": [{"site": name, "ms": ms} for name, ms in self.slowest(day, 3)],
+        }
+
+    def slowest(self, day, limit=3):
+        return self.conn.execute(
+            """SELECT name, total_ms FROM checks
+               WHERE day = ? AND total_ms IS NOT NULL ORDER BY total_ms DESC LIMIT ?""",
+            (day, limit)
+        ).fetchall()
+
+    def status(self):
+        return self.conn.execute(
+            """SELECT c.ts, c.name, c.status, c.outcome, c.slow, c.total_ms
+               FROM latest l JOIN checks c ON c.id = l.check_id ORDER BY c.name"""
+        ).fetchall()
+
+    def import_text(self, path):
+        """Load an existing health.log; returns (imported, skipped) line counts"""
+        rows, skipped = [], 0
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                m = TEXT_LINE_RE.match(ANSI_RE.sub("", line.strip()))
+                if not m:
+                    skipped += 1 if line.strip() else 0
+                    continue
+                ts, name, speed, status, _, total_ms = m.groups()
+                rows.append({
+                    "ts": ts,
+                    "name": name,
+                    "status": 0 if status == "Unreachable" else int(status),
+                    "slow": None if speed == "----" else int(speed == "SLOW"),
+                    "total_ms": int(total_ms) if total_ms else None,
+                })
+        self.add(rows)
+        return len(rows), skipped
+
+    def close(self):
+        self.conn.close()
+
+def format_status(row):
+    ts, name, status, outcome, slow, total_ms = row
+    if outcome == UNREACHABLE:
+        return f"[{ts}] {name} - Unreachable"
+    speed = "SLOW" if slow else "FAST"
+    return f"[{ts}] {name} - {speed} (status: {status} ({outcome}), TIME: {total_ms}ms)"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query the structured health check store")
+    parser.add_argument("--db", type=Path, default=HEALTH_DB, help=f"Store location (default: {HEALTH_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report = sub.add_parser("report", help="Daily summary, same format as health_monitor.sh report")
+    report.add_argument("--date", default=date.today().isoformat())
+    report.add_argument("--json", action="store_true")
+    report.add_argument("--output", help="Write the report to this file instead of stdout")
+
+    sub.add_parser("status", help="Latest result per site")
+
+    slowest = sub.add_parser("slowest", help="Slowest checks of a day")
+    slowest.add_argument("--date", default=date.today().isoformat())
+    slowest.add_argument("--limit", type=int, default=3)
+
+    importer = sub.add_parser("import-text", help="Convert an existing text health.log")
+    importer.add_argument("path")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    store = HealthStore(args.db)
+
+    if args.command == "import-text":
+        imported, skipped = store.import_text(args.path)
+        print(f"Imported {imported} checks from {args.path} ({skipped} unparsable lines skipped)")
+    elif args.command == "report":
+        report = store.report(args.date)
+        text = json.dumps(report, indent=4) + "\n" if args.json else format_report(report)
+        if args.output:
+            Path(args.output).write_text(text)
+            print(f"Report saved to: {args.output}")
+        else:
+            print(text, end="")
+    elif args.command == "status":
+        print("=== Current Website Status ===")
+        for row in store.status():
+            print(format_status(row))
+    else:
+        for name, ms in store.slowest(args.date, args.limit):
+            print(f"{name} - {ms}ms")
+
+    store.close()
+
+if __name__ == "__main__":
+    main()
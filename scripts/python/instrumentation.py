@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Run Instrumentation
+Phase timing spans and counters for backup.py, s3_sync.py and
+deploy_website.py. Disabled by default: decorated phases then cost one
+attribute check per call. When enabled, a run ends by writing a
+Prometheus textfile (for node_exporter's textfile collector) and a JSON
+run report with per-phase totals, counters and the span trace.
+
+The same module provides the --profile option shared by the CLI entry
+points: a cProfile .pstats file or sampled stacks in collapsed
+(flamegraph.pl / speedscope) format, plus optional tracemalloc snapshots
+taken when each top-level phase ends.
+
+    from instrumentation import metrics
+
+    @metrics.timed("compress_directory")
+    def compress_directory(...): ...
+
+    with metrics.span("s3_rotation"):
+        ...
+    metrics.count("bytes_uploaded", size)
+
+    metrics.enable("backup")            # from main(), e.g. when --metrics-dir is given
+    metrics.write(Path("logs/metrics"))
+
+    add_profile_arguments(parser)       # --profile [cprofile|sample], --profile-memory, --profile-dir
+    profiler.start("backup", args)      # no-op unless --profile; results are written at exit
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+
+# Per-phase totals are always kept; individual spans beyond this are only counted
+MAX_TRACE_SPANS = 10000
+
+PROFILE_MODES = ["cprofile", "sample"]
+SAMPLE_INTERVAL = 0.005
+TRACEMALLOC_FRAMES = 25
+MAX_SNAPSHOTS = 50
+
+_NULL_SPAN = nullcontext()
+
+class PhaseStats:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.errors = 0
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            "max_seconds": round(self.max_seconds, 6),
+            "errors": self.errors,
+        }
+
+class Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        stack = self.metrics._stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        self.metrics._stack().pop()
+        self.metrics._finish(self, duration, exc_type is not None)
+        return False
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.job = None
+        # Called with the phase name when a top-level phase ends on the main thread
+        self.on_phase_end = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.counters = {}
+        self.trace = []
+        self.dropped_spans = 0
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+
+    def enable(self, job):
+        self.enabled = True
+        self.job = job
+        self.reset()
+
+    # ===== RECORDING =====
+
+    def span(self, name):
+        """Context manager timing one phase; a shared no-op when disabled"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+    def timed(self, name=None):
+        """Decorator form of span(); the phase defaults to the function name"""
+        def decorator(func):
+            phase = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self, phase):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span, duration, failed):
+        with self._lock:
+            stats = self.phases.get(span.name)
+            if stats is None:
+                stats = self.phases[span.name] = PhaseStats()
+            stats.calls += 1
+            stats.seconds += duration
+            stats.max_seconds = max(stats.max_seconds, duration)
+            stats.errors += failed
+            if len(self.trace) < MAX_TRACE_SPANS:
+                self.trace.append({
+                    "name": span.name,
+                    "parent": span.parent,
+                    "thread": threading.current_thread().name,
+                    "start": round(span.start - self.start, 6),
+                    "seconds": round(duration, 6),
+                    "error": failed,
+                })
+            else:
+                self.dropped_spans += 1
+        if self.on_phase_end and span.parent is None and threading.current_thread() is threading.main_thread():
+            self.on_phase_end(span.name)
+
+    # ===== EXPORT =====
+
+    def report(self):
+        return {
+            "job": self.job,
+            "started": self.started.isoformat(timespec="seconds"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self.start, 6),
+            "phases": {name: stats.to_dict() for name, stats in self.phases.items()},
+            "counters": dict(self.counters),
+            "trace": self.trace,
+            "dropped_spans": self.dropped_spans,
+        }
+
+    def prometheus(self):
+        prefix = self.job
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent in each phase during the last run",
+            f"# TYPE {prefix}_phase_seconds gauge",
+        ]
+        lines += [f'{prefix}_phase_seconds{{phase="{name}"}} {stats.seconds:.6f}' for name, stats in self.phases.items()]
+        lines += [
+            f"# HELP {prefix}_phase_calls Calls of each phase during the last run",
+            f"# TYPE {prefix}_phase_calls gauge",
+        ]
+        lines += [f'{prefix}_phase_calls{{phase="{name}"}} {stats.calls}' for name, stats in self.phases.items()]
+        lines += [
+            f"# HELP {prefix}_phase_errors Phase calls that raised during the last run",
+            f"# TYPE {prefix}_phase_errors gauge",
+        ]
+        lines += [f'{prefix}_phase_errors{{phase="{name}"}} {stats.errors}' for name, stats in self.phases.items()]
+        for name, value in sorted(self.counters.items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        lines += [
+            f"# TYPE {prefix}_run_duration_seconds gauge",
+            f"{prefix}_run_duration_seconds {time.perf_counter() - self.start:.6f}",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {time.time():.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory):
+        """Write <job>.prom and <job>_run.json; returns their paths, or None when disabled"""
+        if not self.enabled:
+            return None
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        prom = directory / f"{self.job}.prom"
+        report = directory / f"{self.job}_run.json"
+        # The textfile collector may read at any moment, so never expose a partial file
+        for path, text in ((prom, self.prometheus()), (report, json.dumps(self.report(), indent=4) + "\n")):
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(text)
+            os.replace(tmp, path)
+        return prom, report
+
+metrics = Metrics()
+
+# ===== PROFILING =====
+
+class StackSampler:
+    """Samples every thread's stack at a fixed interval into collapsed-stack counts"""
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                calls = []
+                while frame is not None:
+                    code = frame.f_code
+                    calls.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                calls.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(calls))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+
+    def start(self, job, args):
+        """Start profiling if args.profile is set; everything is written when the process exits"""
+        if not getattr(args, "profile", None):
+            return
+        self.enabled = True
+        self.mode = args.profile
+        self.memory = args.profile_memory
+        directory = Path(args.profile_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.base = directory / f"{job}-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.snapshots = []
+        self.threads = []
+
+        if self.memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            metrics.on_phase_end = self.snapshot
+            if not metrics.enabled:
+                metrics.enable(job)
+
+        if self.mode == "sample":
+            self.sampler = StackSampler()
+            self.sampler.start()
+        else:
+            self.profile = cProfile.Profile()
+            # Before 3.12 cProfile only sees the thread that enabled it, so each new thread
+            # gets its own; from 3.12 it uses sys.monitoring, sees every thread, and a
+            # second enable() would raise
+            if sys.version_info < (3, 12):
+                threading.setprofile(self._profile_thread)
+            self.profile.enable()
+        atexit.register(self.stop)
+
+    def _profile_thread(self, frame, event, arg):
+        profile = cProfile.Profile()
+        self.threads.append(profile)
+        profile.enable()
+
+    def snapshot(self, label):
+        """Record a tracemalloc snapshot (with --profile-memory) labelled with the phase that just ended"""
+        if self.enabled and self.memory:
+            self._take_snapshot(label)
+
+    def _take_snapshot(self, label):
+        if len(self.snapshots) >= MAX_SNAPSHOTS:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        self.snapshots.append((label, current, peak, snapshot))
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        written = []
+
+        if self.mode == "sample":
+            self.sampler.stop()
+            self.sampler.write(f"{self.base}.folded")
+            written.append(f"{self.base}.folded")
+        else:
+            self.profile.disable()
+            if sys.version_info < (3, 12):
+                threading.setprofile(None)
+            stats = pstats.Stats(self.profile)
+            for profile in self.threads:
+                profile.disable()
+                stats.add(profile)
+            stats.dump_stats(f"{self.base}.pstats")
+            written.append(f"{self.base}.pstats")
+
+        if self.memory:
+            self.snapshots = self.snapshots[:MAX_SNAPSHOTS - 1]
+            self._take_snapshot("exit")
+            tracemalloc.stop()
+            written.append(self._write_memory())
+
+        print(f"Profile written: {', '.join(str(path) for path in written)}", file=sys.stderr)
+
+    def _write_memory(self):
+        """Snapshots as .tracemalloc files plus a text summary of the top allocation sites"""
+        directory = Path(f"{self.base}.memory")
+        directory.mkdir(exist_ok=True)
+        lines = []
+        previous = None
+        for number, (label, current, peak, snapshot) in enumerate(self.snapshots, 1):
+            snapshot.dump(str(directory / f"{number:02d}-{label}.tracemalloc"))
+            lines.append(f"=== {number:02d} {label}: current {current / 1024:.1f} KiB, peak since last {peak / 1024:.1f} KiB ===")
+            if previous is None:
+                top = snapshot.statistics("lineno")[:10]
+            else:
+                top = snapshot.compare_to(previous, "lineno")[:10]
+            lines.extend(f"  {stat}" for stat in top)
+            previous = snapshot
+        (directory / "summary.txt").write_text("\n".join(lines) + "\n")
+        return directory
+
+profiler = Profiler()
+
+def add_profile_arguments(parser, directory="logs"):
+    """The shared --profile options; results go to `directory`, normally the one holding the run log"""
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES,
+                        help="Profile this run: cprofile (.pstats, the default) or sample (collapsed stacks for flame graphs)")
+    parser.add_argument("--profile-memory", action="store_true", help="With --profile, also take tracemalloc snapshots as each phase ends")
+    parser.add_argument("--profile-dir", default=directory, help=f"Where profile output goes (default: {directory})")
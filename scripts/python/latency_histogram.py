@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Latency Histograms
+HDR-style log-linear histograms of response times per site, rolled up
+into minute/hour/day buckets with retention, so p50/p95/p99 over any
+window come from merging a few small histograms instead of rescanning
+raw results.
+
+    python latency_histogram.py query --since "2025-11-17 00:00" --until "2025-11-18 00:00"
+    python latency_histogram.py query --site GitHub --last 3600
+    python latency_histogram.py backfill
+    python latency_histogram.py prune
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+LATENCY_DB = Path(os.getenv("HEALTH_DB", "logs/health.db"))
+
+# 2**SUB_BITS sub-buckets per power of two: values are kept to within
+# 1/64 (~1.6%) of their true value, with at most ~1100 buckets up to an hour
+SUB_BITS = 7
+HALF = 1 << (SUB_BITS - 1)
+MAX_MS = 3_600_000
+
+# Buckets are aligned to the epoch, so days are UTC days
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+RETENTION = {"minute": 2 * 86400, "hour": 35 * 86400, "day": 400 * 86400}
+
+def bucket_index(ms):
+    v = min(max(int(ms), 0), MAX_MS)
+    if v < 2 * HALF:
+        return v
+    shift = v.bit_length() - SUB_BITS
+    return HALF * shift + (v >> shift)
+
+def bucket_value(index):
+    """Highest value that lands in the bucket (what percentiles report)"""
+    if index < 2 * HALF:
+        return index
+    shift = index // HALF - 1
+    mantissa = index - HALF * shift
+    return (mantissa << shift) + (1 << shift) - 1
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, ms, count=1):
+        index = bucket_index(ms)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += ms * count
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "min_ms": self.min,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+        }
+
+    def to_json(self):
+        return json.dumps({"n": self.count, "t": self.total, "lo": self.min, "hi": self.max, "b": self.counts},
+                          separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["b"].items()}
+        histogram.count, histogram.total, histogram.min, histogram.max = data["n"], data["t"], data["lo"], data["hi"]
+        return histogram
+
+# ===== ROLLUPS =====
+
+class LatencyRollups:
+    """Per-site histograms in minute, hour and day buckets (SQLite)"""
+    def __init__(self, db_path=LATENCY_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS latency (
+                   site TEXT NOT NULL,
+                   resolution TEXT NOT NULL,
+                   start INTEGER NOT NULL,
+                   histogram TEXT NOT NULL,
+                   PRIMARY KEY (site, resolution, start)
+               )"""
+        )
+        self.conn.commit()
+        self.pending = {}
+
+    def record(self, site, ts, ms):
+        """Buffer one result; call flush() to write"""
+        for resolution, seconds in RESOLUTIONS.items():
+            key = (site, resolution, int(ts) // seconds * seconds)
+            self.pending.setdefault(key, LatencyHistogram()).record(ms)
+
+    def flush(self):
+        with self.conn:
+            for (site, resolution, start), histogram in self.pending.items():
+                row = self.conn.execute(
+                    "SELECT histogram FROM latency WHERE site = ? AND resolution = ? AND start = ?",
+                    (site, resolution, start)
+                ).fetchone()
+                if row:
+                    histogram = LatencyHistogram.from_json(row[0]).merge(histogram)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO latency (site, resolution, start, histogram) VALUES (?, ?, ?, ?)",
+                    (site, resolution, start, histogram.to_json())
+                )
+        self.pending.clear()
+
+    def prune(self, now=None):
+        now = now or time.time()
+        removed = 0
+        with self.conn:
+            for resolution, keep in RETENTION.items():
+                removed += self.conn.execute(
+                    "DELETE FROM latency WHERE resolution = ? AND start < ?", (resolution, now - keep)
+                ).rowcount
+        return removed
+
+    def sites(self):
+        return [site for (site,) in self.conn.execute("SELECT DISTINCT site FROM latency ORDER BY site")]
+
+    def _buckets(self, site, resolution, since, until):
+        return {
+            start: histogram for start, histogram in self.conn.execute(
+                "SELECT start, histogram FROM latency WHERE site = ? AND resolution = ? AND start >= ? AND start < ?",
+                (site, resolution, since, until)
+            )
+        }
+
+    def query(self, site, since, until, now=None):
+        """Merged histogram for [since, until), using the coarsest buckets that fit the window.
+
+        Where minute (or hour) buckets have already expired, the enclosing hour
+        (or day) is used instead, so the start of an old window is approximate.
+        """
+        now = now or time.time()
+        since = int(since) // 60 * 60
+        until = -(-int(until) // 60) * 60
+        first_day = since // RESOLUTIONS["day"] * RESOLUTIONS["day"]
+        stored = {resolution: self._buckets(site, resolution, first_day, until) for resolution in RESOLUTIONS}
+
+        result = LatencyHistogram()
+        position = since
+        while position < until:
+            resolution = next(
+                r for r in ("day", "hour", "minute")
+                if position % RESOLUTIONS[r] == 0 and position + RESOLUTIONS[r] <= until or r == "minute"
+            )
+            while resolution != "day" and position < now - RETENTION[resolution]:
+                resolution = "hour" if resolution == "minute" else "day"
+                position = position // RESOLUTIONS[resolution] * RESOLUTIONS[resolution]
+
+            if position in stored[resolution]:
+                result.merge(LatencyHistogram.from_json(stored[resolution][position]))
+            position += RESOLUTIONS[resolution]
+        return result
+
+    def close(self):
+        self.conn.close()
+
+def parse_time(value):
+    return datetime.fromisoformat(value).timestamp()
+
+def backfill(rollups):
+    """Rebuild the rollups from health_store.py's checks table, which keeps every result.
+
+    health_check.py already records each result in both, so the rollups are
+    replaced rather than added to, in one transaction; rerunning gives the same result.
+    """
+    conn = rollups.conn
+    rollups.pending.clear()
+    count = 0
+    with conn:
+        # Hold the write lock so a concurrent health check can't land between the read and the rewrite
+        conn.execute("BEGIN IMMEDIATE")
+        for ts, name, total_ms in conn.execute("SELECT ts, name, total_ms FROM checks WHERE total_ms IS NOT NULL"):
+            rollups.record(name, parse_time(ts), total_ms)
+            count += 1
+        conn.execute("DELETE FROM latency")
+        conn.executemany(
+            "INSERT INTO latency (site, resolution, start, histogram) VALUES (?, ?, ?, ?)",
+            [(site, resolution, start, histogram.to_json()) for (site, resolution, start), histogram in rollups.pending.items()]
+        )
+    rollups.pending.clear()
+    rollups.prune()
+    return count
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-site latency percentiles from rolled-up histograms")
+    parser.add_argument("--db", type=Path, default=LATENCY_DB, help=f"Database (default: {LATENCY_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query = sub.add_parser("query", help="p50/p95/p99 per site over a window")
+    query.add_argument("--site", help="Only this site (default: all)")
+    query.add_argument("--since", type=parse_time, help="Window start, ISO date/time")
+    query.add_argument("--until", type=parse_time, help="Window end, ISO date/time (default: now)")
+    query.add_argument("--last", type=int, default=86400, help="Window length in seconds when --since is not given (default: 86400)")
+    query.add_argument("--json", action="store_true")
+
+    sub.add_parser("backfill", help="Rebuild rollups from the checks table in the same database")
+    sub.add_parser("prune", help="Drop buckets past their retention")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    rollups = LatencyRollups(args.db)
+
+    if args.command == "backfill":
+        print(f"Rebuilt rollups from {backfill(rollups)} results")
+    elif args.command == "prune":
+        print(f"Removed {rollups.prune()} expired buckets")
+    else:
+        until = args.until or time.time()
+        since = args.since if args.since is not None else until - args.last
+        summaries = {site: rollups.query(site, since, until).summary() for site in ([args.site] if args.site else rollups.sites())}
+
+        if args.json:
+            print(json.dumps(summaries, indent=4))
+        else:
+            print(f"{'site':<16} {'count':>7} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+            for site, s in summaries.items():
+                if s["count"]:
+                    print(f"{site:<16} {s['count']:>7} {s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8} {s['max_ms']:>8}")
+
+    rollups.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Log Analyzer
+Single-pass replacement for scripts/bash/analyze_log.sh: every section of
+the report is computed while reading the log once, optionally via mmap
+and split across processes by byte range.
+
+    python log_analyzer.py logs/server.log
+    python log_analyzer.py big.log --workers 8 --mmap --json
+    python log_analyzer.py logs/server.log --state logs/.server_log_state.json
+    python log_analyzer.py --bench 2000000
+"""
+
+import argparse
+import json
+import mmap
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from log_checkpoint import Checkpoint, load_state, save_state
+
+BLOCK_SIZE = 8 * 1024 * 1024
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+SHELL_SCRIPT = Path(__file__).resolve().parent.parent / "bash" / "analyze_log.sh"
+
+LEVELS = (b"ERROR", b"WARNING", b"INFO")
+SECURITY_PATTERN = b"Failed login attempt"
+DATABASE_PATTERN = b"Database connection failed"
+
+class LogStats:
+    """Counters for every report section; partial results from byte ranges merge by addition"""
+    def __init__(self):
+        self.lines = 0
+        self.levels = Counter()
+        self.errors = Counter()
+        self.security = Counter()
+        self.database = Counter()
+        self.warnings = Counter()
+
+    def merge(self, other):
+        self.lines += other.lines
+        self.levels.update(other.levels)
+        self.errors.update(other.errors)
+        self.security.update(other.security)
+        self.database.update(other.database)
+        self.warnings.update(other.warnings)
+        return self
+
+    def to_state(self):
+        """Raw counters, JSON-safe, for the incremental state file"""
+        counters = ["levels", "errors", "security", "database", "warnings"]
+        return {"lines": self.lines, **{
+            name: {key.decode("latin-1"): count for key, count in getattr(self, name).items()} for name in counters
+        }}
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        stats.lines = state.get("lines", 0)
+        for name in ["levels", "errors", "security", "database", "warnings"]:
+            getattr(stats, name).update({key.encode("latin-1"): count for key, count in state.get(name, {}).items()})
+        return stats
+
+    def to_dict(self):
+        return {
+            "lines": self.lines,
+            "levels": {level.decode(): self.levels[level] for level in LEVELS},
+            "top_errors": ranked(self.errors)[:5],
+            "security_alerts": alphabetical(self.security),
+            "database_issues": alphabetical(self.database),
+            "warnings": ranked(self.warnings),
+        }
+
+# "date time LEVEL ip message..." lines are split by the regex engine and counted by
+# (level, message), so repeated messages are handled once per block instead of once
+# per line. The date/time/ip classes can't form any of the patterns, so testing
+# "LEVEL message" is the same as testing the whole line. Anything else is kept whole.
+LINE_RE = re.compile(rb"\n[0-9:.\-]++ [0-9:.,\-]++ ([A-Z]++) [0-9a-fA-F.:]++ ([^\n]*+)|\n([^\n]++)")
+
+def fields(parts, first, last):
+    """awk '{print $first, ..., $last}' given the line's fields from $5 onwards"""
+    return b" ".join(parts[i] if i < len(parts) else b"" for i in range(first - 5, last - 4))
+
+def count_line(line, parts, count, stats):
+    if b"ERROR" in line:
+        stats.levels[b"ERROR"] += count
+        stats.errors[fields(parts, 5, 7)] += count
+    if b"WARNING" in line:
+        stats.levels[b"WARNING"] += count
+        stats.warnings[fields(parts, 5, 7)] += count
+    if b"INFO" in line:
+        stats.levels[b"INFO"] += count
+    if SECURITY_PATTERN in line:
+        stats.security[fields(parts, 5, 8)] += count
+    if DATABASE_PATTERN in line:
+        stats.database[fields(parts, 5, 7)] += count
+
+def scan_block(block, stats):
+    """Count one block of whole lines"""
+    # wc -l counts newlines; a final line without one is still grepped
+    stats.lines += block.count(b"\n")
+    for (level, message, raw), count in Counter(LINE_RE.findall(b"\n" + block)).items():
+        if raw:
+            count_line(raw, raw.split()[4:], count, stats)
+        else:
+            count_line(level + b" " + message, message.split(), count, stats)
+
+def read_blocks(path, start, end, use_mmap):
+    """Yield blocks of whole lines from [start, end); start and end sit on line boundaries"""
+    with open(path, "rb") as f:
+        if use_mmap:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                pos = start
+                while pos < end:
+                    stop = min(pos + BLOCK_SIZE, end)
+                    if stop < end:
+                        stop = mm.find(b"\n", stop, end) + 1 or end
+                    yield mm[pos:stop]
+                    pos = stop
+            return
+
+        f.seek(start)
+        remaining = end - start
+        carry = b""
+        while remaining > 0:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            data = carry + block
+            cut = data.rfind(b"\n") + 1 if remaining > 0 else len(data)
+            if cut:
+                yield data[:cut]
+            carry = data[cut:]
+        if carry:
+            yield carry
+
+def scan_range(path, start, end, use_mmap=False):
+    stats = LogStats()
+    for block in read_blocks(path, start, end, use_mmap):
+        scan_block(block, stats)
+    return stats
+
+def split_ranges(path, parts):
+    """Cut the file into roughly equal byte ranges that start at line boundaries"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+def analyze(path, workers=None, use_mmap=False):
+    size = os.path.getsize(path)
+    if workers is None:
+        workers = os.cpu_count() if size >= PARALLEL_MIN_BYTES else 1
+    if size == 0:
+        return LogStats()
+
+    ranges = split_ranges(path, workers)
+    if len(ranges) == 1:
+        return scan_range(path, 0, size, use_mmap)
+
+    stats = LogStats()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        for part in executor.map(scan_range, *zip(*[(path, a, b, use_mmap) for a, b in ranges])):
+            stats.merge(part)
+    return stats
+
+def analyze_incremental(path, state_file):
+    """Update the saved counts with only the bytes appended since the last run"""
+    state = load_state(state_file)
+    if state.get("path") == os.path.abspath(path):
+        checkpoint = Checkpoint.from_dict(state["checkpoint"])
+        stats = LogStats.from_state(state["stats"])
+    else:
+        checkpoint = Checkpoint(os.path.abspath(path))
+        stats = LogStats()
+
+    for block in checkpoint.read_new():
+        scan_block(block, stats)
+
+    save_state(state_file, {"path": os.path.abspath(path), "checkpoint": checkpoint.to_dict(), "stats": stats.to_state()})
+    print(f"{checkpoint.event}: read {checkpoint.bytes_read} new bytes", file=sys.stderr)
+    return stats
+
+# ===== REPORT =====
+
+def ranked(counter):
+    """sort | uniq -c | sort -rn"""
+    return [[key.decode(errors="replace"), count]
+            for key, count in sorted(counter.items(), key=lambda kv: (kv[1], kv[0]), reverse=True)]
+
+def alphabetical(counter):
+    """sort | uniq -c"""
+    return [[key.decode(errors="replace"), count] for key, count in sorted(counter.items())]
+
+def uniq_lines(rows):
+    return [f"{count:>7} {key}" for key, count in rows]
+
+def format_report(stats):
+    data = stats.to_dict()
+    lines = [
+        "LOG ANALYSIS REPORT",
+        f"Date: {time.strftime('%a %b %d %H:%M:%S %Z %Y')}",
+        "=== SUMMARY: ===",
+        f"- Total lines: {data['lines']}",
+        f"- ERROR count: {data['levels']['ERROR']}",
+        f"- WARNING count: {data['levels']['WARNING']}",
+        f"- INFO count: {data['levels']['INFO']}",
+        "=== TOP ERRORS: ===",
+        *uniq_lines(data["top_errors"]),
+        "=== SECURITY ALERTS: ===",
+        *uniq_lines(data["security_alerts"]),
+        "=== DATABASE ISSUES: ===",
+        *uniq_lines(data["database_issues"]),
+        "=== SYSTEM WARNINGS: ===",
+        *uniq_lines(data["warnings"]),
+        "=== END OF THE REPPORT ===",
+    ]
+    return "\n".join(lines) + "\n"
+
+# ===== BENCHMARK =====
+
+SAMPLE_MESSAGES = [
+    "INFO {ip} User login successful: {user}",
+    "INFO {ip} Page loaded: /dashboard",
+    "INFO {ip} File uploaded: report.pdf",
+    "WARNING {ip} High memory usage: 87%",
+    "WARNING {ip} Disk space low: 8%",
+    "WARNING {ip} Slow query detected: 2.3s",
+    "ERROR {ip} Database connection failed: timeout",
+    "ERROR {ip} Failed login attempt: {user}",
+    "ERROR {ip} API request failed: 502",
+]
+
+def generate_log(path, count, seed=42):
+    """Synthetic log in the same format as logs/server.log"""
+    rng = random.Random(seed)
+    users = ["admin", "root", "alice", "bob"]
+    with open(path, "w") as f:
+        for i in range(count):
+            message = rng.choice(SAMPLE_MESSAGES).format(ip=f"192.168.1.{rng.randint(1, 254)}", user=rng.choice(users))
+            f.write(f"2025-10-13 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d} {message}\n")
+
+def run_benchmark(count, log_file=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        if log_file is None:
+            log_file = os.path.join(tmp, "bench.log")
+            generate_log(log_file, count)
+        log_file = os.path.abspath(log_file)
+        size_mb = os.path.getsize(log_file) / (1024 * 1024)
+        print(f"Benchmark on {log_file} ({size_mb:.1f} MB)")
+
+        if shutil.which("bash") and SHELL_SCRIPT.exists():
+            start = time.perf_counter()
+            subprocess.run(["bash", str(SHELL_SCRIPT), log_file], cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+            shell = time.perf_counter() - start
+            print(f"  {'analyze_log.sh':<24} {shell:>8.2f}s {size_mb / shell:>8.1f} MB/s")
+
+        workers = os.cpu_count() or 1
+        for label, kwargs in [
+            ("python, 1 process", {"workers": 1}),
+            ("python, 1 process, mmap", {"workers": 1, "use_mmap": True}),
+            (f"python, mmap, {workers} workers", {"workers": workers, "use_mmap": True}),
+        ]:
+            start = time.perf_counter()
+            analyze(log_file, **kwargs)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<24} {elapsed:>8.2f}s {size_mb / elapsed:>8.1f} MB/s")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Single-pass log analyzer (replaces analyze_log.sh)")
+    parser.add_argument("log_file", nargs="?", help="Log file to analyze")
+    parser.add_argument("--output", default="report.txt", help="Report file (default: report.txt, '-' for stdout)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON instead of writing the report")
+    parser.add_argument("--workers", type=int, help="Processes to split the file across (default: auto by size)")
+    parser.add_argument("--mmap", action="store_true", help="Read the file through mmap")
+    parser.add_argument("--state", metavar="FILE", help="Incremental mode: keep counts and read offset in FILE, read only new lines")
+    parser.add_argument("--bench", type=int, metavar="N", help="Benchmark against analyze_log.sh on N generated lines (or on log_file)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.bench:
+        run_benchmark(args.bench, args.log_file)
+        return
+
+    if not args.log_file:
+        print("Error: a log file is required (or use --bench N)")
+        sys.exit(1)
+    if not os.path.isfile(args.log_file):
+        print(f"Error: {args.log_file} not found")
+        sys.exit(1)
+
+    if args.state:
+        stats = analyze_incremental(args.log_file, args.state)
+    else:
+        stats = analyze(args.log_file, args.workers, args.mmap)
+
+    if args.json:
+        print(json.dumps({"file": args.log_file, "date": datetime.now().isoformat(timespec="seconds"), **stats.to_dict()}, indent=4))
+    elif args.output == "-":
+        sys.stdout.write(format_report(stats))
+    else:
+        with open(args.output, "w") as f:
+            f.write(format_report(stats))
+        print(f"report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Log Checkpoints
+Remembers how far a log file has been read (device, inode, its first bytes,
+byte offset and any unfinished last line) so the next run only reads what
+was appended. Handles rotation (file renamed and recreated, even when the
+new file reuses the old inode) and truncation in place.
+If the renamed file is already gone, the rest of it is read from its
+log_segments.py segment.
+"""
+
+import gzip
+import json
+import os
+from pathlib import Path
+
+from log_segments import ARCHIVE_DIR, HEAD_BYTES, find_segment, read_head
+
+BLOCK_SIZE = 8 * 1024 * 1024
+
+NEW = "new"
+APPENDED = "appended"
+UNCHANGED = "unchanged"
+ROTATED = "rotated"
+TRUNCATED = "truncated"
+
+class Checkpoint:
+    def __init__(self, path, device=None, inode=None, offset=0, partial=b"", head=b""):
+        self.path = str(path)
+        self.device = device
+        self.inode = inode
+        self.offset = offset
+        self.partial = partial
+        self.head = head
+        self.event = None
+        self.bytes_read = 0
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "device": self.device,
+            "inode": self.inode,
+            "offset": self.offset,
+            "partial": self.partial.decode("latin-1"),
+            "head": self.head.decode("latin-1"),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["path"], data["device"], data["inode"], data["offset"], data["partial"].encode("latin-1"),
+                   data.get("head", "").encode("latin-1"))
+
+    def read_new(self, block_size=BLOCK_SIZE):
+        """Yield blocks of complete lines appended since the last call"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.event = UNCHANGED
+            return
+
+        if self.inode is None:
+            self.event = NEW
+        elif (st.st_dev, st.st_ino) != (self.device, self.inode) or not read_head(self.path).startswith(self.head):
+            self.event = ROTATED
+            rotated = find_rotated(self.path, self.device, self.inode, self.head)
+            if rotated:
+                # Finish the lines written to the old file before it was renamed
+                yield from self._read(rotated, block_size, final=True)
+            elif (segment := find_rotated_segment(self.path, self.device, self.inode, self.head)):
+                yield from self._read(segment, block_size, final=True, opener=gzip.open)
+            self.offset = 0
+            self.partial = b""
+            self.head = b""
+        elif st.st_size < self.offset:
+            self.event = TRUNCATED
+            self.offset = 0
+            self.partial = b""
+            self.head = b""
+        elif st.st_size == self.offset:
+            self.event = UNCHANGED
+            return
+        else:
+            self.event = APPENDED
+
+        self.device, self.inode = st.st_dev, st.st_ino
+        if len(self.head) < HEAD_BYTES:
+            self.head = read_head(self.path)
+        yield from self._read(self.path, block_size)
+
+    def _read(self, path, block_size, final=False, opener=open):
+        with opener(path, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                self.offset += len(block)
+                self.bytes_read += len(block)
+                data = self.partial + block
+                cut = data.rfind(b"\n") + 1
+                self.partial = data[cut:]
+                if cut:
+                    yield data[:cut]
+
+        # A rotated file gets no more writes, so its last line is complete
+        if final and self.partial:
+            yield self.partial + b"\n"
+            self.partial = b""
+
+def find_rotated(path, device, inode, head=b""):
+    """The renamed copy of a rotated log (e.g. health.log.1) if it's still next to it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.basename(path)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name != name and entry.name.startswith(name) and entry.is_file(follow_symlinks=False):
+                st = entry.stat(follow_symlinks=False)
+                if (st.st_dev, st.st_ino) == (device, inode) and read_head(entry.path).startswith(head):
+                    return entry.path
+    return None
+
+def find_rotated_segment(path, device, inode, head):
+    """The compressed segment of a rotated log, in LOG_ARCHIVE_DIR or <log dir>/archive"""
+    name = os.path.basename(path)
+    for archive_dir in dict.fromkeys([ARCHIVE_DIR.resolve(), Path(path).resolve().parent / "archive"]):
+        segment = find_segment(archive_dir, name, device, inode, head)
+        if segment:
+            return segment
+    return None
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_state(path, state):
+    """Write atomically so a crash leaves the previous checkpoint intact"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Log Segments
+Rotates logs (health.log, errors.log, backup.log, app.log, ...) by size or
+age into gzip segments, each with a sidecar index: time range, per-level
+and per-site counts, and a bloom filter of the words in it. Searches use
+the indexes to skip segments that cannot match and only decompress the rest.
+
+    python log_segments.py rotate logs/health.log logs/errors.log --max-bytes 10000000
+    python log_segments.py search health.log --since 2025-11-17 --word GitHub404 --level FAILED
+    python log_segments.py list
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ARCHIVE_DIR = Path(os.getenv("LOG_ARCHIVE_DIR", "logs/archive"))
+DEFAULT_LOGS = ["logs/health.log", "logs/errors.log", "logs/backup.log", "logs/app.log"]
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_AGE = 86400
+BLOOM_FP_RATE = 0.01
+BLOOM_HASHES = 7
+HEAD_BYTES = 1024
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+TIME_RE = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})")
+LEVEL_RE = re.compile(r"\b(DEBUG|INFO|WARNING|ERROR|CRITICAL|SUCCESS|FAILED)\b")
+SITE_RE = re.compile(r"^\[[^\]]+\] (\S+) -")
+WORD_RE = re.compile(r"\w+")
+
+def parse_line(line):
+    """(timestamp or None, level or None, site or None) for app, backup and health log lines"""
+    clean = ANSI_RE.sub("", line)
+    m = TIME_RE.search(clean, 0, 40)
+    ts = datetime.fromisoformat(f"{m.group(1)} {m.group(2)}").timestamp() if m else None
+    level = LEVEL_RE.search(clean)
+    site = SITE_RE.match(clean)
+    return ts, level.group(1) if level else None, site.group(1) if site else None, clean
+
+def words(text):
+    return set(WORD_RE.findall(text.lower()))
+
+class BloomFilter:
+    def __init__(self, bits, hashes=BLOOM_HASHES, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def for_items(cls, count, fp_rate=BLOOM_FP_RATE):
+        bits = max(64, math.ceil(-count * math.log(fp_rate) / math.log(2) ** 2))
+        return cls(bits)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.data[pos // 8] |= 1 << (pos % 8)
+
+    def __contains__(self, item):
+        return all(self.data[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+    def to_dict(self):
+        return {"bits": self.bits, "hashes": self.hashes, "data": base64.b64encode(bytes(self.data)).decode()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["bits"], data["hashes"], base64.b64decode(data["data"]))
+
+# ===== ROTATION =====
+
+def segment_paths(archive_dir, name):
+    """Segments of one log, oldest first, as (segment, index) path pairs"""
+    pairs = []
+    for index_file in sorted(Path(archive_dir).glob(f"{name}.*.idx.json")):
+        segment = index_file.with_name(index_file.name[:-len(".idx.json")])
+        # The index is published first; a crash before the segment leaves it alone
+        if segment.exists():
+            pairs.append((segment, index_file))
+    return pairs
+
+def find_segment(archive_dir, name, device, inode, head):
+    """The newest segment made from the log file with this device/inode whose content starts with `head`.
+
+    Inodes are reused as soon as a rotated file is removed, so the first bytes tell generations apart.
+    """
+    for segment, index_file in reversed(segment_paths(archive_dir, name)):
+        index = json.loads(index_file.read_text())
+        if (index.get("device"), index.get("inode")) != (device, inode):
+            continue
+        with gzip.open(segment, "rb") as f:
+            if f.read(len(head)) == head:
+                return segment
+    return None
+
+def read_head(path, size=HEAD_BYTES):
+    with open(path, "rb") as f:
+        return f.read(size)
+
+def first_timestamp(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            ts = parse_line(line)[0]
+            if ts is not None:
+                return ts
+    return None
+
+def needs_rotation(path, max_bytes, max_age):
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return False
+    if size == 0:
+        return False
+    if size >= max_bytes:
+        return True
+    first = first_timestamp(path)
+    return first is not None and time.time() - first >= max_age
+
+def write_segment(source, archive_dir, name):
+    """Compress one closed log file into a segment and write its index in the same pass.
+
+    The segment holds the file's exact bytes, so log_checkpoint can resume
+    reading a rotated log from it at the same offset.
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    tmp = archive_dir / f".{name}.{os.getpid()}.tmp.gz"
+    st = os.stat(source)
+    levels, sites, vocabulary = {}, {}, set()
+    first = last = None
+    lines = 0
+
+    with open(source, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        for raw in src:
+            dst.write(raw)
+            lines += 1
+            ts, level, site, clean = parse_line(raw.decode("utf-8", errors="replace"))
+            if ts is not None:
+                first = ts if first is None else min(first, ts)
+                last = ts if last is None else max(last, ts)
+            if level:
+                levels[level] = levels.get(level, 0) + 1
+            if site:
+                sites[site] = sites.get(site, 0) + 1
+            vocabulary |= words(clean)
+
+    bloom = BloomFilter.for_items(len(vocabulary))
+    for word in vocabulary:
+        bloom.add(word)
+
+    stamp = datetime.fromtimestamp(first or st.st_mtime).strftime("%Y%m%dT%H%M%S")
+    seq = 0
+    while (segment := archive_dir / f"{name}.{stamp}-{seq:03d}.gz").exists():
+        seq += 1
+
+    index = {
+        "log": name,
+        "segment": segment.name,
+        "first": first,
+        "last": last,
+        "lines": lines,
+        "bytes": st.st_size,
+        "device": st.st_dev,
+        "inode": st.st_ino,
+        "levels": levels,
+        "sites": sites,
+        "bloom": bloom.to_dict(),
+    }
+    # Index first: a segment is only ever visible with its index, and a crash
+    # before the segment is renamed in leaves the .rotating file to redo
+    index_file = Path(f"{segment}.idx.json")
+    index_tmp = archive_dir / f".{index_file.name}.{os.getpid()}.tmp"
+    index_tmp.write_text(json.dumps(index))
+    os.replace(index_tmp, index_file)
+    os.replace(tmp, segment)
+    return segment, index
+
+def rotate(path, archive_dir, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, force=False):
+    """Move the live log aside, then compress it; returns the segment path or None"""
+    path = Path(path)
+    closed = path.with_name(f"{path.name}.rotating")
+
+    # A .rotating file means an earlier run stopped before compressing it
+    if not closed.exists():
+        if not path.exists() or path.stat().st_size == 0:
+            return None
+        if not force and not needs_rotation(path, max_bytes, max_age):
+            return None
+        # Writers that open the log per line (the shell scripts) start a fresh
+        # file right after the rename
+        os.rename(path, closed)
+
+    # Already compressed if an earlier run crashed between publishing the segment and the remove below
+    st = os.stat(closed)
+    segment = find_segment(archive_dir, path.name, st.st_dev, st.st_ino, read_head(closed))
+    if segment is None:
+        segment, _ = write_segment(closed, Path(archive_dir), path.name)
+    # Safe to remove: log_checkpoint finds the rest of a rotated log in its segment
+    os.remove(closed)
+    return segment
+
+# ===== SEARCH =====
+
+class Query:
+    def __init__(self, since=None, until=None, words=(), contains=None, level=None, site=None):
+        self.since = since
+        self.until = until
+        self.words = {w.lower() for w in words}
+        self.contains = contains.lower() if contains else None
+        self.level = level
+        self.site = site
+
+    def may_match(self, index):
+        """False only if the index proves no line in the segment can match"""
+        if self.since is not None and index["last"] is not None and index["last"] < self.since:
+            return False
+        if self.until is not None and index["first"] is not None and index["first"] > self.until:
+            return False
+        if self.level and not index["levels"].get(self.level):
+            return False
+        if self.site and not index["sites"].get(self.site):
+            return False
+        if self.words:
+            bloom = BloomFilter.from_dict(index["bloom"])
+            if not all(word in bloom for word in self.words):
+                return False
+        return True
+
+    def matches(self, ts, level, site, clean):
+        if self.since is not None and (ts is None or ts < self.since):
+            return False
+        if self.until is not None and (ts is None or ts > self.until):
+            return False
+        if self.level and level != self.level:
+            return False
+        if self.site and site != self.site:
+            return False
+        if self.words and not self.words <= words(clean):
+            return False
+        if self.contains and self.contains not in clean.lower():
+            return False
+        return True
+
+def scan(lines, query):
+    last_ts = None
+    for line in lines:
+        ts, level, site, clean = parse_line(line)
+        # Continuation lines (tracebacks) belong to the previous timestamp
+        ts = last_ts = ts if ts is not None else last_ts
+        if query.matches(ts, level, site, clean):
+            yield line
+
+def search(name, query, archive_dir=ARCHIVE_DIR, live_log=None):
+    """Yield matching lines from the segments of log `name`, then from the live log"""
+    stats = {"segments": 0, "read": 0, "skipped": 0}
+    for segment, index_file in segment_paths(archive_dir, name):
+        stats["segments"] += 1
+        if not query.may_match(json.loads(index_file.read_text())):
+            stats["skipped"] += 1
+            continue
+        stats["read"] += 1
+        with gzip.open(segment, "rt", encoding="utf-8", errors="replace") as f:
+            yield from scan(f, query)
+
+    if live_log and os.path.exists(live_log):
+        with open(live_log, encoding="utf-8", errors="replace") as f:
+            yield from scan(f, query)
+
+    print(f"{stats['read']} of {stats['segments']} segments read, {stats['skipped']} skipped by their index",
+          file=sys.stderr)
+
+def parse_time(value):
+    return datetime.fromisoformat(value).timestamp()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rotate logs into indexed, compressed segments and search them")
+    parser.add_argument("--archive-dir", type=Path, default=ARCHIVE_DIR, help=f"Segment directory (default: {ARCHIVE_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rotate_cmd = sub.add_parser("rotate", help="Rotate logs that are too big or too old")
+    rotate_cmd.add_argument("logs", nargs="*", default=DEFAULT_LOGS)
+    rotate_cmd.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    rotate_cmd.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE, help="Seconds since the first line")
+    rotate_cmd.add_argument("--force", action="store_true", help="Rotate regardless of size and age")
+
+    search_cmd = sub.add_parser("search", help="Find lines across segments and the live log")
+    search_cmd.add_argument("log", help="Log file name or path, e.g. health.log or logs/health.log")
+    search_cmd.add_argument("--since", type=parse_time)
+    search_cmd.add_argument("--until", type=parse_time)
+    search_cmd.add_argument("--word", action="append", default=[], help="Whole word that must appear (repeatable; uses the bloom filter)")
+    search_cmd.add_argument("--contains", help="Substring that must appear (can't skip segments by itself)")
+    search_cmd.add_argument("--level", help="ERROR, WARNING, INFO, SUCCESS, FAILED, ...")
+    search_cmd.add_argument("--site", help="Health log site name")
+    search_cmd.add_argument("--count", action="store_true", help="Only print the number of matches")
+
+    sub.add_parser("list", help="Show segments and their indexes")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.command == "rotate":
+        for log in args.logs:
+            segment = rotate(log, args.archive_dir, args.max_bytes, args.max_age, args.force)
+            if segment:
+                print(f"{log} -> {segment}")
+
+    elif args.command == "search":
+        log = Path(args.log)
+        live = log if log.parent != Path(".") else Path("logs") / log.name
+        query = Query(args.since, args.until, args.word, args.contains, args.level, args.site)
+        count = 0
+        for line in search(log.name, query, args.archive_dir, live):
+            count += 1
+            if not args.count:
+                sys.stdout.write(line if line.endswith("\n") else line + "\n")
+        if args.count:
+            print(count)
+
+    else:
+        for segment, index_file in segment_paths(args.archive_dir, "*"):
+            index = json.loads(index_file.read_text())
+            span = " .. ".join(datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S") if t else "?" for t in (index["first"], index["last"]))
+            print(f"{segment.name:<45} {index['lines']:>8} lines  {os.path.getsize(segment):>10} bytes  {span}  {index['levels']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Mock Health Check Target
+Local HTTP stub for testing health_check.py without touching real sites.
+
+    /status/<code>    answer with that status code
+    /delay/<seconds>  wait, then answer 200
+    /close            answer 200 and close the connection
+    anything else     200
+
+    python mock_health_server.py --port 8081
+"""
+
+import argparse
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+class MockHealthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def respond(self, send_body):
+        self.server.count("requests")
+        parts = self.path.strip("/").split("/")
+        code = 200
+
+        if parts[0] == "status" and len(parts) > 1 and parts[1].isdigit():
+            code = int(parts[1])
+        elif parts[0] == "delay" and len(parts) > 1:
+            time.sleep(float(parts[1]))
+
+        body = f"{code}\n".encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        if parts[0] == "close":
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+class MockHealthServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, MockHealthHandler)
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def process_request(self, request, client_address):
+        self.count("connections")
+        super().process_request(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def start_in_thread() -> MockHealthServer:
+    """Start a server on a free port in a background thread"""
+    server = MockHealthServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mock HTTP target for health checks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    return parser.parse_args()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    server = MockHealthServer((args.host, args.port))
+    logger.info(f"Mock health target listening on {server.base_url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Shutting down after {server.requests} requests on {server.connections} connections")
+
+if __name__ == "__main__":
+    main()
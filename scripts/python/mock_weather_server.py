@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Mock Weather API Server
+Local stand-in for OpenWeather's /data/2.5/weather and /data/2.5/group
+endpoints, with configurable latency, error rate and unknown cities.
+
+Point weather.py at it with:
+    WEATHER_BASE_URL=http://127.0.0.1:8080/data/2.5/weather python weather.py London
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMES = ["London", "Paris", "Tokyo", "New York", "Berlin", "Madrid", "Rome", "Cairo"]
+
+def make_cities(count):
+    """Known cities: a few real names plus synthetic City0001, City0002, ..."""
+    names = DEFAULT_NAMES + [f"City{i:04d}" for i in range(1, max(count - len(DEFAULT_NAMES), 0) + 1)]
+    return {1000 + i: name for i, name in enumerate(names[:count])}
+
+def city_list(cities):
+    """Cities in the OpenWeather bulk city.list.json format"""
+    return [
+        {"id": city_id, "name": name, "state": "", "country": "XX", "coord": {"lon": 0.0, "lat": 0.0}}
+        for city_id, name in cities.items()
+    ]
+
+def weather_payload(city_id, name):
+    rng = random.Random(city_id)
+    temp = round(rng.uniform(-10, 35), 2)
+    now = int(time.time())
+    return {
+        "coord": {"lon": 0.0, "lat": 0.0},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "base": "stations",
+        "main": {
+            "temp": temp,
+            "feels_like": temp,
+            "temp_min": temp - 1,
+            "temp_max": temp + 1,
+            "pressure": rng.randint(990, 1030),
+            "humidity": rng.randint(20, 100),
+        },
+        "visibility": 10000,
+        "wind": {"speed": round(rng.uniform(0, 15), 2), "deg": rng.randint(0, 359)},
+        "clouds": {"all": rng.randint(0, 100)},
+        "dt": now,
+        "sys": {"country": "XX", "sunrise": now - 21600, "sunset": now + 21600},
+        "timezone": 0,
+        "id": city_id,
+        "name": name,
+        "cod": 200,
+    }
+
+class MockWeatherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def send_json(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            self.send_json(503, {"cod": 503, "message": "service unavailable"})
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if "appid" not in query:
+            self.send_json(401, {"cod": 401, "message": "Invalid API key"})
+        elif url.path.endswith("/data/2.5/weather"):
+            self.handle_weather(query)
+        elif url.path.endswith("/data/2.5/group"):
+            self.handle_group(query)
+        else:
+            self.send_json(404, {"cod": "404", "message": "Internal error"})
+
+    def handle_weather(self, query):
+        server = self.server
+        city_id = None
+
+        if "id" in query:
+            city_id = int(query["id"][0])
+            if city_id not in server.cities:
+                city_id = None
+        elif "q" in query:
+            name = query["q"][0].split(",")[0].replace("_", " ").lower()
+            city_id = server.names.get(name)
+
+        if city_id is None or random.random() < server.not_found_rate:
+            self.send_json(404, {"cod": "404", "message": "city not found"})
+            return
+
+        self.send_json(200, weather_payload(city_id, server.cities[city_id]))
+
+    def handle_group(self, query):
+        server = self.server
+        ids = [int(i) for i in query.get("id", [""])[0].split(",") if i]
+
+        if len(ids) > 20:
+            self.send_json(400, {"cod": "400", "message": "Too many ids"})
+            return
+
+        found = [weather_payload(i, server.cities[i]) for i in ids if i in server.cities]
+        self.send_json(200, {"cnt": len(found), "list": found})
+
+class MockWeatherServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cities, latency=0.0, jitter=0.0, error_rate=0.0, not_found_rate=0.0):
+        super().__init__(address, MockWeatherHandler)
+        self.cities = cities
+        self.names = {name.lower(): city_id for city_id, name in cities.items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/data/2.5/weather"
+
+def start_in_thread(**kwargs) -> MockWeatherServer:
+    """Start a server on a free port in a background thread (used by bench_weather.py)"""
+    server = MockWeatherServer(("127.0.0.1", 0), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mock OpenWeather API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cities", type=int, default=1000, help="Number of known cities (default: 1000)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Base response latency (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Random extra latency (default: 20)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="Share of known cities answered with 404")
+    parser.add_argument("--write-city-list", help="Also write the known cities as a bulk city list JSON file")
+    return parser.parse_args()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    cities = make_cities(args.cities)
+
+    if args.write_city_list:
+        with open(args.write_city_list, "w") as f:
+            json.dump(city_list(cities), f)
+        logger.info(f"Wrote city list to {args.write_city_list}")
+
+    server = MockWeatherServer(
+        (args.host, args.port),
+        cities,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        not_found_rate=args.not_found_rate,
+    )
+    logger.info(f"Mock weather API listening on {server.base_url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Shutting down after {server.requests} requests")
+
+if __name__ == "__main__":
+    main()
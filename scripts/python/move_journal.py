@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Move Journal
+Append-only journal of planned and completed file moves, so a bulk
+organize can be resumed after a crash or undone afterwards.
+
+One compact JSON array per line:
+    ["P", seq, source, category, target]   planned move
+    ["D", seq]                              move done
+    ["F", seq]                              move failed
+    ["U", seq]                              move undone
+    ["C"]                                   run complete
+    ["X"]                                   undo started
+    ["R"]                                   run fully reverted
+Writes are buffered and fsynced per batch, not per file.
+"""
+
+import json
+import os
+import time
+
+PLANNED = "P"
+DONE = "D"
+FAILED = "F"
+UNDONE = "U"
+COMPLETE = "C"
+REVERTED = "R"
+UNDOING = "X"
+
+class MoveJournal:
+    def __init__(self, path, batch_size=1000, sync_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.buffer = []
+        self.last_sync = time.monotonic()
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        self.file.close()
+
+    def record(self, *entry):
+        self.buffer.append(json.dumps(entry, separators=(",", ":")))
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.file.write("\n".join(self.buffer) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.buffer.clear()
+        self.last_sync = time.monotonic()
+
+    def plan(self, moves):
+        """Record the whole plan durably before the first move"""
+        for seq, (path, category, target) in enumerate(moves):
+            self.record(PLANNED, seq, path, category, str(target))
+        self.flush()
+
+def load_journal(path):
+    """Return (moves, state) where moves maps seq -> [source, category, target, status]"""
+    moves = {}
+    state = None
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash mid-write
+                continue
+
+            kind = entry[0]
+            if kind == PLANNED:
+                seq, source, category, target = entry[1:]
+                moves[seq] = [source, category, target, PLANNED]
+            elif kind in (DONE, FAILED, UNDONE):
+                moves[entry[1]][3] = kind
+            else:
+                state = kind
+
+    return moves, state
+
+def reconcile(moves):
+    """Moves that happened after the last journal flush: target exists, source is gone.
+
+    A crash between the link and the unlink of a move leaves both names on one
+    file; the unlink is finished here.
+    """
+    for move in moves.values():
+        source, category, target, status = move
+        if status != PLANNED or not os.path.exists(target):
+            continue
+        if os.path.exists(source) and os.path.samefile(source, target):
+            os.unlink(source)
+        if not os.path.exists(source):
+            move[3] = DONE
+    return moves
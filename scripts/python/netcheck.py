@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Network Diagnostics
+Python replacement for scripts/bash/netcheck.sh. DNS, TCP port checks,
+HTTP/HTTPS probes and (optionally) ping and traceroute run concurrently,
+within each host and across hosts, with bounded parallelism. Writes the
+same text report plus a JSON summary.
+
+    python netcheck.py google.com github.com
+    python netcheck.py --hosts-file fleet.txt --concurrency 50 --no-ping
+    python netcheck.py example.com --traceroute --json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import shutil
+import socket
+import ssl
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from health_check import ConnectionPool, Site, probe
+
+GREEN = "\033[32m"
+RED = "\033[31m"
+YELLOW = "\033[33m"
+BLUE = "\033[34m"
+RESET = "\033[0m"
+
+PORTS = [22, 80, 443, 3306]
+SERVICES = {22: "SSH", 80: "HTTP", 443: "HTTPS", 3306: "MySQL"}
+DEFAULT_CONCURRENCY = 20
+PING_COUNT = 4
+PING_TIMEOUT = 5
+TRACEROUTE_TIMEOUT = 15
+PORT_TIMEOUT = 2
+WEB_TIMEOUT = 5
+
+PING_PACKETS_RE = re.compile(r"(\d+) packets transmitted, (\d+) (?:packets )?received")
+PING_RTT_RE = re.compile(r"= ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+) ms")
+
+async def run_command(args, timeout):
+    """Returns (exit code, stdout); exit code is None on timeout or if the tool is missing"""
+    if not shutil.which(args[0]):
+        return None, ""
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None, ""
+    return process.returncode, stdout.decode(errors="replace")
+
+# ===== CHECKS =====
+
+async def ping_check(host):
+    """One ping run; loss and min/avg/max come from its summary lines"""
+    if not shutil.which("ping"):
+        return {"ok": False, "error": "ping not installed"}
+    code, output = await run_command(["ping", "-c", str(PING_COUNT), "-q", host], PING_TIMEOUT)
+    result = {"ok": code == 0}
+    if (m := PING_PACKETS_RE.search(output)):
+        sent, received = int(m.group(1)), int(m.group(2))
+        result.update(sent=sent, received=received, loss_pct=round(100 * (sent - received) / sent, 1) if sent else 100.0)
+    if (m := PING_RTT_RE.search(output)):
+        result.update(min_ms=float(m.group(1)), avg_ms=float(m.group(2)), max_ms=float(m.group(3)))
+    return result
+
+async def dns_check(host):
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        infos = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), 5)
+    except (OSError, asyncio.TimeoutError) as e:
+        return {"ok": False, "error": str(e) or "timeout"}
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    ipv4 = [a for a in addresses if ":" not in a]
+    return {
+        "ok": True,
+        "address": (ipv4 or addresses)[0],
+        "addresses": addresses,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+async def traceroute_check(host):
+    if not shutil.which("traceroute"):
+        return {"ok": False, "installed": False}
+    code, output = await run_command(["traceroute", "-m", "15", host], TRACEROUTE_TIMEOUT)
+    if code != 0:
+        return {"ok": False, "installed": True}
+    hops = [line for line in output.splitlines() if re.match(r"^[ 0-9]", line)]
+    return {"ok": True, "installed": True, "output": output.rstrip("\n"), "hops": len(hops)}
+
+async def web_check(host, pool):
+    async def one(protocol):
+        try:
+            result = await asyncio.wait_for(probe(Site(f"{protocol}://{host}", host, 0), pool), WEB_TIMEOUT)
+            return result.status, round(result.total * 1000)
+        except asyncio.TimeoutError:
+            return 0, None
+
+    http, https = await asyncio.gather(one("http"), one("https"))
+    return {
+        "ok": bool(http[0] or https[0]),
+        "http": {"status": http[0], "ms": http[1]},
+        "https": {"status": https[0], "ms": https[1]},
+    }
+
+async def port_open(host, port):
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), PORT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+async def port_check(host):
+    states = await asyncio.gather(*(port_open(host, port) for port in PORTS))
+    return dict(zip(PORTS, states))
+
+async def local_ports():
+    """Listening sockets on this machine; the same for every host, so gathered once"""
+    for args in (["ss", "-tuln"], ["netstat", "-tuln"]):
+        code, output = await run_command(args, 5)
+        if code == 0:
+            listening = [port for port in PORTS if re.search(rf":{port}\s", output)]
+            return {"output": output.rstrip("\n"), "listening": listening}
+    return {"output": "", "listening": []}
+
+async def diagnose(host, semaphore, options, pool):
+    async with semaphore:
+        started = datetime.now()
+        start = time.perf_counter()
+
+        async def skipped():
+            return None
+
+        ping, dns, route, web, ports = await asyncio.gather(
+            ping_check(host) if options.ping else skipped(),
+            dns_check(host),
+            traceroute_check(host) if options.traceroute else skipped(),
+            web_check(host, pool),
+            port_check(host),
+        )
+
+        failures = []
+        if ping is not None and not ping["ok"]:
+            failures.append("Ping test failed")
+        if not dns["ok"]:
+            failures.append("DNS resolution failed")
+        if not web["ok"]:
+            failures.append("Web connectivity failed")
+
+        return {
+            "host": host,
+            "date": started.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - start, 3),
+            "ping": ping,
+            "dns": dns,
+            "traceroute": route,
+            "web": web,
+            "ports": {str(port): state for port, state in ports.items()},
+            "reachable": not failures,
+            "failures": failures,
+        }
+
+async def run_diagnostics(hosts, options):
+    context = ssl.create_default_context()
+    pool = ConnectionPool(context)
+    semaphore = asyncio.Semaphore(options.concurrency)
+    try:
+        local, *results = await asyncio.gather(
+            local_ports(), *(diagnose(host, semaphore, options, pool) for host in hosts)
+        )
+    finally:
+        pool.close()
+    return local, results
+
+# ===== REPORT =====
+
+def format_host(result, local):
+    started = datetime.fromisoformat(result["date"])
+    lines = [
+        "====================================================",
+        f"{BLUE}=== NETWORK DIAGNOSTICS REPORT FOR {result['host']} ==={RESET}",
+        f"DATE: {started.astimezone().strftime('%a %b %d %H:%M:%S %Z %Y')}",
+        f"TARGET: {result['host']}",
+        "----------------------------------------------------",
+    ]
+
+    ping = result["ping"]
+    lines.append("[1] PING TEST")
+    if ping is None:
+        lines.append(f"{YELLOW}Skipped{RESET}")
+    elif ping["ok"]:
+        lines.append(f"{GREEN}Result: Host is UP{RESET}")
+        lines.append(f"Average response time: {ping.get('avg_ms', '')} ms")
+    else:
+        lines.append(f"{RED}Result: Host is DOWN or unreachable{RESET}")
+    lines.append("...")
+
+    dns = result["dns"]
+    lines.append("[2] DNS RESOLUTION CHECK")
+    if dns["ok"]:
+        lines.append(f"IP Address: {GREEN}{dns['address']}{RESET}")
+        lines.append("DNS Server: Working")
+    else:
+        lines.append(f"{RED}DNS Resolution: Failed{RESET}")
+    lines.append("...")
+
+    route = result["traceroute"]
+    lines.append("[3] ROUTE TRACING")
+    if route is None:
+        lines.append(f"{YELLOW}Skipped (use --traceroute){RESET}")
+    elif not route["installed"]:
+        lines.append(f"{YELLOW}Traceroute not installed{RESET}")
+    elif route["ok"]:
+        lines.append(route["output"])
+        lines.append(f"Total Hops: {route['hops']}")
+    else:
+        lines.append(f"{RED}Traceroute failed{RESET}")
+    lines.append("...")
+
+    lines.append("[4] WEB CONNECTIVITY")
+    for protocol in ("http", "https"):
+        status = result["web"][protocol]["status"]
+        if status:
+            lines.append(f"{GREEN}{protocol}: HTTP Status {status}{RESET}")
+        else:
+            lines.append(f"{RED}{protocol}: Unreachable{RESET}")
+    lines.append("...")
+
+    lines.append("[5] LOCAL PORT CHECK")
+    lines.append(local["output"])
+    lines.append("")
+    lines.append("Common Services:")
+    lines.extend(f" - {SERVICES[port]} ({port})" for port in local["listening"])
+    lines.append("...")
+
+    lines.append(f"[6] SPECIFIC PORT CHECK ({', '.join(str(p) for p in PORTS)})")
+    for port, is_open in result["ports"].items():
+        lines.append(f"{GREEN}Port {port} is OPEN{RESET}" if is_open else f"{RED}Port {port} is CLOSED{RESET}")
+    lines.append("...")
+
+    lines.append("=== SUMMARY ===")
+    if result["reachable"]:
+        lines.append(f"{GREEN}Target is REACHABLE{RESET}")
+        lines.append(f"{GREEN}All checks PASSED ✅{RESET}")
+    else:
+        lines.append(f"{RED}Some checks FAILED ❌{RESET}")
+        lines.extend(f"- {failure}" for failure in result["failures"])
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+def summarize(results, local, seconds):
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(seconds, 3),
+        "hosts": len(results),
+        "reachable": sum(1 for r in results if r["reachable"]),
+        "local_listening": local["listening"],
+        "results": [{k: v for k, v in r.items() if k != "traceroute"} | {
+            "traceroute_hops": r["traceroute"]["hops"] if r["traceroute"] and r["traceroute"]["ok"] else None
+        } for r in results],
+    }
+
+def read_hosts(args):
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        with open(args.hosts_file) as f:
+            hosts += [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+    return list(dict.fromkeys(hosts))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent network diagnostics (replaces netcheck.sh)")
+    parser.add_argument("hosts", nargs="*", help="Hosts to diagnose")
+    parser.add_argument("--hosts-file", help="File with one host per line")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Hosts diagnosed at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--no-ping", dest="ping", action="store_false", help="Skip the ping test")
+    parser.add_argument("--traceroute", action="store_true", help="Also trace the route to each host (slow)")
+    parser.add_argument("--json", action="store_true", help="Print the JSON summary to stdout")
+    parser.add_argument("--output", help="Report file (default: network_report_<date>.txt); the summary goes next to it as .json (.summary.json if the report is .json)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    hosts = read_hosts(args)
+    if not hosts:
+        print(f"{YELLOW}Usage: netcheck.py host1 [host2 host3 ...]{RESET}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    local, results = asyncio.run(run_diagnostics(hosts, args))
+    summary = summarize(results, local, time.perf_counter() - start)
+
+    report = args.output or f"network_report_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+    with open(report, "w") as f:
+        f.writelines(format_host(result, local) for result in results)
+    summary_file = Path(report).with_suffix(".json")
+    if summary_file == Path(report):
+        summary_file = summary_file.with_name(f"{summary_file.stem}.summary.json")
+    with open(summary_file, "w") as f:
+        json.dump(summary, f, indent=4)
+
+    if args.json:
+        print(json.dumps(summary, indent=4))
+    else:
+        print(f"Diagnosed {summary['hosts']} hosts in {summary['seconds']:.1f}s, {summary['reachable']} reachable")
+    print(f"{YELLOW}Results saved to {report} (summary: {summary_file}){RESET}")
+
+if __name__ == "__main__":
+    main()
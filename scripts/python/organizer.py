@@ -5,8 +5,15 @@ Automatically organize files into category folders
 """
 
 import argparse
+import errno
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import shutil
+from dedup import find_duplicates
+from instrumentation import add_profile_arguments, metrics, profiler
+from move_journal import MoveJournal, load_journal, reconcile, PLANNED, DONE, FAILED, UNDONE, COMPLETE, REVERTED, UNDOING
 
 CATEGORIES = {
     "Images": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg"],
@@ -17,62 +24,347 @@ CATEGORIES = {
     "Code": [".py", ".js", ".html", ".css", ".java", ".cpp"],
 }
 
+EXTENSION_MAP = {
+    extension: category
+    for category, extensions in CATEGORIES.items()
+    for extension in extensions
+}
+
+CATEGORY_FOLDERS = set(CATEGORIES) | {"Others"}
+
+DEFAULT_WORKERS = 8
+
+DEDUP_MODES = ["report", "skip", "hardlink"]
+
+JOURNAL_NAME = ".organize-journal.jsonl"
+
 def get_category(file):
-    extension = file.suffix.lower()
-    for category, extensions in CATEGORIES.items():
-        if extension in extensions:
-           return category
-    return "Others"
+    return category_for_name(file.name)
+
+def category_for_name(name):
+    extension = os.path.splitext(name)[1].lower()
+    return EXTENSION_MAP.get(extension, "Others")
+
+@metrics.timed()
+def scan_files(source_folder, recursive=False):
+    """List files with os.scandir; category folders at the top level are never descended into"""
+    root = str(source_folder)
+    files = []
+    skipped = 0
+    stack = [root]
+
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if current == root and entry.name == JOURNAL_NAME:
+                    continue
+                if entry.is_file():
+                    files.append((entry.path, entry.name))
+                elif (recursive and entry.is_dir(follow_symlinks=False)
+                      and not (current == root and entry.name in CATEGORY_FOLDERS)):
+                    stack.append(entry.path)
+                else:
+                    skipped += 1
+
+    return files, skipped
+
+class NameIndex:
+    """Names in each category folder, scanned once, so collision suffixes cost O(1) instead of one stat per probe"""
+    def __init__(self):
+        self.names = {}
+        self.next_suffix = {}
+        self._lock = threading.Lock()
+
+    def _folder_names(self, folder):
+        if folder not in self.names:
+            names = set()
+            if folder.is_dir():
+                with os.scandir(folder) as entries:
+                    names.update(entry.name for entry in entries)
+            self.names[folder] = names
+        return self.names[folder]
+
+    def reserve(self, folder, name):
+        """Claim a free name in folder: name itself, else stem_N.ext with the next unused N"""
+        with self._lock:
+            names = self._folder_names(folder)
+            if name not in names:
+                names.add(name)
+                return name
+
+            stem, suffix = os.path.splitext(name)
+            counter = self.next_suffix.get((folder, name), 1)
+            while f"{stem}_{counter}{suffix}" in names:
+                counter += 1
+
+            candidate = f"{stem}_{counter}{suffix}"
+            self.next_suffix[(folder, name)] = counter + 1
+            names.add(candidate)
+            return candidate
+
+    def release(self, folder, name):
+        """Give a name back after a failed move"""
+        with self._lock:
+            self._folder_names(folder).discard(name)
+
+@metrics.timed()
+def plan_moves(source_folder, files, dry_run=False, index=None):
+    """Pick a category and collision-free target for every file, creating each folder once"""
+    index = index or NameIndex()
+    moves = []
+    created = set()
+
+    for path, name in files:
+        category = category_for_name(name)
+        cat_folder = source_folder / category
+
+        if not dry_run and category not in created:
+            cat_folder.mkdir(exist_ok=True)
+            created.add(category)
+
+        target = cat_folder / index.reserve(cat_folder, name)
+        moves.append((path, name, category, target))
+
+    return moves
+
+def move_file(source, target):
+    """Move without ever replacing an existing target: link + unlink within a filesystem, copy + delete across devices.
+
+    link() fails with FileExistsError if something appeared at target since it was
+    planned, where rename() would silently overwrite it.
+    """
+    try:
+        os.link(source, target, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EMLINK):
+            raise
+        # Across devices, or a filesystem without hard links: best effort check
+        if os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, "Target already exists", str(target))
+        shutil.move(source, target)
+        return
+    os.unlink(source)
+
+def execute_move(move):
+    path, name, category, target = move
+    try:
+        move_file(path, target)
+        return move, None
+    except PermissionError:
+        return move, f"Permission denied: {name}"
+    except Exception as e:
+        return move, f"Error with {name}: {e}"
+
+def run_moves(moves, workers):
+    """Yield (move, error) in plan order as moves complete"""
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(execute_move, moves)
+    else:
+        yield from map(execute_move, moves)
+
+def pending_from_journal(moves):
+    """Moves left over from an interrupted run, without rescanning the folder"""
+    reconcile(moves)
+
+    pending = [
+        (seq, (source, os.path.basename(source), category, Path(target)))
+        for seq, (source, category, target, status) in sorted(moves.items())
+        if status in (PLANNED, FAILED)
+    ]
+    print(f"Resuming interrupted run: {len(pending)} of {len(moves)} moves left")
+    return pending
+
+@metrics.timed()
+def undo_organize(source_folder):
+    """Replay the journal in reverse, putting every moved file back"""
+    journal_path = source_folder / JOURNAL_NAME
+    if not journal_path.exists():
+        print(f"Error: no journal found in {source_folder}")
+        return 0, 0
+
+    moves, state = load_journal(journal_path)
+    reconcile(moves)
+    restored = 0
+    errors = 0
+
+    with MoveJournal(journal_path) as journal:
+        # Until REVERTED, a new organize run must not replace this journal
+        journal.record(UNDOING)
+        journal.flush()
 
-def organize_folder(source_folder, dry_run=False):
+        for seq in sorted(moves, reverse=True):
+            source, category, target, status = moves[seq]
+            if status != DONE:
+                continue
+            name = os.path.basename(source)
+            if os.path.exists(source) and os.path.exists(target) and os.path.samefile(source, target):
+                # An interrupted undo linked the file back but didn't unlink the target yet
+                os.unlink(target)
+            if os.path.exists(source) and not os.path.exists(target):
+                # Put back by an interrupted undo after its last journal flush
+                journal.record(UNDONE, seq)
+                restored += 1
+                continue
+            try:
+                if os.path.exists(source):
+                    raise FileExistsError(f"{source} already exists")
+                os.makedirs(os.path.dirname(source), exist_ok=True)
+                move_file(target, source)
+                journal.record(UNDONE, seq)
+                restored += 1
+                print(f"Restoring {name} ← {category}/")
+            except Exception as e:
+                errors += 1
+                print(f"Error restoring {name}: {e}")
+
+        if not errors:
+            journal.record(REVERTED)
+
+    if not errors:
+        journal_path.unlink()
+        for category in [*CATEGORIES, "Others"]:
+            try:
+                (source_folder / category).rmdir()
+            except OSError:
+                pass
+
+    return restored, errors
+
+def existing_category_files(source_folder):
+    files = []
+    for category in [*CATEGORIES, "Others"]:
+        cat_folder = source_folder / category
+        if cat_folder.is_dir():
+            with os.scandir(cat_folder) as entries:
+                files.extend(entry.path for entry in entries if entry.is_file())
+    return files
+
+@metrics.timed()
+def detect_duplicates(source_folder, files):
+    """Map each incoming duplicate to its canonical copy, preferring files already organized"""
+    existing = existing_category_files(source_folder)
+    groups, dedup_stats = find_duplicates(existing + [path for path, name in files])
+
+    # Only incoming files are reported, skipped or linked; organized copies are never moved
+    incoming = {path for path, name in files}
+    duplicates = {}
+    for group in groups:
+        canonical = group[0]
+        for path in group[1:]:
+            if path in incoming:
+                duplicates[path] = canonical
+
+    print(f"Duplicates: {dedup_stats.summary()}")
+    return duplicates
+
+@metrics.timed()
+def link_duplicates(moves, duplicates, dry_run=False):
+    """Replace moved duplicates with hard links to the organized canonical copy; `moves` must only hold completed moves"""
+    final = {path: target for path, name, category, target in moves}
+    linked = 0
+
+    for path, canonical in duplicates.items():
+        if path not in final:
+            continue
+        target = final[path]
+        canonical_target = final.get(canonical, Path(canonical))
+
+        if dry_run:
+            print(f"[DRY RUN] Would hard-link {target.name} to {canonical_target.name}")
+            continue
+
+        try:
+            tmp = target.with_name(f".{target.name}.link")
+            os.link(canonical_target, tmp)
+            os.replace(tmp, target)
+            linked += 1
+        except OSError as e:
+            print(f"Could not hard-link {target.name}: {e}")
+
+    return linked
+
+def organize_folder(source_folder, dry_run=False, recursive=False, workers=1, dedup=None):
     stats_dict = {}
 
-    for cat in CATEGORIES:
+    for cat in [*CATEGORIES, "Others"]:
        stats_dict[cat] = []
 
     total_processed = 0
-    skipped = 0
     errors = 0
 
-    for file in source_folder.iterdir():
-        if not file.is_file():
-            skipped += 1
-            continue
-        try:
-           category = get_category(file)
-           cat_folder = source_folder / category
-           cat_folder.mkdir(exist_ok=True)
-
-           target_path = cat_folder / file.name
-
-           if not dry_run:
-               if target_path.exists():
-                  stem = target_path.stem
-                  suffix = target_path.suffix
-                  counter = 1
-                  while True:
-                      new_target = cat_folder / f"{stem}_{counter}{suffix}"
-                      if not new_target.exists():
-                          target_path = new_target
-                          break
-                      counter += 1
-
-               shutil.move(str(file), str(target_path))
-               stats_dict[category].append(target_path.name)
-               total_processed += 1
-               print(f"Moving {file.name} → {category}/")
-           else:
-               if target_path.exists():
-                  print(f"[DRY RUN] Would rename {file.name} to {target_path.name}")
-               else:
-                  print(f"[DRY RUN] Would move {file.name} → {category}/")
-
-        except PermissionError:
-               errors += 1
-               print(f"Permission denied: {file.name}")
-        except Exception as e:
-               errors += 1
-               print(f"Error with {file.name}: {e}")
+    skipped = 0
+    duplicates = {}
+    done = []
+    index = NameIndex()
+    journal_path = source_folder / JOURNAL_NAME
+
+    resuming = False
+    if not dry_run and journal_path.exists():
+        journal_moves, state = load_journal(journal_path)
+        if state == UNDOING:
+            print(f"Error: an undo in {source_folder} did not finish; run --undo again to complete it")
+            return stats_dict, total_processed, skipped, 1
+        resuming = state is None
+
+    if resuming:
+        pending = pending_from_journal(journal_moves)
+    else:
+        files, skipped = scan_files(source_folder, recursive)
+
+        duplicates = detect_duplicates(source_folder, files) if dedup else {}
+        if dedup == "report":
+            for path, canonical in duplicates.items():
+                print(f"Duplicate: {path} == {canonical}")
+        elif dedup == "skip" and duplicates:
+            files = [(path, name) for path, name in files if path not in duplicates]
+            for path in duplicates:
+                print(f"Skipping duplicate: {path}")
+            skipped += len(duplicates)
+
+        moves = plan_moves(source_folder, files, dry_run, index)
+
+        if dry_run:
+            for path, name, category, target in moves:
+                if target.name != name:
+                    print(f"[DRY RUN] Would rename {name} to {target.name}")
+                else:
+                    print(f"[DRY RUN] Would move {name} → {category}/")
+            if dedup == "hardlink":
+                link_duplicates(moves, duplicates, dry_run=True)
+            return stats_dict, total_processed, skipped, errors
+
+        # A finished journal is only kept for --undo; a new run replaces it
+        journal_path.unlink(missing_ok=True)
+        pending = list(enumerate(moves))
+
+    with MoveJournal(journal_path) as journal:
+        if not resuming:
+            journal.plan((path, category, target) for path, name, category, target in moves)
+
+        moves_only = [move for seq, move in pending]
+        for (seq, _), ((path, name, category, target), error) in zip(pending, run_moves(moves_only, workers)):
+            if error:
+                errors += 1
+                journal.record(FAILED, seq)
+                index.release(target.parent, target.name)
+                print(error)
+                continue
+            journal.record(DONE, seq)
+            done.append((path, name, category, target))
+            stats_dict[category].append(target.name)
+            total_processed += 1
+            print(f"Moving {name} → {category}/")
+
+        journal.record(COMPLETE)
+
+    profiler.snapshot("run_moves")
+
+    if dedup == "hardlink" and not resuming:
+        print(f"Hard-linked {link_duplicates(done, duplicates)} duplicates")
 
     return stats_dict, total_processed, skipped, errors
 
@@ -91,7 +383,13 @@ def main():
     parser.add_argument("source_folder", help="Folder to organize")
     parser.add_argument("--dry-run", action="store_true", help="Show what would happen without doing it")
     parser.add_argument("--stats", action="store_true", help="Show detailed statistics")
+    parser.add_argument("--recursive", action="store_true", help="Also organize files in subfolders")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, help="Detect byte-identical duplicates and report, skip or hard-link them")
+    parser.add_argument("--undo", action="store_true", help="Undo the last organize run using its journal")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parallel move workers (default: {DEFAULT_WORKERS})")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    profiler.start("organizer", args)
 
     source = Path(args.source_folder)
 
@@ -102,7 +400,13 @@ def main():
         print(f"Error: {source} is not a directory!")
         return
 
-    stats_dict, total_processed, skipped, errors = organize_folder(Path(args.source_folder), args.dry_run)
+    if args.undo:
+        restored, errors = undo_organize(source)
+        print(f"Restored {restored} files ({errors} errors)")
+        print("Done!")
+        return
+
+    stats_dict, total_processed, skipped, errors = organize_folder(Path(args.source_folder), args.dry_run, args.recursive, args.workers, args.dedup)
     if args.stats:
        stats(stats_dict, total_processed, skipped, errors)
     print("Done!")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+API Call Limits
+Token-bucket rate limiter and per-host circuit breaker for API clients.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from enum import Enum
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a call is allowed by the quota"""
+        delayed = False
+        start = time.monotonic()
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    if delayed:
+                        self.throttled += 1
+                        self.waited += now - start
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+
+            delayed = True
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold all callers back, e.g. after a 429 with Retry-After"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+        logger.warning(f"Rate limited by server; pausing calls for {seconds:.0f}s")
+
+    def summary(self):
+        return f"throttled={self.throttled}, waited={self.waited:.1f}s"
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    def __init__(self, name, window: int, min_calls: int, failure_rate: float, open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.window = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = BreakerState.CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.half_open_round = 0
+        self.trips = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Admit a call: None if it is dropped, else a token to hand back to record()
+
+        The token marks whether the call is a half-open probe, and for which
+        half-open round, so results of other calls can't close the breaker.
+        """
+        with self._lock:
+            if self.state == BreakerState.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.dropped += 1
+                    return None
+                self.state = BreakerState.HALF_OPEN
+                self.probes_in_flight = 0
+                self.half_open_round += 1
+                logger.info(f"Circuit for {self.name} half-open; probing")
+
+            if self.state == BreakerState.HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.dropped += 1
+                    return None
+                self.probes_in_flight += 1
+                return (True, self.half_open_round)
+
+            return (False, self.half_open_round)
+
+    def record(self, token, success: bool | None):
+        """Report how an admitted call went; success=None releases a probe without a verdict (e.g. a 429)"""
+        probe, round_ = token
+        with self._lock:
+            if probe:
+                if self.state != BreakerState.HALF_OPEN or round_ != self.half_open_round:
+                    return  # another probe already decided this round
+                self.probes_in_flight -= 1
+                if success is None:
+                    return
+                if success:
+                    self.state = BreakerState.CLOSED
+                    self.window.clear()
+                    logger.info(f"Circuit for {self.name} closed")
+                else:
+                    self._trip()
+                return
+
+            # Calls admitted before the breaker opened say nothing about the host now
+            if self.state != BreakerState.CLOSED or success is None:
+                return
+            self.window.append(success)
+            failures = self.window.count(False)
+            if len(self.window) >= self.min_calls and failures / len(self.window) >= self.failure_rate:
+                self._trip()
+
+    def _trip(self):
+        self.state = BreakerState.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self.window.clear()
+        logger.warning(f"Circuit for {self.name} opened for {self.open_seconds}s")
+
+    def summary(self):
+        return f"{self.name}: state={self.state.value}, trips={self.trips}, dropped={self.dropped}"
+
+class BreakerRegistry:
+    """One circuit breaker per host"""
+    def __init__(self, **settings):
+        self.settings = settings
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(host, **self.settings)
+            return self.breakers[host]
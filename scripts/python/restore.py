@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Backup Restore
+Restores archives made by backup.py, from BACKUP_DESTINATION or from S3.
+S3 archives are downloaded with parallel ranged GETs; the parts are
+hashed in order and streamed straight into tar, so downloading,
+SHA-256 verification and decompression/extraction overlap. Files land
+in a staging directory that only takes the backup's name once the
+checksum from its JSON manifest has matched.
+Backups made with backup.py --seekable can also give up single files or
+subtrees (--path): only the frames holding them are read or fetched.
+
+    python restore.py list
+    python restore.py restore documents --target /tmp/restore
+    python restore.py restore documents_20251117_020000 --from s3 --workers 16 --target /tmp/restore
+    python restore.py restore documents --from s3 --path notes/todo.txt --path photos/2024 --target /tmp/restore
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from config import LOG_FILE, BACKUP_DESTINATION, S3_BACKUP_BUCKET, S3_PREFIX
+from instrumentation import METRICS_DIR, add_profile_arguments, metrics, profiler
+from seekable_archive import INDEX_SUFFIX, ArchiveIndex, extract_paths, index_path, local_reader
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_PART_MB = 8
+LOCAL_CHUNK = 1024 * 1024
+PERMANENT_ERRORS = ["AccessDenied", "NoSuchKey", "NoSuchBucket", "PreconditionFailed"]
+
+class RestoreError(Exception):
+    pass
+
+class Backup:
+    """One archive, local or in S3; the manifest is only read for the backup being restored"""
+    def __init__(self, name, location, size_bytes, path=None, key=None):
+        self.name = name
+        self.location = location
+        self.size_bytes = size_bytes
+        self.path = path
+        self.key = key
+
+    @property
+    def stem(self):
+        return self.name[:-len(".tar.gz")]
+
+    @property
+    def source_name(self):
+        return self.stem.rsplit("_", 2)[0]
+
+    @property
+    def created(self):
+        return datetime.strptime("_".join(self.stem.rsplit("_", 2)[1:]), "%Y%m%d_%H%M%S")
+
+def is_backup_name(name):
+    try:
+        return name.endswith(".tar.gz") and bool(Backup(name, None, 0).created)
+    except ValueError:
+        return False
+
+# ===== FINDING BACKUPS =====
+
+def find_local_backups(backup_dir):
+    return [
+        Backup(path.name, "local", path.stat().st_size, path=path)
+        for path in Path(backup_dir).glob("*.tar.gz") if is_backup_name(path.name)
+    ]
+
+def find_s3_backups(s3, bucket, prefix):
+    backups = []
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            name = obj["Key"].rsplit("/", 1)[-1]
+            if is_backup_name(name):
+                backups.append(Backup(name, "s3", obj["Size"], key=obj["Key"]))
+    return backups
+
+def select_backup(backups, wanted):
+    """`wanted` is an archive name (with or without .tar.gz) or a source folder name, meaning its latest backup"""
+    name = wanted if wanted.endswith(".tar.gz") else f"{wanted}.tar.gz"
+    exact = [b for b in backups if b.name == name]
+    if exact:
+        return exact[0]
+    of_source = [b for b in backups if b.source_name == wanted]
+    if of_source:
+        return max(of_source, key=lambda b: b.created)
+    return None
+
+def load_manifest(backup, s3=None, bucket=None):
+    """The manifest written by create_backup_manifest, or None if it is missing"""
+    if backup.location == "local":
+        manifest_file = backup.path.with_name(f"{backup.stem}.json")
+        return json.loads(manifest_file.read_text()) if manifest_file.exists() else None
+    try:
+        body = s3.get_object(Bucket=bucket, Key=backup.key[:-len(".tar.gz")] + ".json")["Body"].read()
+        return json.loads(body)
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ["NoSuchKey", "404"]:
+            raise
+        return None
+
+def expected_checksum(backup, s3=None, bucket=None):
+    manifest = load_manifest(backup, s3, bucket)
+    if manifest:
+        return manifest["checksum_sha256"]
+    if backup.location == "s3":
+        # Older backups only have the checksum in the archive's metadata
+        head = s3.head_object(Bucket=bucket, Key=backup.key)
+        return head["Metadata"].get("sha256")
+    return None
+
+def load_index(backup, s3=None, bucket=None, manifest=None):
+    """The member index of a seekable backup, checked against the manifest's index_sha256 when recorded"""
+    try:
+        if backup.location == "local":
+            raw = index_path(backup.path).read_bytes()
+        else:
+            raw = s3.get_object(Bucket=bucket, Key=backup.key.replace(".tar.gz", INDEX_SUFFIX))["Body"].read()
+    except FileNotFoundError:
+        raw = None
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ["NoSuchKey", "404"]:
+            raise
+        raw = None
+    if raw is None:
+        raise RestoreError(f"{backup.name} has no member index (only backups made with --seekable support --path)")
+
+    if manifest and manifest.get("index_sha256") and hashlib.sha256(raw).hexdigest() != manifest["index_sha256"]:
+        raise RestoreError(f"Index checksum mismatch for {backup.name}")
+    return ArchiveIndex.from_bytes(raw)
+
+# ===== READING =====
+
+def local_chunks(path):
+    with open(path, "rb") as f:
+        while chunk := f.read(LOCAL_CHUNK):
+            metrics.count("bytes_read", len(chunk))
+            yield chunk
+
+@metrics.timed()
+def fetch_range(s3, bucket, key, etag, start, end, retries=3):
+    for attempt in range(1, retries + 1):
+        try:
+            body = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)["Body"].read()
+            if len(body) != end - start + 1:
+                raise IOError(f"short read: {len(body)} of {end - start + 1} bytes")
+            metrics.count("range_requests")
+            metrics.count("bytes_downloaded", len(body))
+            return body
+
+        except (ClientError, BotoCoreError, IOError) as e:
+            logger.warning(f"Attempt {attempt} failed for {key} bytes {start}-{end}: {e}")
+
+            if isinstance(e, ClientError):
+                code = e.response["Error"]["Code"]
+                if code in PERMANENT_ERRORS:
+                    raise RestoreError(f"{key}: {code} (the archive may have changed during the restore)")
+
+            if attempt == retries:
+                raise RestoreError(f"Failed after {retries} attempts: {key} bytes {start}-{end}")
+
+            metrics.count("download_retries")
+            time.sleep(2 ** attempt)
+
+def s3_chunks(s3, bucket, key, workers, part_size):
+    """Yield the object's bytes in order while up to 2 * workers ranged GETs run ahead"""
+    head = s3.head_object(Bucket=bucket, Key=key)
+    size, etag = head["ContentLength"], head["ETag"]
+    ranges = iter([(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)])
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = deque(pool.submit(fetch_range, s3, bucket, key, etag, *r) for r in islice(ranges, 2 * workers))
+        while pending:
+            part = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range:
+                pending.append(pool.submit(fetch_range, s3, bucket, key, etag, *next_range))
+            yield part
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def s3_reader(s3, bucket, key):
+    etag = s3.head_object(Bucket=bucket, Key=key)["ETag"]
+    return lambda start, end: fetch_range(s3, bucket, key, etag, start, end)
+
+def counted(read_range):
+    def read(start, end):
+        data = read_range(start, end)
+        metrics.count("bytes_read", len(data))
+        return data
+    return read
+
+# ===== EXTRACTING =====
+
+def tar_command(staging):
+    # pigz decompresses on its own threads; plain gzip still runs beside the download
+    if shutil.which("pigz"):
+        return ["tar", "-I", "pigz", "-xf", "-", "-C", str(staging)]
+    return ["tar", "-xzf", "-", "-C", str(staging)]
+
+@metrics.timed()
+def stream_extract(chunks, staging):
+    """Feed chunks to tar while hashing them; returns (sha256 hex, bytes)"""
+    sha256_hash = hashlib.sha256()
+    total = 0
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(tar_command(staging), stdin=subprocess.PIPE, stderr=errors)
+        try:
+            for chunk in chunks:
+                sha256_hash.update(chunk)
+                total += len(chunk)
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            process.wait()
+
+        if process.returncode != 0:
+            errors.seek(0)
+            raise RestoreError(f"tar failed: {errors.read().decode(errors='replace').strip()}")
+
+    return sha256_hash.hexdigest(), total
+
+def restore_backup(backup, target_dir, s3=None, bucket=None, workers=DEFAULT_WORKERS, part_size=DEFAULT_PART_MB * 1024 * 1024, verify=True):
+    """Extract `backup` into target_dir/<backup name>; returns a summary dict"""
+    checksum = expected_checksum(backup, s3, bucket)
+    if checksum is None and verify:
+        raise RestoreError(f"No SHA-256 recorded for {backup.name} (use --no-verify to restore it unverified)")
+
+    destination = Path(target_dir) / backup.stem
+    if destination.exists():
+        raise RestoreError(f"{destination} already exists")
+    staging = Path(target_dir) / f".{backup.stem}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    logger.info(f"Restoring {backup.name} ({backup.size_bytes / (1024 * 1024):.2f} MB) from {backup.location}")
+    start = time.perf_counter()
+    try:
+        if backup.location == "s3":
+            chunks = s3_chunks(s3, bucket, backup.key, workers, part_size)
+        else:
+            chunks = local_chunks(backup.path)
+        actual, size = stream_extract(chunks, staging)
+
+        # --no-verify only allows a missing checksum; a recorded one is always checked
+        if checksum is not None and actual != checksum:
+            raise RestoreError(f"Checksum mismatch for {backup.name}: expected {checksum}, got {actual}")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    staging.rename(destination)
+    seconds = time.perf_counter() - start
+    return {
+        "backup": backup.name,
+        "location": backup.location,
+        "destination": str(destination),
+        "bytes": size,
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(size / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+        "verified": checksum is not None,
+    }
+
+@metrics.timed()
+def restore_paths(backup, paths, target_dir, s3=None, bucket=None, workers=DEFAULT_WORKERS, part_size=DEFAULT_PART_MB * 1024 * 1024):
+    """Extract only `paths` (files or directories) of a seekable backup into target_dir/<backup name>.
+
+    Every frame read is a complete gzip member whose CRC32 is checked on decompression;
+    the archive-wide SHA-256 can't be checked without reading the whole archive.
+    """
+    index = load_index(backup, s3, bucket, load_manifest(backup, s3, bucket))
+    missing = [path for path in paths if not index.select([path])]
+    if missing:
+        raise RestoreError(f"Not in {backup.name}: {', '.join(missing)}")
+
+    destination = Path(target_dir) / backup.stem
+    if destination.exists():
+        raise RestoreError(f"{destination} already exists")
+    staging = Path(target_dir) / f".{backup.stem}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    logger.info(f"Restoring {len(paths)} path(s) from {backup.name} ({backup.location})")
+    start = time.perf_counter()
+    try:
+        if backup.location == "s3":
+            read_range = s3_reader(s3, bucket, backup.key)
+        else:
+            read_range = local_reader(backup.path)
+        members, size = extract_paths(index, counted(read_range), paths, staging, workers, part_size)
+    except zlib.error as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RestoreError(f"Corrupt frame in {backup.name}: {e}")
+    except tarfile.TarError as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RestoreError(f"Could not extract from {backup.name}: {e}")
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    staging.rename(destination)
+    seconds = time.perf_counter() - start
+    metrics.count("members_restored", members)
+    return {
+        "backup": backup.name,
+        "location": backup.location,
+        "destination": str(destination),
+        "members": members,
+        "bytes": size,
+        "archive_bytes": backup.size_bytes,
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(size / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Restore backups made by backup.py")
+    parser.add_argument("--from", dest="origin", choices=["auto", "local", "s3"], default="auto",
+                        help="Where to look: local BACKUP_DESTINATION, S3, or local first (default)")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR, help="Write phase timings and counters here (restore.prom, restore_run.json)")
+    add_profile_arguments(parser, str(Path(LOG_FILE).parent))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Show available backups")
+
+    restore = sub.add_parser("restore", help="Download, verify and extract one backup")
+    restore.add_argument("backup", help="Archive name (e.g. documents_20251117_020000) or source folder name for its latest backup")
+    restore.add_argument("--target", required=True, type=Path, help="Directory to restore into; the backup goes to <target>/<archive name>")
+    restore.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parallel ranged GETs for S3 (default: {DEFAULT_WORKERS})")
+    restore.add_argument("--part-size", type=int, default=DEFAULT_PART_MB, help=f"Ranged GET size in MB, also the most read at once with --path (default: {DEFAULT_PART_MB})")
+    restore.add_argument("--no-verify", dest="verify", action="store_false", help="Restore even without a recorded checksum")
+    restore.add_argument("--path", dest="paths", action="append",
+                         help="Only restore this file or directory (relative to the backed-up folder, or absolute); repeatable. Needs a --seekable backup")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    profiler.start("restore", args)
+    if args.metrics_dir:
+        metrics.enable("restore")
+
+    backups = []
+    s3 = None
+    if args.origin in ["auto", "local"]:
+        backups += find_local_backups(BACKUP_DESTINATION)
+    if args.origin in ["auto", "s3"] and S3_BACKUP_BUCKET:
+        s3 = boto3.client("s3")
+        try:
+            backups += find_s3_backups(s3, S3_BACKUP_BUCKET, S3_PREFIX or "")
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"Could not list S3 backups: {e}")
+
+    if args.command == "list":
+        for b in sorted(backups, key=lambda b: (b.source_name, b.created, b.location)):
+            print(f"{b.stem:<45} {b.location:<6} {b.size_bytes / (1024 * 1024):>10.2f} MB  {b.created}")
+        return True
+
+    # Local copies come first in the list, so "auto" prefers them over S3
+    backup = select_backup(backups, args.backup)
+    if backup is None:
+        logger.error(f"No backup found for '{args.backup}'")
+        return False
+
+    try:
+        if args.paths:
+            result = restore_paths(backup, args.paths, args.target, s3, S3_BACKUP_BUCKET, args.workers, args.part_size * 1024 * 1024)
+        else:
+            result = restore_backup(backup, args.target, s3, S3_BACKUP_BUCKET, args.workers, args.part_size * 1024 * 1024, args.verify)
+    except (RestoreError, ClientError, BotoCoreError, OSError, ValueError) as e:
+        logger.error(f"Restore failed: {e}")
+        return False
+
+    logger.info(f"Restored {result['backup']} to {result['destination']}")
+    if args.paths:
+        share = 100 * result["bytes"] / result["archive_bytes"] if result["archive_bytes"] else 0
+        logger.info(f"{result['members']} members from {result['bytes'] / (1024 * 1024):.2f} MB read "
+                    f"({share:.1f}% of the archive) in {result['seconds']:.2f}s, frame CRCs verified")
+    else:
+        logger.info(f"{result['bytes'] / (1024 * 1024):.2f} MB in {result['seconds']:.2f}s ({result['mb_per_s']:.2f} MB/s), "
+                    f"{'SHA-256 verified' if result['verified'] else 'NOT verified'}")
+
+    if args.metrics_dir:
+        prom, report = metrics.write(args.metrics_dir)
+        logger.info(f"Metrics written: {prom}, {report}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -8,6 +8,7 @@ import argparse
 from pathlib import Path
 from botocore.exceptions import ClientError
 from boto3.exceptions import S3UploadFailedError
+from instrumentation import METRICS_DIR, add_profile_arguments, metrics, profiler
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +25,7 @@ def compute_checksum(file_path: Path) -> str:
 
     return md5.hexdigest()
 
+@metrics.timed()
 def build_local_manifest(source_dir: Path) -> dict:
     manifest = {}
 
@@ -42,11 +44,14 @@ def build_local_manifest(source_dir: Path) -> dict:
                 "size": size,
                 "checksum": compute_checksum(file_path)
             }
+            metrics.count("files_hashed")
+            metrics.count("bytes_hashed", size)
         except Exception as e:
             logger.warning(f"Skipping {file_path}: {e}")
 
     return manifest
     
+@metrics.timed()
 def build_s3_manifest(s3, bucket: str, prefix: str = "") -> dict:
     manifest = {}
 
@@ -54,6 +59,8 @@ def build_s3_manifest(s3, bucket: str, prefix: str = "") -> dict:
 
     try:
         for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            metrics.count("list_requests")
+            metrics.count("objects_listed", len(page.get("Contents", [])))
             for obj in page.get("Contents", []):
                 key = obj["Key"]
 
@@ -73,6 +80,7 @@ def build_s3_manifest(s3, bucket: str, prefix: str = "") -> dict:
 
     return manifest
 
+@metrics.timed()
 def build_sync_plan(local_manifest, s3_manifest):
     to_upload = []
     to_skip = []
@@ -98,6 +106,7 @@ class SyncStats:
         self.skipped = 0
         self.deleted = 0
 
+@metrics.timed()
 def upload_files(s3, bucket, base_path, files, stats):
     total = len(files)
 
@@ -107,11 +116,15 @@ def upload_files(s3, bucket, base_path, files, stats):
         try:
             s3.upload_file(local_path, bucket, path)
             stats.uploaded += 1
+            metrics.count("objects_uploaded")
+            metrics.count("bytes_uploaded", os.path.getsize(local_path))
             logger.info(f"Uploaded ({i}/{total}): {path}")
 
         except (ClientError, S3UploadFailedError) as e:
             logger.error(f"Upload failed for {path}: {e}")
+            metrics.count("upload_failures")
 
+@metrics.timed()
 def delete_local_files(base_path, files, stats):
     for path in files:
         full_path = os.path.join(base_path, path)
@@ -120,10 +133,12 @@ def delete_local_files(base_path, files, stats):
             if os.path.exists(full_path):
                 os.remove(full_path)
                 stats.deleted += 1
+                metrics.count("objects_deleted")
                 logger.info(f"Deleted: {path}")
         except Exception as e:
             logger.error(f"Delete failed for {path}: {e}")
 
+@metrics.timed()
 def sync(local_manifest, s3_manifest, s3, bucket, base_path, delete=False, dry_run=False):
     stats = SyncStats()
 
@@ -170,14 +185,20 @@ def parse_args():
     parser.add_argument("--bucket", required=True)
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--delete", action="store_true")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR, help="Write phase timings and counters here (s3_sync.prom, s3_sync_run.json)")
+    add_profile_arguments(parser)
 
     return parser.parse_args()
 
 def main():
     args = parse_args()
+    profiler.start("s3_sync", args)
 
     source_dir = Path(args.source)
 
+    if args.metrics_dir:
+        metrics.enable("s3_sync")
+
     if not source_dir.exists():
         logger.critical("Source directory does not exist")
         return
@@ -200,6 +221,11 @@ def main():
 
     except Exception as e:
         logger.critical(f"Fatal error: {e}")
+        metrics.count("fatal_errors")
+
+    if args.metrics_dir:
+        prom, report = metrics.write(args.metrics_dir)
+        logger.info(f"Metrics written: {prom}, {report}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Seekable Archives
+A .tar.gz written as a series of independently compressed gzip members
+("frames", one per FRAME_SIZE bytes of tar stream), plus a member index:
+each path's header offset and data offset in the tar stream (and link target).
+The archive is still an ordinary multi-member gzip, so tar -xzf and full
+restores read it as usual, but one file or subtree can be pulled out by
+decompressing only the frames that hold it - read from disk, or fetched
+from S3 with ranged GETs (see restore.py --path).
+
+    python seekable_archive.py create ~/documents backups/documents_20251117_020000.tar.gz
+    python seekable_archive.py list backups/documents_20251117_020000.tar.gz
+    python seekable_archive.py extract backups/documents_20251117_020000.tar.gz notes/todo.txt --target /tmp/out
+"""
+
+import argparse
+import bisect
+import gzip
+import json
+import os
+import sys
+import tarfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+FRAME_SIZE = 4 * 1024 * 1024
+COMPRESS_LEVEL = 6
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json.gz"
+MAX_READ_BYTES = 8 * 1024 * 1024
+DECOMPRESS_CHUNK = 1024 * 1024
+
+# ===== WRITING =====
+
+class FrameWriter:
+    """File-like sink for tarfile: cuts the stream into frames and compresses them on a thread pool.
+
+    zlib releases the GIL while compressing, so frames compress in parallel;
+    they are written in order with at most 2 * workers frames in memory.
+    """
+    def __init__(self, out, frame_size=FRAME_SIZE, workers=None):
+        self.out = out
+        self.frame_size = frame_size
+        self.frames = []
+        self.position = 0
+        self.compressed = 0
+        self.buffer = bytearray()
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        while len(self.buffer) >= self.frame_size:
+            self._submit(bytes(self.buffer[:self.frame_size]))
+            del self.buffer[:self.frame_size]
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def _submit(self, data):
+        self.pending.append((len(data), self.pool.submit(gzip.compress, data, COMPRESS_LEVEL, mtime=0)))
+        if len(self.pending) >= 2 * self.workers:
+            self._drain(1)
+
+    def _drain(self, count=None):
+        while self.pending and (count is None or count > 0):
+            size, future = self.pending.popleft()
+            frame = future.result()
+            uncompressed_start = self.frames[-1][2] + self.frames[-1][3] if self.frames else 0
+            self.frames.append((self.compressed, len(frame), uncompressed_start, size))
+            self.out.write(frame)
+            self.compressed += len(frame)
+            if count is not None:
+                count -= 1
+
+    def close(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        self._drain()
+        self.pool.shutdown()
+
+def padded(size):
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+def walk(source_path):
+    """The source directory and everything under it, parents before children, in a stable order"""
+    yield source_path
+    for root, dirs, files in os.walk(source_path):
+        dirs.sort()
+        for name in sorted(dirs) + sorted(files):
+            yield Path(root) / name
+
+def write_archive(source_path, output_path, frame_size=FRAME_SIZE, workers=None):
+    """Write a seekable tar.gz of source_path and its index; returns the index path.
+
+    Member names match `tar -czf output /abs/source`: the absolute path without its leading '/'.
+    """
+    source_path = Path(source_path).resolve()
+    members = []
+    with open(output_path, "wb") as out:
+        writer = FrameWriter(out, frame_size, workers)
+        with tarfile.open(fileobj=writer, mode="w") as tar:
+            for path in walk(source_path):
+                info = tar.gettarinfo(str(path), arcname=str(path).lstrip("/"))
+                if info is None:
+                    continue  # sockets and other types tar can't store
+                offset = tar.offset
+                if info.isreg():
+                    with open(path, "rb") as f:
+                        tar.addfile(info, f)
+                    data_offset = tar.offset - padded(info.size)
+                else:
+                    tar.addfile(info)
+                    data_offset = tar.offset
+                members.append((info.name, info.type.decode(), info.size, offset, data_offset, info.linkname))
+        writer.close()
+
+    index = {
+        "version": INDEX_VERSION,
+        "source": str(source_path),
+        "frame_size": frame_size,
+        "frames": writer.frames,
+        "members": members,
+    }
+    index_file = index_path(output_path)
+    with gzip.open(index_file, "wt", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    return index_file
+
+def index_path(archive_path):
+    archive_path = Path(archive_path)
+    return archive_path.with_name(archive_path.name.replace(".tar.gz", INDEX_SUFFIX))
+
+# ===== READING =====
+
+class ArchiveIndex:
+    def __init__(self, data):
+        if data["version"] != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {data['version']}")
+        self.source = data["source"]
+        self.frames = data["frames"]
+        self.members = data["members"]
+        self.frame_starts = [frame[2] for frame in self.frames]
+
+    @classmethod
+    def from_bytes(cls, raw):
+        return cls(json.loads(gzip.decompress(raw)))
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_bytes(Path(path).read_bytes())
+
+    def archive_name(self, path):
+        """Member name for a path given relative to the backed-up folder, or as an absolute path"""
+        path = str(path)
+        if path.startswith("/"):
+            return path.strip("/")
+        return f"{self.source.lstrip('/')}/{path.strip('/')}".rstrip("/")
+
+    def select(self, paths):
+        """Members matching each path exactly or lying under it, plus the targets of selected hard links"""
+        names = [self.archive_name(path) for path in paths]
+        selected = [m for m in self.members if any(m[0] == name or m[0].startswith(name + "/") for name in names)]
+
+        chosen = {m[0] for m in selected}
+        # Indexes from before link targets were recorded have five fields
+        targets = {m[5] for m in selected if m[1] == tarfile.LNKTYPE.decode() and len(m) > 5} - chosen
+        selected += [m for m in self.members if m[0] in targets]
+        return selected
+
+    def frame_of(self, offset):
+        return bisect.bisect_right(self.frame_starts, offset) - 1
+
+    def plan(self, members):
+        """Group members into runs of consecutive frames: (first frame, last frame, members)"""
+        runs = []
+        for member in sorted(members, key=lambda m: m[3]):
+            name, kind, size, offset, data_offset = member[:5]
+            end = data_offset + (padded(size) if kind in ("0", "\0") else 0)
+            first, last = self.frame_of(offset), self.frame_of(max(end - 1, offset))
+            if runs and first <= runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], max(last, runs[-1][1]), runs[-1][2] + [member])
+            else:
+                runs.append((first, last, [member]))
+        return runs
+
+    def reads(self, first, last, max_bytes):
+        """Compressed [start, end] (inclusive) ranges covering frames first..last, each at most max_bytes
+        unless a single frame is bigger, and split at frame boundaries"""
+        spans = []
+        start = self.frames[first][0]
+        for number in range(first, last + 1):
+            offset, size = self.frames[number][:2]
+            if offset + size - start > max_bytes and offset > start:
+                spans.append((start, offset - 1))
+                start = offset
+        spans.append((start, self.frames[last][0] + self.frames[last][1] - 1))
+        return spans
+
+class FrameStream:
+    """Read-only stream of the tar bytes in a run of frames, decompressed as tarfile reads them.
+
+    `chunks` yields the run's compressed bytes in order, split at frame boundaries.
+    Each frame is a complete gzip member, so its CRC32 is checked as it ends.
+    """
+    def __init__(self, chunks, skip=0):
+        self.chunks = chunks
+        self.skip = skip
+        self.compressed = b""
+        self.decompressor = zlib.decompressobj(wbits=31)
+        self.in_frame = False
+        self.buffer = bytearray()
+
+    def _fill(self):
+        if not self.compressed:
+            self.compressed = next(self.chunks, b"")
+            if not self.compressed:
+                if self.in_frame:
+                    raise zlib.error("truncated frame")
+                return False
+        self.in_frame = True
+        data = self.decompressor.decompress(self.compressed, DECOMPRESS_CHUNK)
+        self.compressed = self.decompressor.unconsumed_tail
+        if self.decompressor.eof:
+            # The next frame's bytes; unconsumed_tail may repeat them
+            self.compressed = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(wbits=31)
+            self.in_frame = False
+
+        if self.skip:
+            dropped = min(self.skip, len(data))
+            data = data[dropped:]
+            self.skip -= dropped
+        self.buffer += data
+        return True
+
+    def finish_frame(self):
+        """Decompress the rest of the current frame so its CRC32 is checked, discarding the output"""
+        while self.in_frame and self._fill():
+            self.buffer.clear()
+
+    def read(self, size=-1):
+        while (size < 0 or len(self.buffer) < size) and self._fill():
+            pass
+        size = len(self.buffer) if size < 0 else min(size, len(self.buffer))
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+def restore_filter(member, path):
+    """tarfile's "data" filter, except that symlinks pointing outside the tree are kept as they are, like tar -x does.
+
+    Files are still never written through such a link: "data" rejects any path that resolves outside the target.
+    """
+    try:
+        return tarfile.data_filter(member, path)
+    except (tarfile.AbsoluteLinkError, tarfile.LinkOutsideDestinationError):
+        if not member.issym():
+            raise
+        return tarfile.tar_filter(member, path)
+
+def extract_run(index, first, members, chunks, destination, directories):
+    """Stream one run's frames through tarfile and extract `members`; directories get their attributes later"""
+    wanted = {m[0] for m in members}
+    stream = FrameStream(chunks, skip=min(m[3] for m in members) - index.frames[first][2])
+    extracted = 0
+    with tarfile.open(fileobj=stream, mode="r|") as tar:
+        for info in tar:
+            if info.name not in wanted:
+                continue
+            try:
+                # A read-only directory would block its own contents; set its mode once everything is out
+                tar.extract(info, destination, set_attrs=not info.isdir(), filter=restore_filter)
+            except KeyError as e:
+                raise tarfile.ExtractError(f"{info.name}: hard link target {info.linkname} was not restored") from e
+            if info.isdir():
+                directories.append(info)
+            extracted += 1
+            if extracted == len(wanted):
+                break
+    # tarfile stops mid-frame; a corrupt byte in what it read only shows up in the frame's CRC
+    stream.finish_frame()
+    return extracted
+
+def extract_paths(index, read_range, paths, destination, workers=1, max_read=MAX_READ_BYTES):
+    """Extract files/subtrees using read_range(start, end) -> compressed bytes; returns (members, bytes read).
+
+    Each run of frames is read in pieces of at most max_read bytes (at least one frame),
+    with up to 2 * workers reads in flight, so memory stays bounded however big the files are.
+    """
+    runs = index.plan(index.select(paths))
+    reads = iter([(number, *span) for number, (first, last, _) in enumerate(runs) for span in index.reads(first, last, max_read)])
+    pending = deque()
+    read = 0
+    directories = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def chunks(number):
+            nonlocal read
+            while True:
+                while len(pending) < 2 * workers and (next_read := next(reads, None)):
+                    pending.append((next_read[0], pool.submit(read_range, *next_read[1:])))
+                # Left over from an earlier run that stopped once it had all its members
+                while pending and pending[0][0] < number:
+                    pending.popleft()[1].cancel()
+                if not pending or pending[0][0] != number:
+                    return
+                data = pending.popleft()[1].result()
+                read += len(data)
+                yield data
+
+        extracted = sum(
+            extract_run(index, first, members, chunks(number), destination, directories)
+            for number, (first, last, members) in enumerate(runs)
+        )
+
+    for info in reversed(directories):
+        path = os.path.join(destination, info.name)
+        os.chmod(path, info.mode & 0o755)
+        os.utime(path, (info.mtime, info.mtime))
+    return extracted, read
+
+def local_reader(archive_path):
+    def read_range(start, end):
+        with open(archive_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+    return read_range
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create seekable tar.gz archives and extract single files from them")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="Archive a directory in the seekable format")
+    create.add_argument("source")
+    create.add_argument("archive")
+    create.add_argument("--frame-size", type=int, default=FRAME_SIZE // (1024 * 1024), help="Frame size in MB (default: 4)")
+
+    listing = sub.add_parser("list", help="List members from the index")
+    listing.add_argument("archive")
+
+    extract = sub.add_parser("extract", help="Extract files or subtrees (paths relative to the archived folder, or absolute)")
+    extract.add_argument("archive")
+    extract.add_argument("paths", nargs="+")
+    extract.add_argument("--target", required=True, type=Path)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.command == "create":
+        index_file = write_archive(args.source, args.archive, args.frame_size * 1024 * 1024)
+        index = ArchiveIndex.load(index_file)
+        print(f"{args.archive}: {len(index.members)} members in {len(index.frames)} frames (index: {index_file})")
+        return
+
+    index = ArchiveIndex.load(index_path(args.archive))
+    if args.command == "list":
+        for name, kind, size, offset, *_ in index.members:
+            print(f"{size:>12}  frame {index.frame_of(offset):>5}  {name}")
+    else:
+        args.target.mkdir(parents=True, exist_ok=True)
+        try:
+            extracted, read = extract_paths(index, local_reader(args.archive), args.paths, args.target)
+        except zlib.error as e:
+            sys.exit(f"Error: corrupt frame in {args.archive}: {e}")
+        total = os.path.getsize(args.archive)
+        print(f"Extracted {extracted} members, read {read} of {total} bytes ({100 * read / total if total else 0:.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,25 @@ import datetime
 import json
 import time
 import argparse
-from config import API_KEY, DEFAULT_CITIES, LOG_FILE, DATA_DIR, BASE_URL, DEFAULT_UNITS, REQUEST_TIMEOUT
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import API_KEY, DEFAULT_CITIES, LOG_FILE, DATA_DIR, BASE_URL, DEFAULT_UNITS, REQUEST_TIMEOUT, CACHE_DB, CACHE_TTL, CACHE_STALE_TTL, NEGATIVE_CACHE_TTL, GROUP_URL, GROUP_BATCH_SIZE, CITY_INDEX_FILE, STORAGE_BACKEND, OBSERVATIONS_DIR, RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, MAX_WORKERS, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_FAILURE_RATE, BREAKER_OPEN_SECONDS, BREAKER_HALF_OPEN_PROBES
 from pathlib import Path
 from enum import Enum
+from weather_cache import WeatherCache, STALE
+from city_index import CityIndex
+from weather_store import WeatherStore
+from rate_limiter import TokenBucket, BreakerRegistry
+from instrumentation import add_profile_arguments, metrics, profiler
 
 class FetchResult(Enum):
     SUCCESS = "success"
     NETWORK_ERROR = "network_error"
+    RATE_LIMITED = "rate_limited"
     NOT_FOUND = "not_found"
     INVALID_CONFIG = "invalid_config"
     GLOBAL_NETWORK_FAILURE = "global_network_failure"
+    CIRCUIT_OPEN = "circuit_open"
 
 Path("logs").mkdir(exist_ok=True)
 
@@ -39,26 +48,60 @@ PARAMETER_MAP = {
 
 PARAMETER_CHOICES = list(PARAMETER_MAP.keys())
 
-def fetch_weather(city):
-   logger.info("Starting data fetch...")
-   params = {
+rate_limiter = TokenBucket(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+breakers = BreakerRegistry(
+    window=BREAKER_WINDOW,
+    min_calls=BREAKER_MIN_CALLS,
+    failure_rate=BREAKER_FAILURE_RATE,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    half_open_probes=BREAKER_HALF_OPEN_PROBES,
+)
+
+def build_params(city):
+   return {
        "q": city,
        "appid": API_KEY,
        "units": DEFAULT_UNITS,
    }
 
+def build_id_params(city_id):
+   return {
+       "id": city_id,
+       "appid": API_KEY,
+       "units": DEFAULT_UNITS,
+   }
+
+def request_weather(url, params):
+   breaker = breakers.for_url(url)
+   token = breaker.allow()
+   if token is None:
+       logger.warning(f"Circuit open for {breaker.name}; dropping request")
+       return FetchResult.CIRCUIT_OPEN, None
+
+   rate_limiter.acquire()
+   status, data = send_request(url, params)
+   # 404/401/403 say nothing about the host's health, and a 429 only means we are over quota
+   breaker.record(token, None if status == FetchResult.RATE_LIMITED else status != FetchResult.NETWORK_ERROR)
+   return status, data
+
+def send_request(url, params):
    try:
-       response = requests.get(BASE_URL, params=params, timeout=REQUEST_TIMEOUT)
+       response = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
        response.raise_for_status()
        logger.info("API call successful!")
-       data = response.json()
-       logger.info(f"Fetched weather data for {data['name']}")
-       return FetchResult.SUCCESS, data
+       return FetchResult.SUCCESS, response.json()
 
    except requests.exceptions.HTTPError as e:
        if response.status_code == 404:
           logger.error(f"City not found (404): {e}")
           return FetchResult.NOT_FOUND, None
+       elif response.status_code in (401, 403):
+          logger.error(f"Request rejected ({response.status_code}): {e}")
+          return FetchResult.INVALID_CONFIG, None
+       elif response.status_code == 429:
+          retry_after = response.headers.get("Retry-After", "60")
+          rate_limiter.pause(float(retry_after) if retry_after.isdigit() else 60)
+          return FetchResult.RATE_LIMITED, None
        else:
            logger.error(f"HTTP Error: {e}")
            return FetchResult.NETWORK_ERROR, None
@@ -69,20 +112,49 @@ def fetch_weather(city):
           logger.error(f"Unexpected error occurred: {e}")
           return FetchResult.NETWORK_ERROR, None
 
-def retry_fetch(city, max_retries=3):
+def fetch_weather(city):
+   logger.info("Starting data fetch...")
+   status, data = request_weather(BASE_URL, build_params(city))
+   if status == FetchResult.SUCCESS:
+       logger.info(f"Fetched weather data for {data['name']}")
+   return status, data
+
+def fetch_weather_by_id(city_id):
+   logger.info(f"Starting data fetch for city ID {city_id}...")
+   status, data = request_weather(BASE_URL, build_id_params(city_id))
+   if status == FetchResult.SUCCESS:
+       logger.info(f"Fetched weather data for {data['name']}")
+   return status, data
+
+def fetch_weather_group(city_ids):
+   logger.info(f"Starting batched fetch for {len(city_ids)} cities...")
+   params = {
+       "id": ",".join(str(city_id) for city_id in city_ids),
+       "appid": API_KEY,
+       "units": DEFAULT_UNITS,
+   }
+   status, data = request_weather(GROUP_URL, params)
+   if status == FetchResult.SUCCESS:
+       return status, data.get("list", [])
+   return status, None
+
+def retry_fetch(city, max_retries=3, fetcher=fetch_weather):
     for attempt in range(1, max_retries + 1):
 
         logger.info(f"Attempt {attempt} to fetch weather for {city}!")
-        status, data = fetch_weather(city)
+        status, data = fetcher(city)
 
-        if status == FetchResult.NOT_FOUND:
+        if status in (FetchResult.NOT_FOUND, FetchResult.INVALID_CONFIG, FetchResult.CIRCUIT_OPEN):
            logger.critical(f"Retry aborted for {city}: {status.name}")
            return status, None
 
         if status == FetchResult.SUCCESS:
            return FetchResult.SUCCESS, data
 
-        if attempt < max_retries:
+        if status == FetchResult.RATE_LIMITED:
+           # The rate limiter already holds calls back for Retry-After; don't back off on top of it
+           logger.warning(f"Attempt {attempt} rate limited; retrying once the pause is over")
+        elif attempt < max_retries:
            wait_time = 2 ** attempt
            logger.warning(f"Attempt {attempt} failed. Retrying in {wait_time} seconds...")
            time.sleep(wait_time)
@@ -91,6 +163,124 @@ def retry_fetch(city, max_retries=3):
 
     return FetchResult.GLOBAL_NETWORK_FAILURE, None
 
+def revalidate(cache, key, city, fetcher):
+    status, data = retry_fetch(city, fetcher=fetcher)
+    if status in (FetchResult.SUCCESS, FetchResult.NOT_FOUND):
+        cache.store(key, status.value, data)
+        cache.stats.revalidated += 1
+        logger.info(f"Revalidated cached weather for {city}")
+
+def cached_lookup(cache, key, city, revalidations, fetcher):
+    entry = cache.lookup(key)
+    if entry is None:
+        return None
+
+    state, status, data = entry
+    logger.info(f"Cache {state} hit for {city}")
+    if state == STALE and cache.claim_revalidation(key):
+        worker = threading.Thread(target=revalidate, args=(cache, key, city, fetcher), daemon=True)
+        worker.start()
+        revalidations.append(worker)
+    return FetchResult(status), data
+
+def cached_fetch(cache, city, revalidations, fetcher=fetch_weather, key=None):
+    if cache is None:
+        return retry_fetch(city, fetcher=fetcher)
+
+    key = key or WeatherCache.make_key(build_params(city))
+    cached = cached_lookup(cache, key, city, revalidations, fetcher)
+    if cached is not None:
+        return cached
+
+    status, data = retry_fetch(city, fetcher=fetcher)
+    if status in (FetchResult.SUCCESS, FetchResult.NOT_FOUND):
+        cache.store(key, status.value, data)
+
+    return status, data
+
+def fetch_batch(batch, cache):
+    results = {}
+    status, items = retry_fetch(batch, fetcher=fetch_weather_group)
+
+    if status == FetchResult.SUCCESS:
+        by_id = {item["id"]: item for item in items}
+        for city_id in batch:
+            data = by_id.get(city_id)
+            results[city_id] = (FetchResult.SUCCESS, data) if data else (FetchResult.NOT_FOUND, None)
+    elif status in (FetchResult.GLOBAL_NETWORK_FAILURE, FetchResult.CIRCUIT_OPEN):
+        for city_id in batch:
+            results[city_id] = (status, None)
+    else:
+        logger.warning(f"Batched request rejected ({status.name}); falling back to per-ID calls")
+        for city_id in batch:
+            results[city_id] = retry_fetch(city_id, fetcher=fetch_weather_by_id)
+
+    if cache is not None:
+        for city_id, (status, data) in results.items():
+            if status in (FetchResult.SUCCESS, FetchResult.NOT_FOUND):
+                cache.store(WeatherCache.make_key(build_id_params(city_id)), status.value, data)
+
+    return results
+
+def fetch_batched(city_ids, cache, revalidations, workers=1):
+    """Fetch resolved city IDs through the group endpoint, falling back to per-ID calls"""
+    results = {}
+    pending = []
+
+    for city_id in dict.fromkeys(city_ids):
+        if cache is not None:
+            key = WeatherCache.make_key(build_id_params(city_id))
+            cached = cached_lookup(cache, key, city_id, revalidations, fetch_weather_by_id)
+            if cached is not None:
+                results[city_id] = cached
+                continue
+        pending.append(city_id)
+
+    batches = [pending[i:i + GROUP_BATCH_SIZE] for i in range(0, len(pending), GROUP_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch_results in pool.map(lambda batch: fetch_batch(batch, cache), batches):
+            results.update(batch_results)
+
+    return results
+
+def fetch_cities(cities, index, cache, revalidations, workers=1):
+    """Yield (city, status, data) in input order"""
+    if index is None and workers == 1:
+        for city in cities:
+            status, data = cached_fetch(cache, city, revalidations)
+            yield city, status, data
+        return
+
+    if index is None:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = [pool.submit(cached_fetch, cache, city, revalidations) for city in cities]
+        try:
+            for city, future in zip(cities, futures):
+                status, data = future.result()
+                yield city, status, data
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return
+
+    resolved = {}
+    for city in cities:
+        city_id = index.resolve(city)
+        if city_id is None:
+            suggestions = index.suggest(city)
+            hint = f" (did you mean: {', '.join(suggestions)}?)" if suggestions else ""
+            logger.error(f"Unknown city {city}{hint}")
+        resolved[city] = city_id
+
+    results = fetch_batched([i for i in resolved.values() if i is not None], cache, revalidations, workers)
+
+    for city in cities:
+        city_id = resolved[city]
+        if city_id is None:
+            yield city, FetchResult.NOT_FOUND, None
+        else:
+            status, data = results[city_id]
+            yield city, status, data
+
 def process_data(data, params):
     processed_data = []
 
@@ -109,6 +299,7 @@ def process_data(data, params):
 
     return processed_data
 
+@metrics.timed()
 def save_to_file(processed_data):
    try:
        DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -126,6 +317,15 @@ def save_to_file(processed_data):
 
    return filename
 
+@metrics.timed()
+def save_to_store(processed_data):
+   try:
+       store = WeatherStore(OBSERVATIONS_DIR)
+       store.append(processed_data)
+       store.compact()
+   except (IOError, OSError) as e:
+       logger.error(f"Observation store write error: {e}")
+
 def parse_arguments():
     parser = argparse.ArgumentParser(
         description="🌤️ Weather Fetcher CLI\nFetch weather data for one or more cities with selected parameters.",
@@ -159,6 +359,41 @@ def parse_arguments():
         help="Simulate fetching data without saving to file"
     )
 
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk response cache and always call the API"
+    )
+
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=CACHE_TTL,
+        help=f"Seconds a cached response stays fresh (default: {CACHE_TTL})"
+    )
+
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Ignore the local city index and query the API by name, one city per call"
+    )
+
+    parser.add_argument(
+        "--storage",
+        choices=["timeseries", "files"],
+        default=STORAGE_BACKEND,
+        help=f"Where to save observations (default: {STORAGE_BACKEND})"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"Concurrent API requests; the rate limiter keeps them within quota (default: {MAX_WORKERS})"
+    )
+
+    add_profile_arguments(parser, str(Path(LOG_FILE).parent))
+
     return parser.parse_args()
 
 
@@ -174,13 +409,16 @@ def main():
    all_processed_data = []
 
    arguments = parse_arguments()
+   profiler.start("weather", arguments)
    params = arguments.parameters
    cities = arguments.cities if arguments.cities else DEFAULT_CITIES
    dry_run = arguments.dry_run
 
-   for city in cities:
+   cache = None if arguments.no_cache else WeatherCache(CACHE_DB, arguments.cache_ttl, CACHE_STALE_TTL, NEGATIVE_CACHE_TTL)
+   revalidations = []
+   index = None if arguments.no_index else CityIndex.load(CITY_INDEX_FILE)
 
-       status, data = retry_fetch(city)
+   for city, status, data in fetch_cities(cities, index, cache, revalidations, arguments.workers):
 
        if status == FetchResult.GLOBAL_NETWORK_FAILURE:
            logger.critical(
@@ -202,14 +440,29 @@ def main():
           all_processed_data.extend(processed)
           success_cities.append(city)
 
+   profiler.snapshot("fetch_cities")
+
    if not dry_run and all_processed_data:
-       save_to_file(all_processed_data)
+       if arguments.storage == "timeseries":
+           save_to_store(all_processed_data)
+       else:
+           save_to_file(all_processed_data)
    else:
        logger.warning("No data to save!")
    
    logger.info("=== Fetch Summary ===")
    logger.info(f"Successful: {', '.join(success_cities) if success_cities else 'None'}")
    logger.info(f"Failed: {', '.join(failed_cities) if failed_cities else 'None'}")
+   logger.info(f"Rate limiter: {rate_limiter.summary()}")
+   for breaker in breakers.breakers.values():
+       logger.info(f"Circuit breaker {breaker.summary()}")
+
+   if cache is not None:
+       for worker in revalidations:
+           worker.join()
+       logger.info(f"Cache: {cache.stats.summary()}")
+       cache.purge_expired()
+       cache.close()
 
 if __name__ == "__main__":
     main()
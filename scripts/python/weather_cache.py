@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Weather Response Cache
+SQLite-backed TTL cache for OpenWeather responses, shared safely by
+concurrent weather.py runs (WAL journal + busy timeout).
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def summary(self):
+        return (
+            f"hits={self.hits}, stale={self.stale_hits}, negative={self.negative_hits}, "
+            f"misses={self.misses}, revalidated={self.revalidated}"
+        )
+
+class WeatherCache:
+    def __init__(self, db_path: Path, ttl: int, stale_ttl: int, negative_ttl: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload TEXT,
+                fetched_at REAL NOT NULL,
+                revalidating_until REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        """Cache key from the request parameters (city, units, ...), minus the API key"""
+        normalized = {
+            k: str(v).strip().lower() for k, v in params.items() if k != "appid"
+        }
+        return json.dumps(normalized, sort_keys=True)
+
+    def lookup(self, key: str):
+        """Return (state, status, data) for a usable entry, or None on a miss"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, payload, fetched_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None:
+            self.stats.misses += 1
+            return None
+
+        status, payload, fetched_at = row
+        age = time.time() - fetched_at
+        data = json.loads(payload) if payload else None
+
+        if data is None:
+            if age < self.negative_ttl:
+                self.stats.negative_hits += 1
+                return FRESH, status, None
+            self.stats.misses += 1
+            return None
+
+        if age < self.ttl:
+            self.stats.hits += 1
+            return FRESH, status, data
+
+        if age < self.ttl + self.stale_ttl:
+            self.stats.stale_hits += 1
+            return STALE, status, data
+
+        self.stats.misses += 1
+        return None
+
+    def claim_revalidation(self, key: str, lease: int = 60) -> bool:
+        """Atomically claim the right to refresh a stale entry, so only one process does it"""
+        now = time.time()
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE responses SET revalidating_until = ? "
+                "WHERE key = ? AND revalidating_until < ?",
+                (now + lease, key, now)
+            )
+            self.conn.commit()
+        return cur.rowcount == 1
+
+    def store(self, key: str, status: str, data: dict | None):
+        payload = json.dumps(data) if data is not None else None
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, status, payload, fetched_at, revalidating_until) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (key, status, payload, time.time())
+            )
+            self.conn.commit()
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - max(self.ttl + self.stale_ttl, self.negative_ttl)
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM responses WHERE fetched_at < ?", (cutoff,))
+            self.conn.commit()
+        if cur.rowcount:
+            logger.info(f"Purged {cur.rowcount} expired cache entries")
+        return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Weather Observation Store
+Append-only, date-partitioned storage for weather observations.
+
+Each day is written to observations/YYYY-MM-DD.jsonl. Once a day is over,
+compaction folds it into a columnar observations/YYYY-MM-DD.npz, so queries
+read only the partitions and columns they need.
+"""
+
+import argparse
+import datetime
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_PARAMETERS = ["temperature", "humidity", "pressure", "wind_speed"]
+TEXT_PARAMETERS = ["description"]
+AGGREGATIONS = {"hour": "datetime64[h]", "day": "datetime64[D]"}
+# Segment entry naming the staging file last merged into it, so a rerun after a crash doesn't merge it twice
+MERGED_KEY = "_merged_from"
+
+def parse_date(value):
+    return datetime.datetime.fromisoformat(value)
+
+class WeatherStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ---------- Writing ----------
+
+    def append(self, observations: list[dict]) -> int:
+        """Append observations (as produced by weather.process_data) to their day partitions"""
+        partitions = {}
+        for obs in observations:
+            day = obs["time"][:10]
+            partitions.setdefault(day, []).append(json.dumps(obs, separators=(",", ":")))
+
+        for day, lines in partitions.items():
+            self._locked_append(self.root / f"{day}.jsonl", "\n".join(lines) + "\n")
+
+        logger.info(f"Appended {len(observations)} observations to {len(partitions)} partition(s)")
+        return len(observations)
+
+    def compact(self, before: datetime.date | None = None) -> int:
+        """Fold closed JSONL day partitions into columnar .npz segments"""
+        before = before or datetime.date.today()
+        compacted = 0
+
+        # .compacting files are left over from an interrupted compaction
+        for path in sorted([*self.root.glob("*.compacting"), *self.root.glob("*.jsonl")]):
+            day = datetime.date.fromisoformat(path.stem)
+            if day >= before:
+                continue
+
+            staging = path.with_suffix(".compacting")
+            segment = self.root / f"{day}.npz"
+            with path.open("rb") as f:
+                # Hold the appenders' lock while renaming and reading; a writer that opened
+                # the old file sees the rename once it gets the lock and starts a fresh partition
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if path != staging:
+                    os.replace(path, staging)
+                stat = os.fstat(f.fileno())
+                fingerprint = f"{stat.st_ino}:{stat.st_size}"
+
+                old = self._read_npz(segment) if segment.exists() else None
+                if old is not None and old.pop(MERGED_KEY, None) == fingerprint:
+                    logger.info(f"{staging.name} was already merged into {segment.name}")
+                    staging.unlink()
+                    continue
+
+                columns = self._read_jsonl(staging)
+                if old is not None:
+                    columns = self._merge(old, columns)
+
+                tmp = self.root / f".{day}.npz.tmp"
+                with tmp.open("wb") as out:
+                    np.savez_compressed(out, **columns, **{MERGED_KEY: np.array(fingerprint)})
+                os.replace(tmp, segment)
+                staging.unlink()
+
+            compacted += 1
+            logger.info(f"Compacted {day}: {len(columns['time'])} observations")
+
+        return compacted
+
+    # ---------- Reading ----------
+
+    def partitions(self, start: datetime.datetime | None, end: datetime.datetime | None) -> list[Path]:
+        days = {}
+        for path in self.root.iterdir():
+            if path.suffix not in (".jsonl", ".npz", ".compacting") or path.name.startswith("."):
+                continue
+            day = datetime.date.fromisoformat(path.stem)
+            if start and day < start.date():
+                continue
+            if end and day > end.date():
+                continue
+            days.setdefault(day, []).append(path)
+        return [p for day in sorted(days) for p in sorted(days[day])]
+
+    def query(self, city: str, parameter: str, start=None, end=None):
+        """Return (times, values) NumPy arrays for one city/parameter over [start, end]"""
+        times, values = [], []
+
+        for path in self.partitions(start, end):
+            if path.suffix == ".npz":
+                with np.load(path) as segment:
+                    if parameter not in segment.files:
+                        continue
+                    mask = np.char.lower(segment["city"]) == city.lower()
+                    seg_times = segment["time"][mask]
+                    seg_values = segment[parameter][mask]
+            else:
+                columns = self._read_jsonl(path, fields=[parameter])
+                mask = np.char.lower(columns["city"]) == city.lower()
+                seg_times = columns["time"][mask]
+                seg_values = columns[parameter][mask]
+
+            times.append(seg_times)
+            values.append(seg_values)
+
+        if not times:
+            dtype = float if parameter in NUMERIC_PARAMETERS else str
+            return np.array([], dtype="datetime64[s]"), np.array([], dtype=dtype)
+
+        times = np.concatenate(times)
+        values = np.concatenate(values)
+
+        window = np.ones(len(times), dtype=bool)
+        if start:
+            window &= times >= np.datetime64(start, "s")
+        if end:
+            window &= times <= np.datetime64(end, "s")
+
+        order = np.argsort(times[window], kind="stable")
+        return times[window][order], values[window][order]
+
+    def aggregate(self, city: str, parameter: str, freq: str, start=None, end=None) -> dict:
+        """min/max/mean/count per hour or day for a numeric parameter"""
+        if parameter not in NUMERIC_PARAMETERS:
+            raise ValueError(f"Cannot aggregate non-numeric parameter: {parameter}")
+
+        times, values = self.query(city, parameter, start, end)
+        keep = ~np.isnan(values)
+        times, values = times[keep], values[keep]
+
+        buckets = times.astype(AGGREGATIONS[freq])
+        starts, first, counts = np.unique(buckets, return_index=True, return_counts=True)
+
+        if len(values) == 0:
+            empty = np.array([], dtype=float)
+            return {"bucket": starts, "min": empty, "max": empty, "mean": empty, "count": counts}
+
+        return {
+            "bucket": starts,
+            "min": np.minimum.reduceat(values, first),
+            "max": np.maximum.reduceat(values, first),
+            "mean": np.add.reduceat(values, first) / counts,
+            "count": counts,
+        }
+
+    # ---------- Helpers ----------
+
+    @staticmethod
+    def _locked_append(path: Path, text: str):
+        while True:
+            with path.open("a", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                # Compaction may have renamed the partition away while we waited for the lock
+                try:
+                    if not os.path.samestat(os.stat(path), os.fstat(f.fileno())):
+                        continue
+                except FileNotFoundError:
+                    continue
+                f.write(text)
+                f.flush()
+                return
+
+    @staticmethod
+    def _read_jsonl(path: Path, fields=None) -> dict:
+        fields = fields or NUMERIC_PARAMETERS + TEXT_PARAMETERS
+        rows = []
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in {path.name}")
+
+        columns = {
+            "time": np.array([r["time"] for r in rows], dtype="datetime64[s]"),
+            "city": np.array([r["city"] for r in rows], dtype=str),
+        }
+        for field in fields:
+            if field in NUMERIC_PARAMETERS:
+                columns[field] = np.array([r.get(field, np.nan) for r in rows], dtype=float)
+            else:
+                columns[field] = np.array([r.get(field, "") for r in rows], dtype=str)
+        return columns
+
+    @staticmethod
+    def _read_npz(path: Path) -> dict:
+        with np.load(path) as segment:
+            columns = {name: segment[name] for name in segment.files}
+        if MERGED_KEY in columns:
+            columns[MERGED_KEY] = str(columns[MERGED_KEY])
+        return columns
+
+    @staticmethod
+    def _merge(old: dict, new: dict) -> dict:
+        merged = {}
+        for name in old.keys() | new.keys():
+            merged[name] = np.concatenate([old[name], new[name]])
+        order = np.argsort(merged["time"], kind="stable")
+        return {name: column[order] for name, column in merged.items()}
+
+def import_legacy(store: WeatherStore, data_dir: Path) -> int:
+    """Load the old per-run weather_*.json files into the store"""
+    total = 0
+    for path in sorted(data_dir.glob("weather_*.json")):
+        try:
+            with path.open() as f:
+                total += store.append(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Skipping {path.name}: {e}")
+    return total
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Query and maintain the weather observation store",
+        epilog=(
+            "Examples:\n"
+            "  python weather_store.py query London temperature --start 2026-10-01 --agg day\n"
+            "  python weather_store.py compact\n"
+            "  python weather_store.py import-legacy"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query = sub.add_parser("query", help="Print a city/parameter slice")
+    query.add_argument("city")
+    query.add_argument("parameter", choices=NUMERIC_PARAMETERS + TEXT_PARAMETERS)
+    query.add_argument("--start", type=parse_date, help="ISO date/time (inclusive)")
+    query.add_argument("--end", type=parse_date, help="ISO date/time (inclusive)")
+    query.add_argument("--agg", choices=list(AGGREGATIONS), help="Aggregate per hour or day")
+
+    sub.add_parser("compact", help="Compact closed day partitions")
+    sub.add_parser("import-legacy", help="Import weather_*.json files from DATA_DIR")
+
+    return parser.parse_args()
+
+def main():
+    from config import DATA_DIR, OBSERVATIONS_DIR
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    store = WeatherStore(OBSERVATIONS_DIR)
+
+    if args.command == "compact":
+        logger.info(f"Compacted {store.compact()} partition(s)")
+    elif args.command == "import-legacy":
+        logger.info(f"Imported {import_legacy(store, DATA_DIR)} observations")
+    elif args.agg:
+        result = store.aggregate(args.city, args.parameter, args.agg, args.start, args.end)
+        print("bucket,min,max,mean,count")
+        for row in zip(result["bucket"], result["min"], result["max"], result["mean"], result["count"]):
+            print(f"{row[0]},{row[1]:.2f},{row[2]:.2f},{row[3]:.2f},{row[4]}")
+    else:
+        times, values = store.query(args.city, args.parameter, args.start, args.end)
+        print(f"time,{args.parameter}")
+        for t, v in zip(times, values):
+            print(f"{t},{v}")
+
+if __name__ == "__main__":
+    main()